@@ -1,20 +1,45 @@
 import streamlit as st
+import io
 import re
+from itertools import islice
 from utils.logger import logger
-from services.text_extractor import extract_text_from_file, extract_text_from_url
-from services.kg_service import kg_service
-import pandas as pd
-kg = kg_service()
-
-from neo4j import GraphDatabase
-import time
-import streamlit.components.v1 as components
-import streamlit as st
-from utils.scheduler import start_scheduler
+from services.text_extractor import extract_text_from_file, extract_text_from_url, iter_chunks
+from configs.config import INCREMENTAL_BUILD, DEBUG_PANEL, BACKGROUND_JOBS
+from utils.db import pool_metrics
+from utils import metrics
+from ui.graph_component import render_graph
+from ui.debug_panel import render_debug_panel
+
+# Chunks of a URL or file read by "Check Input" to judge it; the rest is only read by the build
+PREVIEW_CHUNKS = 3
 
+# Cold start: nothing above imports Neo4j, the LLM client, the crawler or the scheduler.
+# Those are imported and created below only once the page has been drawn or a feature needs them.
 st.set_page_config(page_title="OmniAI - Knowledge Graph", layout="wide")
 st.title("🧠 OmniAI - Knowledge Graph Tool")
 
+
+@st.cache_resource
+def get_kg_service():
+    # One kg_service (and one Neo4j driver) per process, shared by every session and rerun
+    from services.kg_service import kg_service
+    return kg_service()
+
+
+@st.cache_resource
+def get_job_queue():
+    from services.job_queue import job_queue
+    return job_queue()
+
+
+@st.cache_resource
+def get_crawler():
+    # Pooled HTTP session shared across sessions; conditional requests only make
+    # sense when the graph is kept between builds
+    from services.crawler import crawler
+    return crawler(conditional=INCREMENTAL_BUILD)
+
+
 # Initialize session state variables
 if "input_valid" not in st.session_state:
     st.session_state.input_valid = False
@@ -24,16 +49,15 @@ if "query_kg_flag" not in st.session_state:
     st.session_state.query_kg_flag = False
 if "final_text" not in st.session_state:
     st.session_state.final_text = ""
-    # Run the scheduler only once
-if "scheduler_started" not in st.session_state:
-    start_scheduler()
-    st.session_state.scheduler_started = True
+# Traces finished in this session's reruns stay in its state, so the debug panel only shows its own
+metrics.keep_last_traces(st.session_state.setdefault("last_traces", {}))
 
 # Input Section
-input_type = st.radio("Select input type for Knowledge Graph:", ("Text", "URL", "File"))
+input_type = st.radio("Select input type for Knowledge Graph:", ("Text", "URL", "File", "Bulk"))
 user_text = ""
 file_input = None
 url_input = ""
+bulk_urls, sitemap_url, bulk_files = "", "", []
 query_kg_flag = False
 # Reset graph if input type changes
 if "last_input_type" not in st.session_state:
@@ -41,8 +65,7 @@ if "last_input_type" not in st.session_state:
 
 if st.session_state.last_input_type != input_type:
     # Clear graph & KG flags when switching input mode
-    if "graph_html" in st.session_state:
-        del st.session_state["graph_html"]
+    st.session_state.pop("graph_view", None)
     st.session_state.query_kg_flag = False
     st.session_state.input_valid = False
     st.session_state.final_chunk = []
@@ -57,6 +80,11 @@ elif input_type == "URL":
 elif input_type == "File":
     file_input = st.file_uploader("📂 Upload your KG file", type=["txt", "csv"])
 
+elif input_type == "Bulk":
+    bulk_urls = st.text_area("🔗 URLs (one per line):")
+    sitemap_url = st.text_input("🗺️ Or a sitemap URL:")
+    bulk_files = st.file_uploader("📂 Files", type=["txt", "csv"], accept_multiple_files=True)
+
 def is_gibberish(text):
     """Check if the input text is likely gibberish."""
     if len(text.strip().split()) < 5:
@@ -67,37 +95,119 @@ def is_gibberish(text):
         return True
     return False
 
+# Connects to Neo4j (and bootstraps the schema) on the first run only, after the inputs are drawn
+kg = get_kg_service()
+
+
+@st.cache_resource
+def start_background_services():
+    # Once per process, not once per session: the Neo4j ping scheduler and the
+    # Prometheus /metrics endpoint (KG_METRICS_PORT)
+    from utils.scheduler import start_scheduler
+    start_scheduler()
+    metrics.start_metrics_server()
+
+
+start_background_services()
+
+if BACKGROUND_JOBS and st.button("📥 Ingest in background"):
+    # Fetching, extraction and inserts run in `python -m services.worker run`, not in this rerun
+    from services.worker import enqueue_text, enqueue_urls, enqueue_file
+    queue, job_ids = get_job_queue(), []
+    if input_type == "Text" and user_text.strip():
+        job_ids.append(enqueue_text(queue, user_text))
+    elif input_type == "URL" and url_input.strip():
+        job_ids.append(enqueue_urls(queue, [url_input]))
+    elif input_type == "File" and file_input:
+        job_ids.append(enqueue_file(queue, file_input.name, file_input.getvalue()))
+    elif input_type == "Bulk":
+        if bulk_urls.strip() or sitemap_url.strip():
+            job_ids.append(enqueue_urls(queue, bulk_urls.splitlines(), sitemap_url.strip() or None))
+        for f in bulk_files or []:
+            job_ids.append(enqueue_file(queue, f.name, f.getvalue()))
+    if job_ids:
+        st.success(f"✅ Queued job(s) {', '.join(f'#{i}' for i in job_ids)}")
+    else:
+        st.warning("⚠️ Nothing to queue. Please provide some input.")
+
+if BACKGROUND_JOBS:
+    @st.fragment(run_every=2)
+    def show_jobs():
+        jobs = get_job_queue().recent(limit=8)
+        if not jobs:
+            return
+        st.subheader("🧵 Background jobs")
+        for job in jobs:
+            label = f"#{job['id']} {job['kind']} · {job['status']}"
+            if job["status"] == "running":
+                fraction = job["done"] / job["total"] if job["total"] else 0.0
+                st.progress(min(fraction, 1.0), text=f"{label} · {job['done']}/{job['total']} chunks")
+            elif job["status"] == "failed":
+                st.error(f"❌ {label}: {job['error']}")
+            else:
+                st.caption(label + (f" · {job['result']['triples']} triples" if job["result"] else ""))
+        # Workers wrote to the graph: reload the entity/adjacency indexes of this process
+        latest_done = max((j["id"] for j in jobs if j["status"] == "done"), default=0)
+        if latest_done > st.session_state.get("jobs_seen_done", 0):
+            st.session_state.jobs_seen_done = latest_done
+            kg.refresh_indexes()
+            kg.visualize_triples()
+            st.session_state.query_kg_flag = True
+            st.rerun()
+
+    show_jobs()
+
 if st.button("🔍 Check Neo4j Now"):
     from utils.scheduler import ping_neo4j
     ping_neo4j()
+    st.json(pool_metrics())
 
 # Button to check input
 if st.button("✅ Check Input"):
     try:
         if input_type == "Text":
-            final_chunk = [user_text]
+            final_chunk = list(iter_chunks([user_text]))
+            source_id = "text"
         elif input_type == "URL":
-            if url_input:
-                final_chunk = extract_text_from_url(url_input)
-            else:
-                final_chunk = []
+            # Only the first chunks are read here; the build streams the URL again
+            final_chunk = list(islice(extract_text_from_url(url_input), PREVIEW_CHUNKS)) if url_input else []
+            source_id = f"url:{url_input.strip()}"
         elif input_type == "File":
-            if file_input:
-                final_chunk = extract_text_from_file(file_input)
-            else:
-                final_chunk = []
+            final_chunk = list(islice(extract_text_from_file(file_input), PREVIEW_CHUNKS)) if file_input else []
+            source_id = f"file:{file_input.name}" if file_input else "file"
+        elif input_type == "Bulk":
+            from services.crawler import extract_files, parse_sitemap
+            urls = bulk_urls.splitlines()
+            if sitemap_url.strip():
+                urls += parse_sitemap(get_crawler().session, sitemap_url.strip())
+            results = get_crawler().crawl(urls) + extract_files(bulk_files)
+            for r in results:
+                if r["status"] == "failed":
+                    st.warning(f"⚠️ {r['url']}: {r.get('error')}")
+            unchanged = sum(r["status"] == "unchanged" for r in results)
+            if unchanged:
+                st.info(f"ℹ️ {unchanged} page(s) unchanged since the last build, skipped.")
+            st.session_state.bulk_results = [r for r in results if r["status"] == "fetched"]
+            final_chunk = [c for r in st.session_state.bulk_results for c in r["chunks"]]
+            source_id = None
 
-        if "graph_html" in st.session_state:
-            del st.session_state["graph_html"]
+        st.session_state.pop("graph_view", None)
             
         full_text = " ".join(final_chunk) 
-        if not full_text or is_gibberish(full_text):
+        if input_type == "Bulk" and not full_text and unchanged:
+            st.session_state.input_valid = False
+            st.success("✅ Nothing new to ingest.")
+        elif not full_text or is_gibberish(full_text):
             st.session_state.input_valid = False
             st.warning("⚠️ The input is incomplete or unclear. Please provide more meaningful information.")
         else:
-            kg.reset_kg()
+            # Incremental mode keeps the graph and only re-ingests changed chunks on build
+            if not INCREMENTAL_BUILD:
+                kg.reset_kg()
+            st.session_state.source_id = source_id
             st.session_state.input_valid = True
             st.session_state.final_chunk = final_chunk
+            st.session_state.streamed_input = {"URL": url_input, "File": file_input}.get(input_type)
             st.session_state.query_kg_flag = False
             st.success("✅ Input is valid and ready to build the KG!")
 
@@ -105,12 +215,46 @@ if st.button("✅ Check Input"):
         st.error(f"❌ Error processing input: {e}")
         st.session_state.input_valid = False
 
+def checked_chunks():
+    """Chunks of the checked input: URLs and files are streamed into the build rather than kept in the session."""
+    streamed = st.session_state.get("streamed_input")
+    if isinstance(streamed, str):
+        return extract_text_from_url(streamed)
+    if streamed is not None:
+        return extract_text_from_file(streamed)
+    return st.session_state.final_chunk
+
+
 # Build KG Button (enabled only if input is valid)
 if st.session_state.input_valid:
     if st.button("🚀 Build Knowledge Graph"):
         try:
-            for chunk in st.session_state.final_chunk:
-                kg.build_kg(chunk)
+            if st.session_state.source_id is None:
+                # Bulk input: one source per page/file, all in one pipeline run so small pages share LLM calls
+                results = st.session_state.bulk_results
+                if INCREMENTAL_BUILD:
+                    stats = kg.sync_sources([(r["source"], r["chunks"]) for r in results])
+                    failed_sources = set(stats.get("failed_sources", []))
+                else:
+                    stats = kg.build_kg_pipelined([c for r in results for c in r["chunks"]])
+                    failed = not stats or stats["failed_chunks"] or stats["failed_writes"]
+                    failed_sources = {r["source"] for r in results} if failed else set()
+                # Validators are saved only once a page is fully ingested
+                for result in results:
+                    if stats and result["source"] not in failed_sources and result["source"].startswith("url:"):
+                        get_crawler().state.save(result)
+            elif INCREMENTAL_BUILD:
+                stats = kg.sync_source(st.session_state.source_id, checked_chunks())
+            else:
+                stats = kg.build_kg_pipelined(checked_chunks())
+            if stats:
+                st.caption(
+                    f"⏱️ {stats['wall_seconds']}s total · extraction {stats['extract_seconds']}s · "
+                    f"writes {stats['write_seconds']}s · {stats['chunks']} chunks · "
+                    f"{stats['llm_calls']} LLM calls · {stats['tokens_per_triple']} tokens/triple"
+                    + (f" · cache {stats['cache_hits']} hits / {stats['cache_misses']} misses"
+                       if "cache_hits" in stats else "")
+                )
             st.session_state.query_kg_flag = True
         except Exception as e:
             st.error(f"❌ KG build failed: {e}")
@@ -118,9 +262,57 @@ else:
     st.button("🚀 Build Knowledge Graph", disabled=True)
     st.info("ℹ️ Please check the input first.")
 
-if "graph_html" in st.session_state:
-    # kg.visualize_triples()
-    components.html(st.session_state["graph_html"], height=600, width=1000, scrolling=True)
+if INCREMENTAL_BUILD:
+    with st.sidebar:
+        st.subheader("📚 Sources in graph")
+        try:
+            known_sources = kg.sources.sources()
+        except Exception as e:
+            logger.error(f"Failed to list sources: {e}")
+            known_sources = []
+        if known_sources:
+            source_to_remove = st.selectbox("Source", known_sources)
+            if st.button("🗑️ Remove source"):
+                kg.remove_source(source_to_remove)
+        else:
+            st.caption("No sources ingested yet.")
+
+with st.sidebar:
+    st.subheader("💾 Snapshot")
+    if st.button("📤 Export snapshot"):
+        buffer = io.BytesIO()
+        snapshot_stats = kg.export_snapshot(buffer)
+        if snapshot_stats:
+            st.session_state.snapshot = buffer.getvalue()
+            st.caption(f"{snapshot_stats['entities']} entities · {snapshot_stats['edges']} edges · "
+                       f"{snapshot_stats['bytes'] / 1024:.0f} KB")
+    if "snapshot" in st.session_state:
+        st.download_button("⬇️ Download snapshot", st.session_state.snapshot, file_name="kg_snapshot.npz")
+    snapshot_file = st.file_uploader("Snapshot file", type=["npz"])
+    if snapshot_file and st.button("📥 Import snapshot"):
+        if kg.import_snapshot(snapshot_file):
+            st.session_state.pop("graph_view", None)
+            st.session_state.query_kg_flag = True
+
+if "graph_view" in st.session_state:
+    graph = st.session_state["graph_view"]
+    if st.button("➕ Load more edges"):
+        if not kg.load_more_edges(graph):
+            st.info("ℹ️ All edges are already shown.")
+    render_graph(graph, key="kg_graph")
+    st.caption(f"{len(graph.names)} nodes · {len(graph)} edges")
+
+    explore = st.text_input("🧭 Explore an entity's neighborhood:")
+    if explore:
+        nbr = st.session_state.get("neighborhood_view")
+        if nbr is None or nbr.view_id != f"nbr:{explore}":
+            st.session_state["neighborhood_view"] = nbr = kg.neighborhood(explore)
+        elif st.button("➕ More neighbors"):
+            kg.neighborhood(explore, nbr)
+        if len(nbr):
+            render_graph(nbr, key="kg_neighborhood", height=400)
+        else:
+            st.info("⚠️ No matching entity found.")
 
 # Query KG
 if st.session_state.query_kg_flag:
@@ -130,7 +322,24 @@ if st.session_state.query_kg_flag:
             st.warning("⚠️ Please enter a question.")
         else:
             try:
-                result = kg.generate_query(user_question)
+                result = kg.answer(user_question)
+                # Generated queries return one page at a time; keep it to fetch the next one
+                st.session_state.query_page = result if getattr(result, "has_more", False) else None
+                stats = kg.answer_stats.stats()
+                st.caption(
+                    f"{stats['local_fraction']:.0%} of {stats['questions']} question(s) answered locally · "
+                    f"p50 local {stats['local_ms_p50']} ms · p50 LLM {stats['llm_ms_p50']} ms"
+                )
             except Exception as e:
                 logger.error(f"Query failed: {e}")
-                st.error("Error querying Knowledge Graph. Check logs.")
\ No newline at end of file
+                st.error("Error querying Knowledge Graph. Check logs.")
+
+    query_page = st.session_state.get("query_page")
+    if query_page is not None and st.button("➕ More results"):
+        next_page = kg.query_kg(query_page.cypher, query_page.params, skip=query_page.next_skip)
+        st.session_state.query_page = next_page if getattr(next_page, "has_more", False) else None
+
+# Rendered last so it includes the query run in this rerun
+if DEBUG_PANEL:
+    with st.sidebar:
+        render_debug_panel()
@@ -0,0 +1,93 @@
+"""
+LLM calls per document and triple recall of the sentence-packing chunker
+(services/text_extractor.iter_chunks) against the old fixed 800-token word
+packer, on synthetic corpora (benchmarks/corpus.py).
+
+Recall is measured with the stub LLM (utils/fake_llm.py), which extracts a
+fact only from a whole sentence, so it counts facts lost to chunk boundaries,
+not the model's own misses on longer inputs.
+
+    python -m benchmarks.chunk_bench --sizes 50 500 5000 --overlap 0 100
+"""
+import os
+
+os.environ.setdefault("KG_LLM_BACKEND", "stub")
+
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+
+from benchmarks.corpus import make_corpus
+from services.prompts import extraction_prompt
+from services.text_extractor import READ_BLOCK, _word_tokens, chunk_budget, count_tokens, iter_chunks
+from utils.fake_llm import fake_llm
+
+LEGACY_MAX_TOKENS = 800
+
+
+def _word_chunks(pieces, max_tokens=LEGACY_MAX_TOKENS):
+    """The previous chunker: greedy word packing, cutting wherever the budget runs out."""
+    words, tokens = [], 0
+    for word in "".join(pieces).split():
+        cost = _word_tokens(word)
+        if words and tokens + cost > max_tokens:
+            yield " ".join(words)
+            words, tokens = [], 0
+        words.append(word)
+        tokens += cost
+    if words:
+        yield " ".join(words)
+
+
+def _facts(text):
+    """Fact occurrences the stub extracts from `text` (the corpus repeats some facts)."""
+    return Counter(tuple(item[:3]) for item in json.loads(fake_llm._triples(text)))
+
+
+def run_size(size, strategies):
+    text, _ = make_corpus(size)
+    pieces = [text[i:i + READ_BLOCK] for i in range(0, len(text), READ_BLOCK)]
+    expected = _facts(text)
+    overhead = count_tokens(extraction_prompt(""))
+    results = {}
+    for name, chunker in strategies.items():
+        start = time.perf_counter()
+        chunks = list(chunker(pieces))
+        seconds = time.perf_counter() - start
+        sizes = [count_tokens(chunk) for chunk in chunks]
+        found = sum((_facts(chunk) for chunk in chunks), Counter())
+        results[name] = {
+            "calls": len(chunks),
+            "recall": round(sum((found & expected).values()) / sum(expected.values()), 4) if expected else None,
+            "prompt_tokens": sum(sizes) + overhead * len(chunks),
+            "max_chunk_tokens": max(sizes, default=0),
+            "chunk_ms": round(seconds * 1000, 2),
+        }
+    return {"size": size, "text_tokens": count_tokens(text), "facts": sum(expected.values()), "strategies": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000], help="facts per document")
+    parser.add_argument("--overlap", type=int, nargs="+", default=[0, 100], help="overlap tokens to try")
+    parser.add_argument("--max-tokens", type=int, default=0, help="cap on the chunk budget (0 = whole budget)")
+    args = parser.parse_args()
+
+    logging.getLogger("services.text_extractor").setLevel(logging.ERROR)
+    strategies = {f"words_{LEGACY_MAX_TOKENS}": _word_chunks}
+    for overlap in args.overlap:
+        strategies[f"sentences_overlap_{overlap}"] = (
+            lambda pieces, overlap=overlap: iter_chunks(pieces, args.max_tokens, overlap)
+        )
+    report = {
+        "budget_tokens": chunk_budget(args.max_tokens),
+        "prompt_overhead_tokens": count_tokens(extraction_prompt("")),
+        "runs": [run_size(size, strategies) for size in args.sizes],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Deterministic synthetic corpora for the benchmarks: sentences the stub LLM
+(utils/fake_llm.py) turns back into exactly one triple each, plus questions
+about the facts they contain.
+"""
+import random
+
+_FIRST = ["Arin", "Bela", "Cato", "Dara", "Eli", "Fen", "Gia", "Hale", "Ines", "Jory", "Kai", "Lena",
+          "Milo", "Nora", "Oren", "Pia", "Quin", "Rhea", "Soren", "Tova"]
+_LAST = ["Voss", "Marlow", "Quade", "Renner", "Sato", "Thorne", "Ulman", "Vance", "Wilde", "Yarrow",
+         "Zeller", "Abbot", "Brandt", "Castel", "Drake", "Ekholm", "Farrow", "Greer", "Holm", "Ivers"]
+_CITIES = ["Port Aldren", "New Halvik", "East Morrow", "San Teodo", "Lake Ferrin", "North Calder",
+           "Old Brisk", "West Lunel"]
+_JOBS = ["Lyricist", "Engineer", "Surgeon", "Architect", "Novelist", "Chemist", "Pilot", "Composer"]
+
+_TEMPLATES = [
+    ("{p} was born in {c}.", "BORN_IN"),
+    ("{p} founded {o}.", "FOUNDED"),
+    ("{p} acted in {m}.", "ACTED_IN"),
+    ("{p} works as {j}.", "PROFESSION"),
+    ("{o} is headquartered in {c}.", "HEADQUARTERED_IN"),
+]
+_FILLER = "The archive notes this detail among many others in the record."
+
+
+def person(i):
+    return f"{_FIRST[i % len(_FIRST)]} {_LAST[(i // len(_FIRST)) % len(_LAST)]} {i // (len(_FIRST) * len(_LAST)) or ''}".strip()
+
+
+def make_corpus(facts, seed=7, filler_every=3):
+    """Return (text, questions) with `facts` fact sentences, deterministic for a given seed."""
+    rng = random.Random(seed)
+    people = max(2, facts // 3)
+    sentences, questions = [], []
+    for i in range(facts):
+        template, rel = _TEMPLATES[i % len(_TEMPLATES)]
+        p = person(rng.randrange(people))
+        o = f"Corp {rng.randrange(people)} Labs"
+        sentence = template.format(
+            p=p, o=o, c=rng.choice(_CITIES), j=rng.choice(_JOBS), m=f"Film {rng.randrange(people)} Story",
+        )
+        sentences.append(sentence)
+        if i % filler_every == 0:
+            sentences.append(_FILLER)
+        if rel == "BORN_IN":
+            questions.append(f"Where was {p} born?")
+        elif rel == "FOUNDED":
+            questions.append(f"Who founded {o}?")
+        elif rel == "PROFESSION":
+            questions.append(f"What is the profession of {p}?")
+        elif rel == "HEADQUARTERED_IN":
+            questions.append(f"Where is {o} headquartered?")
+    return " ".join(sentences), questions
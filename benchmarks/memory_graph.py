@@ -0,0 +1,138 @@
+"""
+In-memory stand-in for the Neo4j driver, good enough to run kg_service's
+write and lookup paths offline. It recognises only the Cypher shapes this
+repo issues (bulk/per-row MERGE, alias writes, index loads, one-hop
+lookups, snapshot pages, schema DDL, reset); anything else returns no rows
+and is counted in `unsupported`. `rtt` adds a fixed delay per statement to
+model the network round trip to a real server.
+"""
+import re
+import threading
+import time
+from collections import defaultdict
+
+_REL = re.compile(r"MERGE \(h\)-\[r?:`?(\w+)`?\]->\(t\)")
+_NAME = r'\{name:\s*(?:"((?:[^"\\]|\\.)*)"|\$(\w+))\}'
+_LOOKUP_OUT = re.compile(r"MATCH \(\w+:ENTITY " + _NAME + r"\)-\[:(\w+)\]->\(\w+:ENTITY\)")
+_LOOKUP_IN = re.compile(r"MATCH \(\w+:ENTITY\)-\[:(\w+)\]->\(\w+:ENTITY " + _NAME + r"\)")
+
+
+class _result(list):
+    def consume(self):
+        return None
+
+    def single(self):
+        return self[0] if self else None
+
+    def data(self):
+        return [dict(r) for r in self]
+
+
+class memory_driver:
+    def __init__(self, rtt=0.0):
+        self.rtt = rtt
+        self.edges = defaultdict(set)  # (head, rel) -> tails
+        self.entities = set()
+        self.aliases = defaultdict(set)  # entity -> aliases
+        self.statements = 0
+        self.unsupported = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def session(self, **kwargs):
+        return _session(self)
+
+    def close(self):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.edges.clear()
+            self.entities.clear()
+            self.aliases.clear()
+            self.statements = 0
+
+    def run(self, query, params):
+        if self.rtt:
+            time.sleep(self.rtt)
+        with self._lock:
+            self.statements += 1
+            return _result(self._run(" ".join(query.split()), params))
+
+    def _run(self, q, p):
+        if q.startswith(("SHOW ", "CREATE ")) or "AS ids" in q:  # schema bootstrap
+            return []
+        if "DETACH DELETE" in q and "MATCH (n)" in q:
+            self.edges.clear()
+            self.entities.clear()
+            self.aliases.clear()
+            return []
+        if "e.name >= $after" in q or "e.name > $after" in q:  # snapshot export page
+            first = "e.name >= $after" in q
+            names = sorted(n for n in self.entities
+                           if isinstance(n, str) and (n >= p["after"] if first else n > p["after"]))[:p["limit"]]
+            page = set(names)
+            out = defaultdict(list)
+            for (h, r), tails in self.edges.items():
+                if h in page:
+                    out[h] += [[r, t] for t in sorted(tails)]
+            return [{"name": n, "edges": out[n], "aliases": sorted(self.aliases.get(n, ()), key=str)} for n in names]
+        if "MERGE (c:CHUNK" in q:  # chunk tags are not modelled
+            return []
+        if "MERGE (:ENTITY {name: row.name})" in q:
+            self.entities.update(row["name"] for row in p["rows"])
+            return []
+        if "ALIAS_OF" in q and "MERGE (alias)" in q:
+            rows = p.get("rows") or [{"entity": p["entity"], "alias": p["alias"]}]
+            for row in rows:
+                if row["entity"] in self.entities:
+                    self.aliases[row["entity"]].add(row["alias"])
+            return []
+        rel = _REL.search(q)
+        if rel:
+            rows = p.get("rows") or [{"head": p["head"], "tail": p["tail"]}]
+            for row in rows:
+                self.entities.update((row["head"], row["tail"]))
+                self.edges[(row["head"], rel.group(1))].add(row["tail"])
+            return []
+        if "collect(a.name) AS aliases" in q:
+            return [{"name": e, "aliases": sorted(self.aliases.get(e, ()))} for e in self.entities]
+        if "type(r) AS rel," in q:
+            return [{"head": h, "rel": r, "tail": t} for (h, r), tails in self.edges.items() for t in tails]
+        if "type(r) AS relation, t.name AS tail" in q:
+            rows = [{"head": h, "relation": r, "tail": t} for (h, r), tails in self.edges.items() for t in tails]
+            return rows[p.get("skip", 0):p.get("skip", 0) + p.get("limit", len(rows))]
+        m = _LOOKUP_OUT.search(q)
+        if m:
+            name = m.group(1) if m.group(1) is not None else p.get(m.group(2))
+            return [{"result": t} for t in sorted(self.edges.get((name, m.group(3)), ()))]
+        m = _LOOKUP_IN.search(q)
+        if m:
+            rel = m.group(1)
+            name = m.group(2) if m.group(2) is not None else p.get(m.group(3))
+            return [{"result": h} for (h, r), tails in self.edges.items() if r == rel and name in tails]
+        if "LIMIT 0" in q:
+            return []
+        self.unsupported[q[:60]] += 1
+        return []
+
+
+class _session:
+    def __init__(self, driver):
+        self._driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._driver.run(query, {**(parameters or {}), **kwargs})
+
+    def execute_write(self, fn, *args, **kwargs):
+        return fn(self, *args, **kwargs)
+
+    execute_read = execute_write
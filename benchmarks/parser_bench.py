@@ -0,0 +1,98 @@
+"""
+Recovery rate and throughput of services/triple_parser.py on recorded LLM
+output shapes (benchmarks/fixtures/llm_triple_outputs.json), compared with
+the old whole-response ast.literal_eval. A triple counts as recovered only if
+it equals one of the fixture's expected triples; tests/test_triple_parser.py
+asserts the same fixtures.
+
+    python -m benchmarks.parser_bench --repeat 2000
+"""
+import argparse
+import ast
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+from services.triple_parser import parse_response, triple_stream_parser
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "llm_triple_outputs.json")
+
+
+def load_fixtures(path=FIXTURES):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def recovered(expected, triples):
+    """How many of the expected triples were parsed (each counted at most as often as expected)."""
+    got = Counter(tuple(t) for t in triples)
+    return sum(min(n, got[t]) for t, n in Counter(tuple(t) for t in expected).items())
+
+
+def _literal_eval_triples(raw):
+    try:
+        items = ast.literal_eval(raw)
+        if not isinstance(items, list):
+            return []
+        return [
+            tuple(item[:3]) for item in items
+            if isinstance(item, (list, tuple)) and len(item) >= 3
+            and all(isinstance(x, (str, int, float)) for x in item[:3])
+        ]
+    except Exception:
+        return []
+
+
+def streamed(raw, step=7):
+    """Parse `raw` fed in `step`-character slices, as a streamed response arrives."""
+    parser = triple_stream_parser()
+    items = []
+    for i in range(0, len(raw), step):
+        items += parser.feed(raw[i:i + step])
+    return items + parser.close()
+
+
+def run(repeat):
+    fixtures = load_fixtures()
+    cases, expected, found, baseline = [], 0, 0, 0
+    for fixture in fixtures:
+        triples, _, stats = parse_response(fixture["raw"])
+        whole = [list(t) for t in triples]
+        expected += len(fixture["expected"])
+        found += recovered(fixture["expected"], triples)
+        baseline += recovered(fixture["expected"], _literal_eval_triples(fixture["raw"]))
+        cases.append({
+            "name": fixture["name"],
+            "expected": len(fixture["expected"]),
+            "parsed": len(triples),
+            "exact": whole == fixture["expected"],
+            "streamed_matches": [item[:3] for item in streamed(fixture["raw"])] == whole,
+            "repaired": stats["recovered"],
+            "skipped": stats["malformed"],
+        })
+
+    payload = "".join(f["raw"] for f in fixtures)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for fixture in fixtures:
+            parse_response(fixture["raw"])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "cases": cases,
+        "recovery_rate": round(found / expected, 3) if expected else 1.0,
+        "literal_eval_recovery_rate": round(baseline / expected, 3) if expected else 1.0,
+        "throughput_mb_per_sec": round(len(payload) * repeat / elapsed / 1e6, 2),
+        "responses_per_sec": round(len(fixtures) * repeat / elapsed, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    # Malformed fixtures log a warning on every parse; the report is the output
+    logging.getLogger("OmniAI").setLevel(logging.ERROR)
+    print(json.dumps(run(args.repeat), indent=2))
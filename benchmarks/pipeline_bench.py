@@ -0,0 +1,208 @@
+"""
+Offline ingest/query benchmark: throughput, p50/p95/p99 latency and peak
+traced memory per stage, over synthetic corpora of increasing size.
+
+The LLM is the deterministic stub (KG_LLM_BACKEND=stub, utils/fake_llm.py).
+The graph is the in-memory stand-in (benchmarks/memory_graph.py) or, with
+--backend neo4j, the database in NEO4J_URI. Point that at a throwaway
+container: the graph is reset before every size.
+
+    python -m benchmarks.pipeline_bench --sizes 100 1000 --out bench.json
+    python -m benchmarks.pipeline_bench --compare bench.json   # % change vs an earlier run
+"""
+import os
+
+os.environ.setdefault("KG_LLM_BACKEND", "stub")
+# The stub has no provider limits to respect
+os.environ.setdefault("KG_LLM_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("KG_LLM_TOKENS_PER_MINUTE", "0")
+
+import argparse
+import json
+import logging
+import subprocess
+import time
+import tracemalloc
+
+from benchmarks.corpus import make_corpus
+from benchmarks.memory_graph import memory_driver
+from services.build_pipeline import build_pipeline
+from services.kg_service import kg_service
+from services.local_graph import answer_stats
+from services.query_cache import query_cache
+from services.text_extractor import chunk_text, iter_chunks
+from utils.llm import llm
+
+STAGES = [
+    "chunk_text", "iter_chunks", "extract", "insert_per_row", "insert_bulk",
+    "build_pipelined", "generate_query", "answer",
+]
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _summarize(samples, items):
+    ordered = sorted(samples)
+    total = sum(samples)
+    return {
+        "ops": len(samples),
+        "items": items,
+        "items_per_sec": round(items / total, 1) if total > 0 else None,
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+        "total_s": round(total, 4),
+    }
+
+
+def _measure(make_ops, reset):
+    """Time every op, then replay them under tracemalloc for the peak."""
+    reset()
+    samples, items = [], 0
+    for fn, n in make_ops():
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        items += n
+    stats = _summarize(samples, items)
+
+    reset()
+    tracemalloc.start()
+    for fn, _ in make_ops():
+        fn()
+    stats["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    tracemalloc.stop()
+    return stats
+
+
+def _driver(backend, rtt):
+    if backend == "neo4j":
+        from utils.db import get_driver
+        return get_driver()
+    return memory_driver(rtt=rtt)
+
+
+def _reset_graph(driver):
+    if isinstance(driver, memory_driver):
+        driver.reset()
+        return
+    with driver.session() as session:
+        session.run("MATCH (n) CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS").consume()
+
+
+def run_size(kg, size, chunk_tokens, questions_cap):
+    text, questions = make_corpus(size)
+    questions = questions[:questions_cap]
+    chunks = list(iter_chunks([text], chunk_tokens))
+    extracted = [kg.extract_triples(chunk) for chunk in chunks]
+
+    def reset_graph():
+        _reset_graph(kg.driver)
+        kg.resolver.clear()
+        kg.local_graph.clear()
+
+    def load_graph():
+        reset_graph()
+        kg.query_cache = query_cache()
+        kg.answer_stats = answer_stats()
+        for triples, aliases in extracted:
+            kg.write_triples(triples, aliases)
+
+    def noop():
+        pass
+
+    stages = {
+        "chunk_text": (lambda: [(lambda: chunk_text(text, 2000), len(text))] * 5, noop),
+        "iter_chunks": (lambda: [(lambda: list(iter_chunks([text], chunk_tokens)), len(text))] * 5, noop),
+        "extract": (lambda: [(lambda c=c: kg.extract_triples(c), 1) for c in chunks], noop),
+        "insert_per_row": (
+            lambda: [(lambda t=t, a=a: kg._insert_triples_per_row(t, a), len(t)) for t, a in extracted],
+            reset_graph,
+        ),
+        "insert_bulk": (
+            lambda: [(lambda t=t, a=a: kg.writer.write(t, a), len(t)) for t, a in extracted],
+            reset_graph,
+        ),
+        "build_pipelined": (
+            lambda: [(
+                lambda: build_pipeline(kg.extract_triples, kg.write_triples, streaming=True).run(chunks),
+                sum(len(t) for t, _ in extracted),
+            )],
+            reset_graph,
+        ),
+        "generate_query": (lambda: [(lambda q=q: kg.generate_query(q), 1) for q in questions], load_graph),
+        "answer": (lambda: [(lambda q=q: kg.answer(q), 1) for q in questions], load_graph),
+    }
+
+    results = {}
+    for name in STAGES:
+        make_ops, reset = stages[name]
+        results[name] = _measure(make_ops, reset)
+    results["answer"]["local_fraction"] = kg.answer_stats.stats()["local_fraction"]
+    return {"size": size, "chars": len(text), "chunks": len(chunks), "questions": len(questions), "stages": results}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline):
+    """% change of items_per_sec and p95 per size/stage against an earlier report."""
+    old = {(r["size"], s): v for r in baseline["runs"] for s, v in r["stages"].items()}
+    rows = []
+    for run in current["runs"]:
+        for stage, new in run["stages"].items():
+            prev = old.get((run["size"], stage))
+            if not prev:
+                continue
+            change = lambda key: (
+                round((new[key] - prev[key]) / prev[key] * 100, 1) if prev.get(key) and new.get(key) is not None else None
+            )
+            rows.append({"size": run["size"], "stage": stage,
+                         "items_per_sec_change_pct": change("items_per_sec"), "p95_change_pct": change("p95_ms")})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="facts per corpus")
+    parser.add_argument("--backend", choices=["memory", "neo4j"], default="memory")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated round trip per statement (memory backend)")
+    parser.add_argument("--chunk-tokens", type=int, default=800)
+    parser.add_argument("--questions", type=int, default=200, help="max questions per size")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to diff against")
+    args = parser.parse_args()
+
+    logging.getLogger("OmniAI").setLevel(logging.WARNING)
+    driver = _driver(args.backend, args.rtt_ms / 1000)
+    kg = kg_service(driver)
+    kg.extraction_cache = None  # measure the LLM path, not the cache
+
+    report = {
+        "commit": _commit(),
+        "backend": args.backend,
+        "rtt_ms": args.rtt_ms if args.backend == "memory" else None,
+        "llm": type(llm.backend).__name__,
+        "runs": [run_size(kg, size, args.chunk_tokens, args.questions) for size in args.sizes],
+    }
+    if isinstance(driver, memory_driver) and driver.unsupported:
+        report["unsupported_statements"] = dict(driver.unsupported)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["compare"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
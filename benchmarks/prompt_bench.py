@@ -0,0 +1,79 @@
+"""
+LLM calls per document and tokens per extracted triple for the prompt
+versions in services/prompts.py, with and without multi-chunk batching,
+over many small synthetic documents (benchmarks/corpus.py) built into the
+in-memory graph with the stub LLM.
+
+    python -m benchmarks.prompt_bench --docs 200 --facts-per-doc 5
+"""
+import os
+
+os.environ.setdefault("KG_LLM_BACKEND", "stub")
+# The stub has no provider limits to respect
+os.environ.setdefault("KG_LLM_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("KG_LLM_TOKENS_PER_MINUTE", "0")
+
+import argparse
+import json
+import logging
+
+from benchmarks.corpus import make_corpus
+from benchmarks.memory_graph import memory_driver
+from services import prompts
+from services.kg_service import kg_service
+from services.text_extractor import count_tokens, iter_chunks
+
+# (label, extraction prompt version, chunks per call)
+CONFIGS = [
+    ("extract_v1", "1", 1),
+    ("extract_v2", "2", 1),
+    ("extract_v2_batch4", "2", 4),
+    ("extract_v2_batch8", "2", 8),
+]
+
+
+def run(docs, facts_per_doc):
+    chunks = []
+    for seed in range(docs):
+        chunks += iter_chunks([make_corpus(facts_per_doc, seed=seed)[0]])
+    kg = kg_service(memory_driver())
+    kg.extraction_cache = None
+
+    results = {}
+    for label, version, batch in CONFIGS:
+        prompts.PROMPT_VERSIONS["extract"] = version
+        kg.driver.reset()
+        kg.resolver.clear()
+        kg.batch_chunks = batch
+        stats = kg.run_build(chunks)
+        results[label] = {
+            "calls_per_doc": round(stats["llm_calls"] / docs, 3),
+            "tokens_per_triple": stats["tokens_per_triple"],
+            "prompt_tokens": stats["prompt_tokens"],
+            "output_tokens": stats["output_tokens"],
+            "triples": stats["triples"],
+            "failed_chunks": stats["failed_chunks"],
+            "wall_seconds": stats["wall_seconds"],
+        }
+    prompts.PROMPT_VERSIONS.pop("extract", None)
+
+    question = "Where was Javed Akhtar born?"
+    cypher = {
+        template.id: count_tokens(template.render(question=question))
+        for template in (prompts.get("cypher", "1"), prompts.get("cypher", "2"))
+    }
+    return {"docs": docs, "chunks": len(chunks), "extraction": results, "cypher_prompt_tokens": cypher}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--facts-per-doc", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.getLogger("OmniAI").setLevel(logging.WARNING)
+    print(json.dumps(run(args.docs, args.facts_per_doc), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+MERGE and lookup latency as node count grows, with and without the schema
+created by services/schema.py.
+
+Uses its own BenchEntity label so the real graph is never touched.
+
+    python -m benchmarks.schema_bench --sizes 1000 10000 50000 --out schema_bench.json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from neo4j import GraphDatabase
+
+from configs.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+
+LABEL = "BenchEntity"
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return {"p50_ms": round(pick(0.50), 3), "p95_ms": round(pick(0.95), 3), "mean_ms": round(statistics.mean(samples), 3)}
+
+
+def _timed(session, query, probes, **params):
+    samples = []
+    for value in probes:
+        t0 = time.perf_counter()
+        session.run(query, value=value, **params).consume()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return _percentiles(samples)
+
+
+def _reset(session):
+    session.run("DROP CONSTRAINT bench_name_unique IF EXISTS").consume()
+    session.run("DROP INDEX bench_name_text IF EXISTS").consume()
+    session.run(f"MATCH (n:{LABEL}) CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF 10000 ROWS").consume()
+
+
+def _measure(session, size, probes):
+    existing = [f"Entity {i}" for i in random.sample(range(size), len(probes))]
+    return {
+        "merge_existing": _timed(session, f"MERGE (n:{LABEL} {{name: $value}})", existing),
+        "merge_new": _timed(session, f"MERGE (n:{LABEL} {{name: $value}})", probes),
+        "exact_lookup": _timed(session, f"MATCH (n:{LABEL} {{name: $value}}) RETURN n.name", existing),
+        "contains_lookup": _timed(
+            session, f"MATCH (n:{LABEL}) WHERE n.name CONTAINS $value RETURN n.name LIMIT 5",
+            [v.split()[-1] + "7" for v in existing],
+        ),
+    }
+
+
+def run(sizes, probes_per_size):
+    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+    results = []
+    try:
+        with driver.session() as session:
+            for size in sizes:
+                _reset(session)
+                session.run(
+                    f"UNWIND range(0, $n - 1) AS i CREATE (:{LABEL} {{name: 'Entity ' + i}})", n=size
+                ).consume()
+                probes = [f"New Entity {size}-{i}" for i in range(probes_per_size)]
+                without = _measure(session, size, probes)
+
+                session.run(f"MATCH (n:{LABEL}) WHERE n.name STARTS WITH 'New Entity' DELETE n").consume()
+                session.run(
+                    f"CREATE CONSTRAINT bench_name_unique IF NOT EXISTS FOR (n:{LABEL}) REQUIRE n.name IS UNIQUE"
+                ).consume()
+                session.run(f"CREATE TEXT INDEX bench_name_text IF NOT EXISTS FOR (n:{LABEL}) ON (n.name)").consume()
+                session.run("CALL db.awaitIndexes(300)").consume()
+                with_schema = _measure(session, size, [p + " b" for p in probes])
+
+                results.append({"nodes": size, "without_schema": without, "with_schema": with_schema})
+                print(json.dumps(results[-1]))
+            _reset(session)
+    finally:
+        driver.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--out", default="schema_bench.json")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.probes)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Wrote {args.out}")
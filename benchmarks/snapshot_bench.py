@@ -0,0 +1,77 @@
+"""
+Warming a new graph from a snapshot (services/snapshot.py) versus
+re-extracting it: builds synthetic corpora (benchmarks/corpus.py) with the
+stub LLM into the in-memory graph, exports a snapshot, imports it into a
+fresh graph and checks that both hold the same edges and aliases. Snapshot
+size is compared with the same facts as JSON triples.
+
+    python -m benchmarks.snapshot_bench --sizes 1000 10000 --rtt 0.001
+"""
+import os
+
+os.environ.setdefault("KG_LLM_BACKEND", "stub")
+# The stub has no provider limits to respect
+os.environ.setdefault("KG_LLM_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("KG_LLM_TOKENS_PER_MINUTE", "0")
+
+import argparse
+import json
+import logging
+import tempfile
+import time
+
+from benchmarks.corpus import make_corpus
+from benchmarks.memory_graph import memory_driver
+from services.kg_service import kg_service
+from services.snapshot import export_snapshot, import_snapshot
+from services.text_extractor import iter_chunks
+
+
+def _facts(driver):
+    edges = {(h, r, t) for (h, r), tails in driver.edges.items() for t in tails}
+    aliases = {(e, a) for e, names in driver.aliases.items() for a in names}
+    return edges, aliases
+
+
+def run_size(size, rtt, directory):
+    kg = kg_service(memory_driver(rtt=rtt))
+    kg.extraction_cache = None
+    start = time.perf_counter()
+    kg.run_build(list(iter_chunks([make_corpus(size)[0]])))
+    build_seconds = time.perf_counter() - start
+    edges, aliases = _facts(kg.driver)
+
+    path = os.path.join(directory, f"graph_{size}.npz")
+    exported = export_snapshot(kg.driver, path)
+    target = memory_driver(rtt=rtt)
+    imported = import_snapshot(target, path)
+    json_bytes = len(json.dumps([list(e) for e in sorted(edges)] + [list(a) for a in sorted(aliases)]).encode())
+
+    return {
+        "size": size,
+        "edges": len(edges),
+        "aliases": len(aliases),
+        "build_seconds": round(build_seconds, 3),
+        "export_seconds": exported["seconds"],
+        "import_seconds": imported["seconds"],
+        "import_round_trips": imported["round_trips"],
+        "snapshot_bytes": exported["bytes"],
+        "json_bytes": json_bytes,
+        "bytes_per_edge": round(exported["bytes"] / max(1, len(edges)), 2),
+        "round_trip_equal": _facts(target) == (edges, aliases),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="facts per corpus")
+    parser.add_argument("--rtt", type=float, default=0.001, help="seconds added per graph statement")
+    args = parser.parse_args()
+
+    logging.getLogger("OmniAI").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        print(json.dumps([run_size(size, args.rtt, directory) for size in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
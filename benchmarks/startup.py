@@ -0,0 +1,109 @@
+"""
+Cold-start cost of the app: each stage runs in a fresh interpreter under
+`python -X importtime`, reporting wall time, total import time, the slowest
+modules (self time) and import time per top-level package.
+
+Stages:
+- first_paint: the modules app.py imports at the top, before the page is drawn
+  (read from app.py itself, so the list stays current)
+- kg_service: what the first kg_service() adds (graph, pipeline, LLM gateway)
+- llm_client: building the LLM backend, done on the first LLM call
+- neo4j_driver: creating the pooled driver, done on the first graph access
+
+    python -m benchmarks.startup --repeat 5 --top 15
+    KG_LLM_BACKEND=groq python -m benchmarks.startup   # include the real provider client
+"""
+import os
+
+os.environ.setdefault("KG_LLM_BACKEND", "stub")
+
+import argparse
+import ast
+import json
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def first_paint_imports(path=os.path.join(ROOT, "app.py")):
+    """Top-level import statements of app.py, in order, as source lines."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def stages():
+    paint = first_paint_imports()
+    return {
+        "first_paint": paint,
+        "kg_service": paint + ["from services.kg_service import kg_service"],
+        "llm_client": paint + ["from utils.llm import llm", "llm.backend"],
+        "neo4j_driver": paint + ["from utils.db import get_driver", "get_driver()"],
+    }
+
+
+def _run(statements):
+    code = "\n".join(statements)
+    start = time.perf_counter()
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    modules = []
+    for line in done.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            modules.append({"module": m.group(4), "self_us": int(m.group(1)), "cumulative_us": int(m.group(2)),
+                            "depth": len(m.group(3)) // 2})
+    error = done.stderr.strip().splitlines()[-1] if done.returncode else None
+    return wall, modules, error
+
+
+def measure(statements, repeat, top, baseline=None):
+    """Fastest of `repeat` runs; `baseline` modules (already imported by an earlier stage) are left out."""
+    runs = [_run(statements) for _ in range(max(1, repeat))]
+    wall, modules, error = min(runs, key=lambda run: run[0])
+    new = [m for m in modules if m["module"] not in (baseline or set())]
+    packages = defaultdict(int)
+    for m in new:
+        packages[m["module"].split(".")[0]] += m["self_us"]
+    return {
+        "wall_ms": round(wall * 1000, 1),
+        "import_ms": round(sum(m["self_us"] for m in modules) / 1000, 1),
+        "added_import_ms": round(sum(m["self_us"] for m in new) / 1000, 1),
+        "modules": len(modules),
+        "error": error,
+        "slowest": [
+            {"module": m["module"], "self_ms": round(m["self_us"] / 1000, 1)}
+            for m in sorted(new, key=lambda m: m["self_us"], reverse=True)[:top]
+        ],
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }, {m["module"] for m in modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is reported")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--stage", action="append", help="only these stages (default: all)")
+    args = parser.parse_args()
+
+    report, first_paint = {}, None
+    for name, statements in stages().items():
+        if args.stage and name not in args.stage:
+            continue
+        report[name], modules = measure(statements, args.repeat, args.top, first_paint)
+        if name == "first_paint":
+            first_paint = modules
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
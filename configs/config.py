@@ -7,4 +7,110 @@ NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USERNAME")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
-USE_NEO4J = bool(NEO4J_URI and NEO4J_USER and NEO4J_PASSWORD)
\ No newline at end of file
+USE_NEO4J = bool(NEO4J_URI and NEO4J_USER and NEO4J_PASSWORD)
+
+# Ingestion: group triples by relation type and write them with UNWIND batches
+BULK_INSERT = os.getenv("KG_BULK_INSERT", "true").lower() == "true"
+BULK_BATCH_SIZE = int(os.getenv("KG_BULK_BATCH_SIZE", "500"))
+
+# Pipelined build: concurrent LLM extraction feeding one batched writer
+BUILD_CONCURRENCY = int(os.getenv("KG_BUILD_CONCURRENCY", "4"))
+BUILD_QUEUE_SIZE = int(os.getenv("KG_BUILD_QUEUE_SIZE", "8"))
+BUILD_CHUNK_TIMEOUT = float(os.getenv("KG_BUILD_CHUNK_TIMEOUT", "120"))
+
+# Extraction cache: parsed LLM triples keyed by chunk/prompt/model hash
+CACHE_ENABLED = os.getenv("KG_CACHE_ENABLED", "true").lower() == "true"
+CACHE_PATH = os.getenv("KG_CACHE_PATH", ".cache/extraction.sqlite3")
+CACHE_MAX_ENTRIES = int(os.getenv("KG_CACHE_MAX_ENTRIES", "5000"))
+CACHE_TTL_SECONDS = int(os.getenv("KG_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Question-to-Cypher template cache
+QUERY_CACHE_SIZE = int(os.getenv("KG_QUERY_CACHE_SIZE", "256"))
+
+# Incremental builds: tag facts by source/chunk and only ingest changed chunks
+INCREMENTAL_BUILD = os.getenv("KG_INCREMENTAL_BUILD", "true").lower() == "true"
+DELETE_BATCH_SIZE = int(os.getenv("KG_DELETE_BATCH_SIZE", "1000"))
+
+# Create uniqueness constraints and indexes when kg_service starts
+SCHEMA_BOOTSTRAP = os.getenv("KG_SCHEMA_BOOTSTRAP", "true").lower() == "true"
+
+# Graph view: edges fetched per page for the main view and entity neighborhoods
+GRAPH_PAGE_SIZE = int(os.getenv("KG_GRAPH_PAGE_SIZE", "200"))
+
+# Neo4j connection pool (one driver per process, see utils/db.py)
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "30"))
+NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "1800"))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "15"))
+
+# Text extraction: streamed fetches, sentence-packed chunks sized to the extraction call's token budget.
+# CHUNK_MAX_TOKENS caps the budget (0 = use the whole budget); the budget is the model window minus the
+# prompt template and the output expected per input token (EXTRACTION_OUTPUT_RATIO).
+CHUNK_MAX_TOKENS = int(os.getenv("KG_CHUNK_MAX_TOKENS", "0"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("KG_CHUNK_OVERLAP_TOKENS", "0"))
+CHUNK_MIN_TOKENS = int(os.getenv("KG_CHUNK_MIN_TOKENS", "200"))
+LLM_CONTEXT_TOKENS = int(os.getenv("KG_LLM_CONTEXT_TOKENS", "8192"))
+EXTRACTION_OUTPUT_RATIO = float(os.getenv("KG_EXTRACTION_OUTPUT_RATIO", "1.0"))
+# Small chunks are packed into one extraction call, up to this many per call (1 = one chunk per call)
+EXTRACTION_BATCH_CHUNKS = int(os.getenv("KG_EXTRACTION_BATCH_CHUNKS", "8"))
+# Prompt versions to pin instead of the newest (services/prompts.py), e.g. "extract=1,cypher=1"
+PROMPT_VERSIONS = dict(
+    pair.strip().split("=", 1) for pair in os.getenv("KG_PROMPT_VERSIONS", "").split(",") if "=" in pair
+)
+TOKENIZER_ENCODING = os.getenv("KG_TOKENIZER_ENCODING", "cl100k_base")
+HTTP_TIMEOUT = float(os.getenv("KG_HTTP_TIMEOUT", "30"))
+
+# Bulk crawl: pooled concurrent fetches with conditional requests
+CRAWL_STATE_PATH = os.getenv("KG_CRAWL_STATE_PATH", ".cache/crawl.sqlite3")
+CRAWL_MAX_WORKERS = int(os.getenv("KG_CRAWL_MAX_WORKERS", "8"))
+CRAWL_PER_HOST = int(os.getenv("KG_CRAWL_PER_HOST", "2"))
+CRAWL_RETRIES = int(os.getenv("KG_CRAWL_RETRIES", "3"))
+CRAWL_BACKOFF = float(os.getenv("KG_CRAWL_BACKOFF", "0.5"))
+# Longest wait honoured from a server's Retry-After, in seconds
+CRAWL_MAX_RETRY_AFTER = float(os.getenv("KG_CRAWL_MAX_RETRY_AFTER", "30"))
+
+# Streamed extraction: triples handed to the writer per batch while the LLM is still answering
+STREAM_BATCH_SIZE = int(os.getenv("KG_STREAM_BATCH_SIZE", "25"))
+
+# Generated Cypher (services/query_guard.py): server-side timeout in seconds, rows per result page,
+# cap on rows across all pages, and the EXPLAIN row estimate above which a query is rejected (0 = no EXPLAIN)
+QUERY_TIMEOUT = float(os.getenv("KG_QUERY_TIMEOUT", "10"))
+QUERY_PAGE_SIZE = int(os.getenv("KG_QUERY_PAGE_SIZE", "50"))
+QUERY_MAX_ROWS = int(os.getenv("KG_QUERY_MAX_ROWS", "1000"))
+QUERY_MAX_ESTIMATED_ROWS = int(os.getenv("KG_QUERY_MAX_ESTIMATED_ROWS", "100000"))
+
+# Local query path: answer one/two-hop relation lookups from an in-memory adjacency index
+LOCAL_QUERY = os.getenv("KG_LOCAL_QUERY", "true").lower() == "true"
+
+# LLM backend: "groq" (default) or "stub", a deterministic offline model for benchmarks
+LLM_BACKEND = os.getenv("KG_LLM_BACKEND", "groq").lower()
+# LLM gateway: provider rate limits (0 = unlimited), retries with jittered backoff, per-call timeout
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("KG_LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("KG_LLM_TOKENS_PER_MINUTE", "15000"))
+LLM_RETRIES = int(os.getenv("KG_LLM_RETRIES", "5"))
+LLM_BACKOFF = float(os.getenv("KG_LLM_BACKOFF", "1.0"))
+LLM_TIMEOUT = float(os.getenv("KG_LLM_TIMEOUT", "60"))
+LLM_COALESCE = os.getenv("KG_LLM_COALESCE", "true").lower() == "true"
+STUB_LLM_LATENCY = float(os.getenv("KG_STUB_LLM_LATENCY", "0"))
+STUB_LLM_TOKEN_LATENCY = float(os.getenv("KG_STUB_LLM_TOKEN_LATENCY", "0"))
+STUB_LLM_REQUESTS_PER_MINUTE = int(os.getenv("KG_STUB_LLM_REQUESTS_PER_MINUTE", "0"))
+
+# Tracing: JSONL span/trace file, Prometheus /metrics port (0 = off), Streamlit debug panel
+TRACE_FILE = os.getenv("KG_TRACE_FILE", "")
+METRICS_PORT = int(os.getenv("KG_METRICS_PORT", "0"))
+DEBUG_PANEL = os.getenv("KG_DEBUG_PANEL", "false").lower() == "true"
+
+# Background ingestion: SQLite job queue drained by `python -m services.worker run`
+BACKGROUND_JOBS = os.getenv("KG_BACKGROUND_JOBS", "false").lower() == "true"
+JOB_DB_PATH = os.getenv("KG_JOB_DB_PATH", ".cache/jobs.sqlite3")
+JOB_UPLOAD_DIR = os.getenv("KG_JOB_UPLOAD_DIR", ".cache/uploads")
+JOB_WORKERS = int(os.getenv("KG_JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("KG_JOB_POLL_SECONDS", "1.0"))
+JOB_STALE_SECONDS = float(os.getenv("KG_JOB_STALE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("KG_JOB_MAX_ATTEMPTS", "3"))
+# LLM rate limits are one budget for the app and every worker process, kept in this SQLite file ("" = per process)
+LLM_LIMITS_DB = os.getenv("KG_LLM_LIMITS_DB", JOB_DB_PATH)
+
+# Graph snapshots (services/snapshot.py): entities read per export page, rows written per import transaction
+SNAPSHOT_PAGE_SIZE = int(os.getenv("KG_SNAPSHOT_PAGE_SIZE", "5000"))
+SNAPSHOT_WRITE_ROWS = int(os.getenv("KG_SNAPSHOT_WRITE_ROWS", "20000"))
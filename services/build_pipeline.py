@@ -0,0 +1,232 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from utils.logger import logger
+from utils import metrics
+from configs.config import BUILD_CONCURRENCY, BUILD_QUEUE_SIZE, BUILD_CHUNK_TIMEOUT
+
+_DONE = object()
+
+
+class _ChunkError(Exception):
+    """Carries the failed chunk's tag back from the worker thread."""
+
+    def __init__(self, tag):
+        super().__init__(tag)
+        self.tag = tag
+
+
+class build_pipeline:
+    """
+    Run LLM extraction for many chunks concurrently and feed the results
+    to a single writer thread through a bounded queue.
+
+    extract_fn(chunk) -> (triples, alias_map)
+    write_fn(triples, alias_map[, tag]) -> any
+
+    With streaming=True, extract_fn is called as extract_fn(chunk, emit) and
+    must hand every partial batch to emit(triples, alias_map) itself; its
+    return value is then not written again.
+
+    When run() is given tags, each chunk's tag is passed on to write_fn and
+    the tags of chunks that failed are reported in stats["failed_tags"].
+    A chunk that times out is failed; anything it emits afterwards, or that
+    is still queued, is dropped instead of written. The timeout counts only
+    the chunk's own working time: its clock starts when a worker picks it up
+    and stops while the LLM gateway holds it back for rate limits. A timed-out
+    extraction still occupies its worker thread, so no new chunk is started
+    in its place until that thread is free.
+    on_progress(finished, total) is called from the calling thread every time
+    a chunk's extraction finishes, fails or times out.
+
+    With batched=True (streaming only) every item passed to run() is a list of
+    chunks extracted in one call, tags are lists of per-chunk tags, and emit
+    takes a third argument: the index in the batch of the chunk the triples
+    came from. Stats and progress still count chunks.
+    """
+
+    def __init__(self, extract_fn, write_fn, concurrency=BUILD_CONCURRENCY,
+                 queue_size=BUILD_QUEUE_SIZE, chunk_timeout=BUILD_CHUNK_TIMEOUT, streaming=False, batched=False):
+        if batched and not streaming:
+            raise ValueError("batched extraction must stream its results through emit")
+        self.extract_fn = extract_fn
+        self.streaming = streaming
+        self.batched = batched
+        self.write_fn = write_fn
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(1, queue_size)
+        self.chunk_timeout = chunk_timeout
+
+    def run(self, chunks, tags=None, on_progress=None):
+        """Process all chunks and return per-stage timings and counters."""
+        stats = {
+            "chunks": 0, "triples": 0, "failed_chunks": 0, "failed_writes": 0,
+            "extract_seconds": 0.0, "write_seconds": 0.0, "queue_wait_seconds": 0.0,
+            "failed_tags": [],
+        }
+        tags = list(tags) if tags is not None else None
+        if hasattr(chunks, "__len__"):
+            self._total = sum(map(len, chunks)) if self.batched else len(chunks)
+        else:
+            self._total = None
+        self._finished = 0
+        self._on_progress = on_progress
+        lock = threading.Lock()
+        self._stats, self._lock = stats, lock
+        results = queue.Queue(maxsize=self.queue_size)
+        self._closed = threading.Event()
+        writer = threading.Thread(target=metrics.bind(self._write_loop), args=(results, stats, lock), daemon=True)
+
+        start = time.perf_counter()
+        writer.start()
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="kg-extract")
+        started = {}
+        self._stuck = set()  # timed-out extractions still running on a worker
+        try:
+            for i, chunk in enumerate(chunks):
+                stats["chunks"] += len(chunk) if self.batched else 1
+                tag = tags[i] if tags is not None else None
+                # Backpressure: never have more than `concurrency` calls in flight
+                while len(started) + len(self._stuck) >= self.concurrency:
+                    self._drain(started, results, stats, lock)
+                clock, timed_out = metrics.work_clock(), threading.Event()
+                future = pool.submit(metrics.bind(self._extract), chunk, tag, results, clock, timed_out)
+                started[future] = (clock, tag, len(chunk) if self.batched else 1, timed_out)
+            while started:
+                self._drain(started, results, stats, lock)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            results.put(_DONE)
+            writer.join()
+            # Timed-out extractions may still be running; drop whatever they emit now
+            self._closed.set()
+
+        stats["wall_seconds"] = time.perf_counter() - start
+        for key in ("extract_seconds", "write_seconds", "queue_wait_seconds", "wall_seconds"):
+            stats[key] = round(stats[key], 4)
+        logger.info(
+            f"🚀 Pipelined build: {stats['chunks']} chunks, {stats['triples']} triples, "
+            f"{stats['failed_chunks']} failed in {stats['wall_seconds']}s "
+            f"(extract {stats['extract_seconds']}s, write {stats['write_seconds']}s)"
+        )
+        return stats
+
+    def _extract(self, chunk, tag, results, clock, timed_out):
+        with metrics.timed_work(clock):
+            return self._extract_timed(chunk, tag, results, timed_out)
+
+    def _extract_timed(self, chunk, tag, results, timed_out):
+        t0 = time.perf_counter()
+        try:
+            if self.batched:
+                self.extract_fn(chunk, lambda triples, alias_map, index: self._emit(
+                    results, (triples, alias_map, tag[index] if tag is not None else None, timed_out)
+                ))
+                return [], {}, tag, time.perf_counter() - t0
+            if self.streaming:
+                # Partial batches go straight to the writer; nothing left to queue afterwards
+                self.extract_fn(chunk, lambda triples, alias_map: self._emit(
+                    results, (triples, alias_map, tag, timed_out)
+                ))
+                return [], {}, tag, time.perf_counter() - t0
+            triples, alias_map = self.extract_fn(chunk)
+        except Exception as e:
+            raise _ChunkError(tag) from e
+        return triples, alias_map, tag, time.perf_counter() - t0
+
+    def _emit(self, results, item):
+        t0 = time.perf_counter()
+        while not self._closed.is_set() and not item[3].is_set():
+            try:
+                results.put(item, timeout=1.0)
+            except queue.Full:
+                continue
+            waited = time.perf_counter() - t0
+            with self._lock:
+                self._stats["queue_wait_seconds"] += waited
+            metrics.observe("pipeline.queue_wait", waited)
+            return
+
+    def _drain(self, started, results, stats, lock):
+        """Wait for at least one extraction to finish (or time out) and queue it for writing."""
+        done, _ = wait(list(started) + list(self._stuck), timeout=1.0, return_when=FIRST_COMPLETED)
+        self._stuck -= done
+        for future in done:
+            if future not in started:
+                continue
+            _, _, size, _ = started.pop(future)
+            self._progress(size)
+            try:
+                triples, alias_map, tag, seconds = future.result()
+            except _ChunkError as e:
+                logger.error(f"⚠️ Chunk extraction failed: {e.__cause__}")
+                self._fail(stats, e.tag, size)
+                continue
+            with lock:
+                stats["extract_seconds"] += seconds
+            if not triples:
+                continue
+            t0 = time.perf_counter()
+            results.put((triples, alias_map, tag, None))
+            waited = time.perf_counter() - t0
+            with lock:
+                stats["queue_wait_seconds"] += waited
+            metrics.observe("pipeline.queue_wait", waited)
+
+        if self.chunk_timeout:
+            for future, (clock, tag, size, timed_out) in list(started.items()):
+                if clock.busy_seconds() > self.chunk_timeout:
+                    # The thread cannot be interrupted; drop its result (and anything it streams) instead
+                    timed_out.set()
+                    if not future.cancel():
+                        self._stuck.add(future)
+                    del started[future]
+                    self._progress(size)
+                    self._fail(stats, tag, size)
+                    logger.error(f"⏱️ Chunk extraction timed out after {self.chunk_timeout}s")
+
+    def _fail(self, stats, tag, size):
+        stats["failed_chunks"] += size
+        if tag is None:
+            return
+        if self.batched:
+            stats["failed_tags"] += [t for t in tag if t is not None]
+        else:
+            stats["failed_tags"].append(tag)
+
+    def _progress(self, size=1):
+        self._finished += size
+        if self._on_progress:
+            try:
+                self._on_progress(self._finished, self._total)
+            except Exception as e:
+                logger.warning(f"⚠️ Progress callback failed: {e}")
+
+    def _write_loop(self, results, stats, lock):
+        while True:
+            item = results.get()
+            if item is _DONE:
+                return
+            triples, alias_map, tag, timed_out = item
+            if timed_out is not None and timed_out.is_set():
+                # Emitted before its chunk timed out, but the chunk is already recorded as failed
+                metrics.incr("pipeline_late_writes_dropped")
+                continue
+            t0 = time.perf_counter()
+            try:
+                if tag is None:
+                    self.write_fn(triples, alias_map)
+                else:
+                    self.write_fn(triples, alias_map, tag)
+                with lock:
+                    stats["triples"] += len(triples)
+            except Exception as e:
+                logger.error(f"❌ Failed to write triples: {e}")
+                with lock:
+                    stats["failed_writes"] += 1
+                    if tag is not None:
+                        stats["failed_tags"].append(tag)
+            with lock:
+                stats["write_seconds"] += time.perf_counter() - t0
@@ -0,0 +1,151 @@
+import time
+from collections import defaultdict
+
+from utils.logger import logger
+from utils.text_cleaner import text_cleaner
+from configs.config import BULK_BATCH_SIZE
+
+# One statement per relation type: the type cannot be a parameter in Cypher,
+# everything else travels in $rows.
+TRIPLE_QUERY = """
+    UNWIND $rows AS row
+    MERGE (h:ENTITY {{name: row.head}})
+    MERGE (t:ENTITY {{name: row.tail}})
+    MERGE (h)-[:`{rel}`]->(t)
+"""
+
+ALIAS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (e:ENTITY {name: row.entity})
+    MERGE (alias:ALIAS {name: row.alias})
+    MERGE (alias)-[:ALIAS_OF]->(e)
+"""
+
+# Incremental mode: every node and relationship also keeps the list of
+# "<source>#<chunk hash>" tags that produced it (see services/graph_sync.py).
+_ADD_TAG = "{var}.chunks = CASE WHEN $tag IN coalesce({var}.chunks, []) " \
+           "THEN {var}.chunks ELSE coalesce({var}.chunks, []) + $tag END"
+
+TAGGED_TRIPLE_QUERY = """
+    UNWIND $rows AS row
+    MERGE (h:ENTITY {{name: row.head}})
+    SET """ + _ADD_TAG.format(var="h") + """
+    MERGE (t:ENTITY {{name: row.tail}})
+    SET """ + _ADD_TAG.format(var="t") + """
+    MERGE (h)-[r:`{rel}`]->(t)
+    SET """ + _ADD_TAG.format(var="r") + """
+"""
+
+TAGGED_ALIAS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (e:ENTITY {name: row.entity})
+    MERGE (alias:ALIAS {name: row.alias})
+    SET """ + _ADD_TAG.format(var="alias") + """
+    MERGE (alias)-[a:ALIAS_OF]->(e)
+    SET """ + _ADD_TAG.format(var="a") + """
+"""
+
+# One (:CHUNK {tag}) node per tag lists the ENTITY and ALIAS names it tagged, so
+# removing a chunk starts from those nodes instead of scanning every fact
+CHUNK_INDEX_QUERY = """
+    MERGE (c:CHUNK {tag: $tag})
+    SET c.entities = coalesce(c.entities, []) + [n IN $entities WHERE NOT n IN coalesce(c.entities, [])],
+        c.aliases = coalesce(c.aliases, []) + [n IN $aliases WHERE NOT n IN coalesce(c.aliases, [])]
+"""
+
+
+def relation_type(relation) -> str:
+    """Sanitize a relation the same way insert_triples always has."""
+    return text_cleaner(str(relation)).upper().replace(" ", "_")
+
+
+def group_triples(triples):
+    """Group (head, relation, tail) triples into UNWIND rows keyed by relation type."""
+    groups = defaultdict(list)
+    for head, relation, tail in triples:
+        rel = relation_type(relation)
+        if not rel:
+            continue
+        groups[rel].append({"head": head, "tail": tail})
+    return groups
+
+
+def alias_rows(alias_map):
+    """Flatten {entity: [aliases]} into unique UNWIND rows."""
+    rows, seen = [], set()
+    for entity, aliases in (alias_map or {}).items():
+        for alias in aliases or []:
+            if not alias or (entity, alias) in seen:
+                continue
+            seen.add((entity, alias))
+            rows.append({"entity": entity, "alias": alias})
+    return rows
+
+
+def _batches(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+class bulk_writer:
+    """
+    Write triples and aliases with one UNWIND statement per relation type,
+    all inside a single explicit write transaction.
+    """
+
+    def __init__(self, driver, batch_size=BULK_BATCH_SIZE):
+        self.driver = driver
+        self.batch_size = max(1, batch_size)
+        self.totals = {"rows": 0, "round_trips": 0, "seconds": 0.0, "writes": 0}
+
+    def write(self, triples, alias_map=None, tag=None):
+        """
+        Write one batch and return its stats (rows, round_trips, seconds, rows_per_sec).
+        If `tag` is given, every written node and relationship is tagged with it.
+        """
+        return self.write_groups(group_triples(triples), alias_rows(alias_map), tag)
+
+    def write_groups(self, groups, aliases, tag=None):
+        """Like write(), for rows already grouped by relation type ({rel: [{head, tail}]}, [{entity, alias}])."""
+        rows = sum(len(r) for r in groups.values()) + len(aliases)
+
+        start = time.perf_counter()
+        with self.driver.session() as session:
+            round_trips = session.execute_write(self._write_tx, groups, aliases, tag)
+        elapsed = time.perf_counter() - start
+
+        stats = {
+            "rows": rows,
+            "relation_types": len(groups),
+            "round_trips": round_trips,
+            "seconds": round(elapsed, 4),
+            "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        self.totals["rows"] += rows
+        self.totals["round_trips"] += round_trips
+        self.totals["seconds"] += elapsed
+        self.totals["writes"] += 1
+        logger.info(
+            f"📦 Bulk insert: {rows} rows in {round_trips} round trips "
+            f"({stats['rows_per_sec']} rows/sec)"
+        )
+        return stats
+
+    def _write_tx(self, tx, groups, aliases, tag=None):
+        # Entities first, aliases after, so the alias MATCH always finds its entity
+        triple_query = TAGGED_TRIPLE_QUERY if tag else TRIPLE_QUERY
+        alias_query = TAGGED_ALIAS_QUERY if tag else ALIAS_QUERY
+        round_trips = 0
+        for rel, rows in groups.items():
+            for batch in _batches(rows, self.batch_size):
+                tx.run(triple_query.format(rel=rel), rows=batch, tag=tag).consume()
+                round_trips += 1
+        for batch in _batches(aliases, self.batch_size):
+            tx.run(alias_query, rows=batch, tag=tag).consume()
+            round_trips += 1
+        if tag and (groups or aliases):
+            entities = {name for rows in groups.values() for row in rows for name in (row["head"], row["tail"])}
+            tx.run(CHUNK_INDEX_QUERY, tag=tag, entities=sorted(entities),
+                   aliases=sorted({row["alias"] for row in aliases})).consume()
+            round_trips += 1
+        return round_trips
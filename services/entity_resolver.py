@@ -0,0 +1,204 @@
+import re
+import threading
+from collections import defaultdict
+
+from utils.logger import logger
+
+_DASHES = re.compile(r"[–—−‐‑]")
+_KEY_STRIP = re.compile(r"[.,'\"’]")
+_STOP_TOKENS = {"the", "of", "and", "a", "an"}
+_MAX_POSTING = 1000  # tokens shared by more entities than this are useless for blocking
+_SPLIT = re.compile(r"[\s\-]+")
+_CONJUNCTIONS = {"&", "and", "+"}
+# A name ending in (or containing) one of these is an organization or place, never a longer form of a person
+_ORG_SUFFIXES = {
+    "inc", "corp", "corporation", "co", "company", "ltd", "llc", "plc", "group", "foundation", "trust",
+    "institute", "university", "college", "school", "society", "association", "bank", "labs", "studios",
+    "times", "post", "news", "city", "county", "state", "province", "district", "island", "river",
+    "street", "airport", "station", "park", "museum", "hospital", "club", "team", "party", "fc",
+}
+
+
+def normalize_name(name) -> str:
+    """Same rules the generate_query prompt asks for: ASCII hyphens, no extra whitespace."""
+    name = _DASHES.sub("-", str(name))
+    return re.sub(r"\s+", " ", name).strip()
+
+
+def name_key(name) -> str:
+    return _KEY_STRIP.sub("", normalize_name(name)).casefold()
+
+
+def name_tokens(key: str):
+    return frozenset(t for t in _SPLIT.split(key) if t and t not in _STOP_TOKENS)
+
+
+def _ordered_tokens(key: str):
+    return [t for t in _SPLIT.split(key) if t and t not in _STOP_TOKENS]
+
+
+def _token_match(a, b):
+    # "f" (from "F.") matches "fitzgerald"
+    return a == b or (len(a) == 1 and b.startswith(a)) or (len(b) == 1 and a.startswith(b))
+
+
+def same_entity(a_key: str, b_key: str) -> bool:
+    """
+    Whether two multi-word names are spellings of one entity: same first and
+    last token, and every extra token of the longer one is a middle name or
+    initial ("Elon Musk" ~ "Elon Reeve Musk" ~ "Elon R. Musk"). Names joining
+    two parties ("Bill & Melinda Gates") or carrying an organization/place
+    word the other lacks ("New York Times", "Gates Foundation") never match.
+    """
+    short, long = sorted((_ordered_tokens(a_key), _ordered_tokens(b_key)), key=len)
+    if len(short) < 2:
+        return False
+    raw = set(_SPLIT.split(a_key)) | set(_SPLIT.split(b_key))
+    if raw & _CONJUNCTIONS or (_ORG_SUFFIXES & set(long)) - set(short):
+        return False
+    if not (_token_match(short[0], long[0]) and _token_match(short[-1], long[-1])):
+        return False
+    # The shorter name's middle tokens must appear, in order, among the longer one's
+    middle = iter(long[1:-1])
+    return all(any(_token_match(token, other) for other in middle) for token in short[1:-1])
+
+
+class entity_resolver:
+    """
+    In-memory index that maps every mention to one canonical ENTITY name.
+
+    - exact map: normalized key of every entity name and alias -> canonical name
+    - token blocking: token -> canonical names containing it. Entities sharing
+      at least two tokens with a multi-word mention are only candidates; the
+      mention resolves to the single candidate that passes same_entity, so
+      "Elon Reeve Musk" finds "Elon Musk" but "New York Times" stays apart
+      from "New York"
+    Single-word mentions only resolve through exact names or aliases ("Musk"
+    needs to be a known alias), which keeps "Paris" away from "Paris Hilton".
+    """
+
+    def __init__(self):
+        self._canonical = {}
+        self._ambiguous = set()
+        self._postings = defaultdict(set)
+        self._entity_tokens = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._entity_tokens)
+
+    def clear(self):
+        with self._lock:
+            self._canonical.clear()
+            self._ambiguous.clear()
+            self._postings.clear()
+            self._entity_tokens.clear()
+            self.loaded = False
+
+    def load(self, driver):
+        """Index the entities and aliases already in Neo4j."""
+        with driver.session() as session:
+            result = session.run(
+                """
+                MATCH (e:ENTITY)
+                OPTIONAL MATCH (a:ALIAS)-[:ALIAS_OF]->(e)
+                RETURN e.name AS name, collect(a.name) AS aliases
+                """
+            )
+            with self._lock:
+                for record in result:
+                    self._add_entity(record["name"])
+                    for alias in record["aliases"]:
+                        self._add_alias(alias, record["name"])
+                self.loaded = True
+        logger.info(f"🧩 Entity index loaded: {len(self._entity_tokens)} entities")
+
+    def resolve(self, name):
+        """Return the canonical name for a mention, registering it as a new entity if unknown."""
+        with self._lock:
+            return self._resolve(name)
+
+    def find(self, name):
+        """Canonical name of a known entity or alias, or None. Never registers anything."""
+        key = name_key(name)
+        with self._lock:
+            if key in self._ambiguous:
+                return None
+            return self._canonical.get(key)
+
+    def canonicalize(self, triples, alias_map=None):
+        """
+        Rewrite triples onto canonical names. Variant spellings that were
+        merged into an existing entity are kept as its aliases.
+        """
+        out_triples, out_aliases, seen = [], defaultdict(list), set()
+        with self._lock:
+            for head, aliases in (alias_map or {}).items():
+                canonical = self._resolve(head)
+                for alias in [head, *aliases]:
+                    if name_key(alias) != name_key(canonical):
+                        self._add_alias(alias, canonical)
+                        out_aliases[canonical].append(normalize_name(alias))
+
+            for head, relation, tail in triples:
+                h, t = self._resolve(head), self._resolve(tail)
+                for original, canonical in ((head, h), (tail, t)):
+                    if name_key(original) != name_key(canonical):
+                        out_aliases[canonical].append(normalize_name(original))
+                if (h, relation, t) not in seen:
+                    seen.add((h, relation, t))
+                    out_triples.append((h, relation, t))
+
+        return out_triples, {k: list(dict.fromkeys(v)) for k, v in out_aliases.items()}
+
+    def _resolve(self, name):
+        key = name_key(name)
+        if key in self._canonical and key not in self._ambiguous:
+            return self._canonical[key]
+
+        tokens = name_tokens(key)
+        if len(tokens) >= 2:
+            candidate = self._block(key, tokens)
+            if candidate:
+                self._add_alias(name, candidate)
+                return candidate
+
+        canonical = normalize_name(name)
+        self._add_entity(canonical)
+        return canonical
+
+    def _block(self, key, tokens):
+        hits = defaultdict(int)
+        for token in tokens:
+            posting = self._postings.get(token, ())
+            if len(posting) > _MAX_POSTING:
+                continue
+            for entity in posting:
+                hits[entity] += 1
+        matches = [
+            entity for entity, shared in hits.items()
+            if shared >= 2 and same_entity(key, name_key(entity))
+        ]
+        return matches[0] if len(matches) == 1 else None
+
+    def _add_entity(self, name):
+        key = name_key(name)
+        if name in self._entity_tokens:
+            return
+        self._entity_tokens[name] = name_tokens(key)
+        for token in self._entity_tokens[name]:
+            self._postings[token].add(name)
+        self._set_key(key, name)
+
+    def _add_alias(self, alias, canonical):
+        if alias:
+            self._set_key(name_key(alias), canonical)
+
+    def _set_key(self, key, canonical):
+        current = self._canonical.get(key)
+        if current is None:
+            self._canonical[key] = canonical
+        elif current != canonical:
+            # Same alias claimed by two entities: stop resolving it
+            self._ambiguous.add(key)
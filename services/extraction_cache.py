@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from utils.logger import logger
+from configs.config import CACHE_PATH, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+
+
+def normalize_chunk(text: str) -> str:
+    """Collapse whitespace so re-wrapped copies of the same text share a key."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def cache_key(text: str, prompt_version: str, model: str) -> str:
+    payload = "\x1f".join([prompt_version, model, normalize_chunk(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class extraction_cache:
+    """
+    Persistent SQLite cache of parsed LLM extraction results.
+
+    Keyed by sha256(prompt version, model name, normalized chunk). Entries
+    expire after `ttl` seconds and the least recently used ones are evicted
+    once there are more than `max_entries`.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                key TEXT PRIMARY KEY,
+                triples TEXT NOT NULL,
+                alias_map TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_accessed ON extractions(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return (triples, alias_map) or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT triples, alias_map, created_at FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE extractions SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        triples = [tuple(t) for t in json.loads(row[0])]
+        return triples, json.loads(row[1])
+
+    def put(self, key, triples, alias_map):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(list(triples)), json.dumps(alias_map or {}), now, now),
+            )
+            if self.max_entries:
+                cur = self._conn.execute(
+                    """
+                    DELETE FROM extractions WHERE key IN (
+                        SELECT key FROM extractions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.max_entries,),
+                )
+                self.evictions += max(cur.rowcount, 0)
+            self._conn.commit()
+
+    def purge_expired(self):
+        if not self.ttl:
+            return 0
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM extractions WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            self.evictions += max(cur.rowcount, 0)
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions")
+            self._conn.commit()
+        logger.info("🗑️ Extraction cache cleared")
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": size,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
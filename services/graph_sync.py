@@ -0,0 +1,111 @@
+import hashlib
+import time
+
+from utils.logger import logger
+from configs.config import DELETE_BATCH_SIZE
+from services.extraction_cache import normalize_chunk
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(normalize_chunk(text).encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_tag(source_id: str, text: str) -> str:
+    """Tag stored on every node/relationship a chunk produced: "<source>#<chunk hash>"."""
+    return f"{source_id}#{chunk_hash(text)}"
+
+
+class source_registry:
+    """
+    Track which chunks of which source are already in the graph.
+
+    Each source has one (:SOURCE {id}) node listing its chunk tags. Facts carry
+    the same tags in a `chunks` list property, so removing a chunk or a whole
+    source only touches the facts it produced. Facts shared with another
+    source survive until their last tag is gone. Each tag's (:CHUNK {tag})
+    node names the nodes it tagged (bulk_writer), and a tagged relationship
+    always starts at a node with the same tag, so removal looks those nodes
+    up by name and expands from them instead of scanning the whole graph.
+    """
+
+    # The ENTITY and ALIAS nodes tagged with any of $tags, through the name constraints' indexes
+    _TAGGED_NODES = """
+        MATCH (c:CHUNK) WHERE c.tag IN $tags
+        CALL {{
+            WITH c
+            MATCH (n:ENTITY) WHERE n.name IN coalesce(c.entities, [])
+            RETURN n
+            UNION
+            WITH c
+            MATCH (n:ALIAS) WHERE n.name IN coalesce(c.aliases, [])
+            RETURN n
+        }}
+        WITH DISTINCT n
+    """
+
+    # These statements must run in auto-commit transactions (session.run) so
+    # CALL {} IN TRANSACTIONS can commit in batches.
+    _REMOVE_REL_TAGS = _TAGGED_NODES + """
+        MATCH (n)-[r]->()
+        WHERE r.chunks IS NOT NULL AND any(tag IN r.chunks WHERE tag IN $tags)
+        CALL {{
+            WITH r
+            SET r.chunks = [tag IN r.chunks WHERE NOT tag IN $tags]
+            WITH r WHERE size(r.chunks) = 0
+            DELETE r
+        }} IN TRANSACTIONS OF {batch} ROWS
+    """
+
+    _REMOVE_NODE_TAGS = _TAGGED_NODES + """
+        WHERE n.chunks IS NOT NULL AND any(tag IN n.chunks WHERE tag IN $tags)
+        CALL {{
+            WITH n
+            SET n.chunks = [tag IN n.chunks WHERE NOT tag IN $tags]
+            WITH n WHERE size(n.chunks) = 0
+            DETACH DELETE n
+        }} IN TRANSACTIONS OF {batch} ROWS
+    """
+
+    def __init__(self, driver, batch_size=DELETE_BATCH_SIZE):
+        self.driver = driver
+        self.batch_size = max(1, int(batch_size))
+
+    def known_tags(self, source_id: str):
+        with self.driver.session() as session:
+            record = session.run(
+                "MATCH (s:SOURCE {id: $id}) RETURN s.chunks AS chunks", id=source_id
+            ).single()
+        return set(record["chunks"] or []) if record else set()
+
+    def record(self, source_id: str, tags):
+        with self.driver.session() as session:
+            session.run(
+                """
+                MERGE (s:SOURCE {id: $id})
+                SET s.chunks = $tags, s.updated_at = $now
+                """,
+                id=source_id, tags=sorted(set(tags)), now=time.time(),
+            ).consume()
+
+    def sources(self):
+        with self.driver.session() as session:
+            result = session.run("MATCH (s:SOURCE) RETURN s.id AS id ORDER BY s.updated_at DESC")
+            return [record["id"] for record in result]
+
+    def remove_tags(self, tags):
+        """Strip tags from facts and delete the facts left without any tag."""
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        start = time.perf_counter()
+        with self.driver.session() as session:
+            session.run(self._REMOVE_REL_TAGS.format(batch=self.batch_size), tags=tags).consume()
+            session.run(self._REMOVE_NODE_TAGS.format(batch=self.batch_size), tags=tags).consume()
+            session.run("MATCH (c:CHUNK) WHERE c.tag IN $tags DELETE c", tags=tags).consume()
+        logger.info(f"🧹 Removed facts for {len(tags)} stale chunk(s) in {time.perf_counter() - start:.2f}s")
+
+    def remove_source(self, source_id: str):
+        self.remove_tags(self.known_tags(source_id))
+        with self.driver.session() as session:
+            session.run("MATCH (s:SOURCE {id: $id}) DELETE s", id=source_id).consume()
+        logger.info(f"🗑️ Removed source {source_id}")
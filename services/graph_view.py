@@ -0,0 +1,91 @@
+import threading
+import uuid
+
+
+class graph_view:
+    """
+    Append-only, compact node/edge log for the vis-network component.
+
+    Nodes are sent once as names and referenced by index afterwards; edges are
+    [from_index, to_index, relation]. payload(since) returns only what was added
+    after the first `since` edges, so a browser that already has them only gets
+    the difference.
+    """
+
+    def __init__(self, view_id=None):
+        self.view_id = view_id or uuid.uuid4().hex[:12]
+        self.names = []
+        self.edges = []
+        self._index = {}
+        self._seen = set()
+        self._node_marks = []  # number of nodes known after each edge
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.edges)
+
+    def add_edges(self, triples):
+        """Add (head, relation, tail) triples, skipping ones already present. Returns the number added."""
+        added = 0
+        with self._lock:
+            for head, relation, tail in triples:
+                key = (head, relation, tail)
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+                self.edges.append([self._node(head), self._node(tail), relation])
+                self._node_marks.append(len(self.names))
+                added += 1
+        return added
+
+    def payload(self, since=0):
+        with self._lock:
+            since = max(0, min(since, len(self.edges)))
+            first_node = self._node_marks[since - 1] if since else 0
+            return {
+                "view": self.view_id,
+                "since": since,
+                "nodes": self.names[first_node:],
+                "edges": self.edges[since:],
+            }
+
+    def _node(self, name):
+        name = str(name)
+        if name not in self._index:
+            self._index[name] = len(self.names)
+            self.names.append(name)
+        return self._index[name]
+
+
+def fetch_edges(driver, skip=0, limit=200):
+    """One page of ENTITY edges, ordered by relationship id so pages neither repeat nor skip edges."""
+    with driver.session() as session:
+        result = session.run(
+            """
+            MATCH (h:ENTITY)-[r]->(t:ENTITY)
+            RETURN h.name AS head, type(r) AS relation, t.name AS tail
+            ORDER BY elementId(r)
+            SKIP $skip LIMIT $limit
+            """,
+            skip=skip, limit=limit,
+        )
+        return [(record["head"], record["relation"], record["tail"]) for record in result]
+
+
+def fetch_neighborhood(driver, name, skip=0, limit=50):
+    """One page of the edges touching an entity, as (head, relation, tail) triples."""
+    with driver.session() as session:
+        result = session.run(
+            """
+            MATCH (e:ENTITY {name: $name})-[r]-(o:ENTITY)
+            RETURN startNode(r) = e AS outgoing, type(r) AS relation, o.name AS other
+            ORDER BY relation, other
+            SKIP $skip LIMIT $limit
+            """,
+            name=name, skip=skip, limit=limit,
+        )
+        return [
+            (name, record["relation"], record["other"]) if record["outgoing"]
+            else (record["other"], record["relation"], name)
+            for record in result
+        ]
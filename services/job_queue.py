@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.logger import logger
+from configs.config import JOB_DB_PATH, JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class job_queue:
+    """
+    Persistent ingestion jobs in SQLite, shared by the Streamlit app (which
+    enqueues and polls) and any number of worker processes (which claim and
+    run them). Claiming is a single UPDATE inside an IMMEDIATE transaction,
+    so two workers never get the same job. Running jobs whose heartbeat is
+    older than `stale_after` (a killed worker) go back to the queue, up to
+    `max_attempts` times. Jobs listing the same source id never run at the
+    same time, and run in the order they were queued.
+    """
+
+    def __init__(self, path=JOB_DB_PATH, stale_after=JOB_STALE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_sources (job_id INTEGER NOT NULL, source TEXT NOT NULL, "
+            "PRIMARY KEY (source, job_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_job_sources_job ON job_sources(job_id)")
+
+    def enqueue(self, kind, payload, sources=()):
+        """Add a job that writes the given source ids and return its id."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO jobs (kind, payload, status, created_at) VALUES (?, ?, ?, ?)",
+                    (kind, json.dumps(payload), QUEUED, time.time()),
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO job_sources (job_id, source) VALUES (?, ?)",
+                    [(cursor.lastrowid, source) for source in sources],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.info(f"📥 Queued {kind} job #{cursor.lastrowid}")
+        return cursor.lastrowid
+
+    def claim(self, worker):
+        """
+        Take the oldest queued job for `worker` whose sources no running job
+        or older queued job writes, or None if there is none.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                stale = now - self.stale_after
+                lost = self._conn.execute(
+                    "SELECT kind, payload FROM jobs WHERE status = ? AND heartbeat < ? AND attempts >= ?",
+                    (RUNNING, stale, self.max_attempts),
+                ).fetchall()
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = 'worker lost', finished_at = ? "
+                    "WHERE status = ? AND heartbeat < ? AND attempts >= ?",
+                    (FAILED, now, RUNNING, stale, self.max_attempts),
+                )
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat < ?",
+                    (QUEUED, RUNNING, stale),
+                )
+                row = self._conn.execute(_CLAIMABLE, (QUEUED, RUNNING, QUEUED)).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, "
+                        "started_at = ?, heartbeat = ?, done = 0, total = 0 WHERE id = ?",
+                        (RUNNING, worker, now, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for kind, payload in lost:
+            remove_upload(kind, json.loads(payload))
+        return self.get(row[0]) if row else None
+
+    def progress(self, job_id, done, total):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET done = ?, total = ?, heartbeat = ? WHERE id = ?",
+                (done, total, time.time(), job_id),
+            )
+
+    def heartbeat(self, job_id):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id, result):
+        self._close(job_id, DONE, result=json.dumps(result, default=str))
+
+    def fail(self, job_id, error):
+        self._close(job_id, FAILED, error=str(error))
+
+    def _close(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def recent(self, limit=20):
+        """Newest jobs first."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [_job(row) for row in rows]
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+
+# Oldest queued job none of whose sources is written by a running job or an older queued one
+_CLAIMABLE = """
+    SELECT id FROM jobs AS j
+    WHERE j.status = ? AND NOT EXISTS (
+        SELECT 1 FROM job_sources AS mine
+        JOIN job_sources AS other ON other.source = mine.source AND other.job_id != mine.job_id
+        JOIN jobs AS o ON o.id = other.job_id
+        WHERE mine.job_id = j.id AND (o.status = ? OR (o.status = ? AND o.id < j.id))
+    )
+    ORDER BY id LIMIT 1
+"""
+
+_FIELDS = ["id", "kind", "payload", "status", "done", "total", "attempts", "result", "error", "worker",
+           "created_at", "started_at", "finished_at", "heartbeat"]
+_COLUMNS = ", ".join(_FIELDS)
+
+
+def _job(row):
+    job = dict(zip(_FIELDS, row))
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def remove_upload(kind, payload):
+    """Delete the copy of an uploaded file once its job can no longer run."""
+    if kind != "file":
+        return
+    try:
+        os.remove(payload["path"])
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"⚠️ Could not remove upload {payload['path']}: {e}")
@@ -1,49 +1,71 @@
 from utils.logger import logger
-from utils.llm import llm
-from configs.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from utils.llm import llm, MODEL_NAME
+from configs.config import (
+    BULK_INSERT, CACHE_ENABLED,
+    DELETE_BATCH_SIZE, SCHEMA_BOOTSTRAP, GRAPH_PAGE_SIZE, STREAM_BATCH_SIZE, LOCAL_QUERY, EXTRACTION_BATCH_CHUNKS,
+)
 from utils.text_cleaner import text_cleaner, clean_cypher
-from pyvis.network import Network
-from neo4j import GraphDatabase
+from services.bulk_writer import bulk_writer
+from services.build_pipeline import build_pipeline
+from services.extraction_cache import extraction_cache, cache_key
+from services.query_cache import query_cache
+from services.graph_sync import source_registry, chunk_tag
+from services.schema import ensure_schema, search_names
+from services.graph_view import graph_view, fetch_edges, fetch_neighborhood
+from services.entity_resolver import entity_resolver
+from services.triple_parser import triple_stream_parser, items_to_triples, parse_response, chunk_index
+from services.local_graph import local_graph, answer_stats
+from services.query_guard import run_guarded, query_rejected
+from services import prompts
+from services.prompts import extraction_prompt, batch_extraction_prompt, cypher_prompt
+from utils.db import get_driver
+from utils import metrics
+from services.text_extractor import count_tokens, chunk_budget
 
 import streamlit as st
-import streamlit.components.v1 as components
 import streamlit as st
-import ast
+import time
 
 
 class kg_service:
 
-    def __init__(self):
+    def __init__(self, driver=None):
         try:
-            self.driver = GraphDatabase.driver(
-                NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)
-            )
+            self.driver = driver or get_driver()
             logger.info("✅ Connected to Neo4j.")
         except Exception as e:
             logger.error(f"❌ Failed to establish a connection: {e}")
             self.driver = None
 
+        if self.driver and SCHEMA_BOOTSTRAP:
+            try:
+                ensure_schema(self.driver)
+            except Exception as e:
+                logger.error(f"⚠️ Failed to bootstrap Neo4j schema: {e}")
+        self.writer = bulk_writer(self.driver)
+        self.extraction_cache = extraction_cache() if CACHE_ENABLED else None
+        self.query_cache = query_cache()
+        self.sources = source_registry(self.driver)
+        self.resolver = entity_resolver()
+        self.local_graph = local_graph()
+        self.answer_stats = answer_stats()
+        self.batch_chunks = EXTRACTION_BATCH_CHUNKS
+        self.crawl_state = None  # opened on first removal/reset (services.crawler loads requests and lxml)
+
     # ----------------- Helpers -----------------
     def parse_triples(self, raw_triples: str):
         """Parse triples from LLM response (supports optional alias lists)."""
-        try:
-            triples = ast.literal_eval(raw_triples)
-            if isinstance(triples, list):
-                clean_triples = []
-                alias_map = {}
-                for item in triples:
-                    if len(item) >= 3:
-                        head, relation, tail = item[:3]
-                        clean_triples.append((head, relation, tail))
-
-                        # if 4th element exists, treat it as alias list
-                        if len(item) == 4 and isinstance(item[3], list):
-                            alias_map[head] = item[3]
-                return clean_triples, alias_map
-        except Exception as e:
-            logger.error(f"⚠️ Failed to parse triples: {e}")
-        return [], {}
+        triples, alias_map, stats = parse_response(raw_triples)
+        if stats["malformed"] or stats["recovered"]:
+            logger.warning(
+                f"⚠️ Parsed {stats['items']} triples ({stats['recovered']} repaired, "
+                f"{stats['malformed']} skipped)"
+            )
+        return triples, alias_map
 
+    def search_entities(self, text: str, limit: int = 5):
+        """Partial-name / alias lookup through the full-text index."""
+        return search_names(self.driver, text, limit)
 
     # ----------------- Insert into Neo4j -----------------
     def insert_triples(self, triples, alias_map=None):
@@ -63,182 +85,571 @@ class kg_service:
                 st.warning("⚠️ No triples to insert.")
                 return
 
-            with self.driver.session() as session:
-                for head, relation, tail in triples:
-                    safe_rel = text_cleaner(relation).upper().replace(" ", "_")
-
-                    # Merge main entities
-                    query = f"""
-                        MERGE (h:ENTITY {{name: $head}})
-                        MERGE (t:ENTITY {{name: $tail}})
-                        MERGE (h)-[:{safe_rel}]->(t)
-                    """
-                    session.run(query, head=head, tail=tail)
-
-                    # Add aliases if provided
-                    if alias_map:
-                        for entity, aliases in alias_map.items():
-                            for a in aliases:
-                                alias_query = """
-                                    MATCH (e:ENTITY {name: $entity})
-                                    MERGE (alias:ALIAS {name: $alias})
-                                    MERGE (alias)-[:ALIAS_OF]->(e)
-                                """
-                                session.run(alias_query, entity=entity, alias=a)
+            self.write_triples(triples, alias_map)
 
             st.success(f"✅ Inserted {len(triples)} triples into Neo4j")
-            self.visualize_triples()
 
         except Exception as e:
             st.error(f"❌ Failed to insert triples: {e}")
 
+    def write_triples(self, triples, alias_map=None, tag=None):
+        """
+        Resolve entity mentions to canonical names, then write. No Streamlit
+        calls, so the pipeline's writer thread can use it.
+        """
+        with metrics.span("resolve_entities", triples=len(triples)):
+            if not self.resolver.loaded:
+                self.resolver.load(self.driver)
+            triples, alias_map = self.resolver.canonicalize(triples, alias_map)
+        with metrics.span("neo4j.write", rows=len(triples)) as record:
+            if BULK_INSERT or tag:
+                stats = self.writer.write(triples, alias_map, tag)
+            else:
+                stats = self._insert_triples_per_row(triples, alias_map)
+            record["round_trips"] = stats["round_trips"]
+        metrics.incr("db_round_trips", stats["round_trips"])
+        metrics.incr("triples_written", len(triples))
+        if self.local_graph.loaded:
+            self.local_graph.add(triples)
+        return stats
+
+    def _insert_triples_per_row(self, triples, alias_map=None):
+        """Original one-statement-per-row path, kept for comparison with bulk_writer."""
+        round_trips = 0
+        start = time.perf_counter()
+        with self.driver.session() as session:
+            for head, relation, tail in triples:
+                safe_rel = text_cleaner(relation).upper().replace(" ", "_")
+
+                # Merge main entities
+                query = f"""
+                    MERGE (h:ENTITY {{name: $head}})
+                    MERGE (t:ENTITY {{name: $tail}})
+                    MERGE (h)-[:{safe_rel}]->(t)
+                """
+                session.run(query, head=head, tail=tail)
+                round_trips += 1
+
+                # Add aliases if provided
+                if alias_map:
+                    for entity, aliases in alias_map.items():
+                        for a in aliases:
+                            alias_query = """
+                                MATCH (e:ENTITY {name: $entity})
+                                MERGE (alias:ALIAS {name: $alias})
+                                MERGE (alias)-[:ALIAS_OF]->(e)
+                            """
+                            session.run(alias_query, entity=entity, alias=a)
+                            round_trips += 1
+
+        elapsed = time.perf_counter() - start
+        rows = len(triples)
+        logger.info(
+            f"🐢 Per-row insert: {rows} triples in {round_trips} round trips "
+            f"({round(rows / elapsed, 1) if elapsed > 0 else 0.0} rows/sec)"
+        )
+        return {"rows": rows, "round_trips": round_trips, "seconds": round(elapsed, 4)}
+
     # ----------------- Build KG -----------------
     def build_kg(self, user_input: str):
-        prompt = f"""
-                Extract knowledge triples strictly in JSON list format, including optional aliases:
-                [["Entity1", "RELATION", "Entity2", ["Alias1", "Alias2", ...]], ...]
-
-                Rules:
-                - Output only a valid Python list of lists. Do not add explanations, notes, or extra text.
-                - Each list must contain:
-                    1. Entity1 (title case)
-                    2. Relation (short, uppercase, noun/verb-like)
-                    3. Entity2 (title case or string literal)
-                    4. Optional aliases for Entity1 (list of strings; can be empty if none)
-                - Examples of relations: "BORN_IN", "PROFESSION", "FOUNDED", "KNOWN_FOR", "HEADQUARTERED".
-                - Entity names should be in title case (e.g., "Javed Akhtar", "Apple Inc.").
-                - Entity2 can be a literal value (date, number, string) or another entity.
-                - Format literal values as strings.
-                - Include common variations for aliases, such as first name, last name, or commonly used short names.
-                - If the relation is ambiguous, choose the closest meaningful relation from the examples.
-                - Avoid generic relations like "is" or "has". Use specific relations that describe the fact.
-
-                Text: "{user_input}"
-                """
+        with metrics.trace("build", chunks=1):
+            triples, alias_map = self.extract_triples(user_input)
+            self.insert_triples(triples, alias_map)
+            self.visualize_triples()
+
+    def build_kg_pipelined(self, chunks):
+        """
+        Build the KG from many chunks with concurrent extraction and one batched
+        writer. `chunks` may be a lazy iterator; it is read as the pipeline goes.
+        """
+        with metrics.trace("build", chunks=_size(chunks)):
+            if not self.driver:
+                st.error("❌ Neo4j driver is not initialized. Check URI/user/pass.")
+                return {}
+
+            stats = self.run_build(chunks)
+            if stats["failed_chunks"] or stats["failed_writes"]:
+                st.warning(
+                    f"⚠️ {stats['failed_chunks']} chunk(s) failed extraction and "
+                    f"{stats['failed_writes']} write(s) failed. See logs."
+                )
+            st.success(f"✅ Inserted {stats['triples']} triples from {stats['chunks']} chunks into Neo4j")
+            self.visualize_triples()
+            return stats
+
+    def run_build(self, chunks, on_progress=None):
+        """build_kg_pipelined without any Streamlit calls, for background workers."""
+        before = self.extraction_cache.stats() if self.extraction_cache else None
+        stats = self._run_pipeline(chunks, on_progress=on_progress)
+        if before:
+            after = self.extraction_cache.stats()
+            stats["cache_hits"] = after["hits"] - before["hits"]
+            stats["cache_misses"] = after["misses"] - before["misses"]
+            logger.info(f"🗃️ Extraction cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses")
+        return stats
+
+    def _run_pipeline(self, chunks, tags=None, on_progress=None):
+        """Extract (small chunks packed into shared calls) and write; adds LLM usage to the stats."""
+        if tags is None and _size(chunks) is None:
+            # A stream of chunks is batched as it is read, never held whole
+            batches, batch_tags = (batch for batch, _ in iter_batches(chunks, None, self.batch_chunks)), None
+        else:
+            batches, batch_tags = pack_batches(chunks, tags, self.batch_chunks)
+        # A trace of its own when called outside one, so the usage below is always counted
+        with metrics.trace("pipeline", chunks=_size(chunks), calls=_size(batches)):
+            before = metrics.counters()
+            stats = build_pipeline(self.extract_batch, self.write_triples, streaming=True, batched=True).run(
+                batches, tags=batch_tags, on_progress=on_progress
+            )
+            after = metrics.counters()
+        usage = {key: int(after.get(key, 0) - before.get(key, 0))
+                 for key in ("llm_calls", "prompt_tokens", "output_tokens", "triples_extracted")}
+        stats.update(usage)
+        stats["tokens_per_triple"] = (
+            round((usage["prompt_tokens"] + usage["output_tokens"]) / usage["triples_extracted"], 1)
+            if usage["triples_extracted"] else None
+        )
+        return stats
+
+    def sync_source(self, source_id: str, chunks):
+        """
+        Incrementally bring one source up to date: chunks already in the graph
+        are skipped, chunks that disappeared have their facts removed.
+        """
+        with metrics.trace("build", source=source_id, chunks=_size(chunks)):
+            if not self.driver:
+                st.error("❌ Neo4j driver is not initialized. Check URI/user/pass.")
+                return {}
+
+            stats = self.run_sync(source_id, chunks)
+            if stats["failed_tags"]:
+                st.warning(
+                    f"⚠️ {len(set(stats['failed_tags']))} chunk(s) failed and will be retried on the next build. "
+                    "See logs."
+                )
+            st.success(
+                f"✅ {source_id}: {stats['chunks']} new chunk(s) ingested, "
+                f"{stats['skipped_chunks']} unchanged, {stats['removed_chunks']} removed"
+            )
+            self.visualize_triples()
+            return stats
+
+    def sync_sources(self, sources):
+        """sync_source for many (source_id, chunks) pairs in one pipeline, so their small chunks share calls."""
+        with metrics.trace("build", sources=len(sources)):
+            if not self.driver:
+                st.error("❌ Neo4j driver is not initialized. Check URI/user/pass.")
+                return {}
+
+            stats = self.run_sync_sources(sources)
+            if stats["failed_tags"]:
+                st.warning(
+                    f"⚠️ {len(set(stats['failed_tags']))} chunk(s) failed and will be retried on the next build. "
+                    "See logs."
+                )
+            st.success(
+                f"✅ {len(sources)} source(s): {stats['chunks']} new chunk(s) ingested, "
+                f"{stats['skipped_chunks']} unchanged, {stats['removed_chunks']} removed"
+            )
+            self.visualize_triples()
+            return stats
+
+    def run_sync(self, source_id: str, chunks, on_progress=None):
+        """sync_source without any Streamlit calls, for background workers."""
+        return self.run_sync_sources([(source_id, chunks)], on_progress)
+
+    def run_sync_sources(self, sources, on_progress=None):
+        """
+        Incremental sync of several sources through one pipeline run.
+        Each source's chunks are read once and may be a lazy iterator; only
+        chunks not already in the graph are kept for extraction.
+        stats["failed_sources"] lists the sources with chunks left to retry.
+        """
+        new_chunks, new_tags, owner, recorded = [], [], {}, []
+        stale, skipped = set(), 0
+        for source_id, chunks in sources:
+            tags = set()
+            known = self.sources.known_tags(source_id)
+            for chunk in chunks:
+                tag = chunk_tag(source_id, chunk)
+                tags.add(tag)
+                if tag in known or tag in owner:
+                    skipped += 1
+                    continue
+                owner[tag] = source_id
+                new_chunks.append(chunk)
+                new_tags.append(tag)
+            stale |= known - tags
+            recorded.append((source_id, tags))
+
+        self.sources.remove_tags(stale)
+        if stale:
+            self.resolver.clear()
+            self.local_graph.clear()
+        stats = self._run_pipeline(new_chunks, new_tags, on_progress)
+
+        failed = set(stats["failed_tags"])
+        for source_id, tags in recorded:
+            self.sources.record(source_id, [t for t in tags if t not in failed])
+        stats["failed_sources"] = sorted({owner[tag] for tag in failed if tag in owner})
+        stats["skipped_chunks"] = skipped
+        stats["removed_chunks"] = len(stale)
+        return stats
+
+    def remove_source(self, source_id: str):
+        """Delete only the facts that came from one source."""
+        try:
+            self.sources.remove_source(source_id)
+            self._forget_crawled(source_id)
+            # Deleted entities may still be indexed; reload on the next write
+            self.resolver.clear()
+            self.local_graph.clear()
+            st.info(f"🗑️ Removed all facts from {source_id}")
+        except Exception as e:
+            logger.error(f"⚠️ Failed to remove source {source_id}: {e}")
+            st.error(f"⚠️ Failed to remove source: {e}")
+
+    def _forget_crawled(self, source_id=None):
+        """Drop stored ETag/Last-Modified so removed pages are fetched and ingested again; all of them without a source."""
+        if self.crawl_state is None:
+            from services.crawler import crawl_state
+
+            self.crawl_state = crawl_state()
+        if source_id is None:
+            self.crawl_state.clear()
+        elif source_id.startswith("url:"):
+            self.crawl_state.remove(source_id[len("url:"):])
+
+    def refresh_indexes(self):
+        """Drop the in-process entity/adjacency indexes after another process (a worker) wrote to the graph."""
+        self.resolver.clear()
+        self.local_graph.clear()
+
+    def export_snapshot(self, target):
+        """Write the graph to a snapshot file or buffer (services/snapshot.py); returns its stats."""
+        from services import snapshot  # NumPy is only needed here
+
+        try:
+            return snapshot.export_snapshot(self.driver, target)
+        except Exception as e:
+            logger.error(f"⚠️ Failed to export snapshot: {e}")
+            st.error(f"⚠️ Failed to export snapshot: {e}")
+            return None
+
+    def import_snapshot(self, source):
+        """MERGE a snapshot file into the graph; returns its stats."""
+        from services import snapshot
+
+        try:
+            stats = snapshot.import_snapshot(self.driver, source)
+            self.refresh_indexes()
+            st.success(f"📥 Imported {stats['edges']} edges and {stats['aliases']} aliases in {stats['seconds']}s")
+            return stats
+        except Exception as e:
+            logger.error(f"⚠️ Failed to import snapshot: {e}")
+            st.error(f"⚠️ Failed to import snapshot: {e}")
+            return None
 
-        response = llm.invoke(prompt)
-        raw_triples = response.content.strip()
+    def extract_triples(self, user_input: str, emit=None):
+        """
+        Ask the LLM for triples from one chunk. Safe to call from worker threads.
 
-        triples, alias_map = self.parse_triples(raw_triples)
-        self.insert_triples(triples, alias_map)
+        The response is parsed while it streams in; with `emit`, every
+        STREAM_BATCH_SIZE completed triples are handed to emit(triples, alias_map)
+        right away so writes can start before the LLM finishes.
+        """
+        key = self._cache_key(user_input)
+        cached = self._cached(key)
+        if cached is not None:
+            if emit and cached[0]:
+                emit(*cached)
+            return cached
+        return self._extract_uncached(user_input, key, emit)
+
+    def _extract_uncached(self, user_input, key, emit=None):
+        pending = []
+
+        def on_items(closed, final=False):
+            if not emit:
+                return
+            pending.extend(closed)
+            if pending and (final or len(pending) >= STREAM_BATCH_SIZE):
+                emit(*items_to_triples(pending))
+                pending.clear()
+
+        parser = triple_stream_parser()
+        items = self._stream_extraction(extraction_prompt(user_input), parser, on_items, chars=len(user_input))
+        triples, alias_map = items_to_triples(items)
+        # A chunk with no facts is cached too, unless nothing came back because the answer was garbled
+        if self.extraction_cache and (triples or not parser.stats()["malformed"]):
+            self.extraction_cache.put(key, triples, alias_map)
+        return triples, alias_map
+
+    def extract_batch(self, chunks, emit):
+        """
+        Extract triples for several small chunks in one LLM call. Every triple
+        comes back prefixed with its chunk's id and is handed to
+        emit(triples, alias_map, index) as it streams in. Cached chunks are
+        emitted without a call; a single uncached chunk gets the single-chunk prompt.
+        """
+        keys = [self._cache_key(chunk) for chunk in chunks]
+        missing = []
+        for index, key in enumerate(keys):
+            cached = self._cached(key)
+            if cached is None:
+                missing.append(index)
+            elif cached[0]:
+                emit(*cached, index)
+        if len(missing) == 1:
+            index = missing[0]
+            self._extract_uncached(chunks[index], keys[index], lambda triples, alias_map: emit(triples, alias_map, index))
+            return
+        if not missing:
+            return
+
+        pending = {index: [] for index in missing}
+        found = {index: [] for index in missing}
+        unattributed = 0
+
+        def on_items(closed, final=False):
+            nonlocal unattributed
+            for item in closed:
+                position = chunk_index(item, len(missing))
+                if position is None:
+                    unattributed += 1
+                    continue
+                index = missing[position]
+                pending[index].append(item[1:])
+                found[index].append(item[1:])
+            for index, items in pending.items():
+                if items and (final or len(items) >= STREAM_BATCH_SIZE):
+                    emit(*items_to_triples(items), index)
+                    items.clear()
+
+        texts = [chunks[index] for index in missing]
+        parser = triple_stream_parser(chunk_ids=True)
+        self._stream_extraction(
+            batch_extraction_prompt(texts), parser, on_items, chars=sum(map(len, texts)), batch=len(texts),
+        )
+        metrics.incr("batched_chunks", len(texts))
+        if unattributed:
+            metrics.incr("unattributed_triples", unattributed)
+            logger.warning(f"⚠️ Dropped {unattributed} batched triple(s) without a valid chunk id")
+        if self.extraction_cache:
+            # Dropped or garbled lines may have belonged to a chunk that came back empty; only cache those when clean
+            clean = not unattributed and not parser.stats()["malformed"]
+            for index, items in found.items():
+                if items or clean:
+                    self.extraction_cache.put(keys[index], *items_to_triples(items))
+
+    def _cache_key(self, chunk):
+        # Batched and single extraction share the "extract" rules, so both are cached under its id
+        return cache_key(chunk, prompts.get("extract").id, MODEL_NAME)
+
+    def _cached(self, key):
+        if not self.extraction_cache:
+            return None
+        cached = self.extraction_cache.get(key)
+        metrics.incr("extraction_cache_hits" if cached is not None else "extraction_cache_misses")
+        return cached
+
+    def _stream_extraction(self, prompt, parser, on_items, **attrs):
+        """Stream one extraction call through `parser`, passing each batch of closed items to on_items."""
+        items, output, parse_seconds = [], [], 0.0
+        with metrics.span("llm.extract", **attrs) as record:
+            for piece in llm.stream(prompt):
+                output.append(piece.content)
+                t0 = time.perf_counter()
+                closed = parser.feed(piece.content)
+                parse_seconds += time.perf_counter() - t0
+                items += closed
+                on_items(closed)
+            closed = parser.close()
+            items += closed
+            on_items(closed, final=True)
+            record.update(
+                prompt_tokens=count_tokens(prompt), output_tokens=count_tokens("".join(output)), triples=len(items)
+            )
+        metrics.observe("parse_triples", parse_seconds, items=len(items))
+        metrics.incr("llm_calls")
+        metrics.incr("prompt_tokens", record["prompt_tokens"])
+        metrics.incr("output_tokens", record["output_tokens"])
+        metrics.incr("triples_extracted", len(items))
+
+        stats = parser.stats()
+        if stats["malformed"] or stats["recovered"]:
+            logger.warning(
+                f"⚠️ Parsed {stats['items']} triples ({stats['recovered']} repaired, "
+                f"{stats['malformed']} skipped)"
+            )
+        return items
 
     # ----------------- Data Visualizer -----------------
     def visualize_triples(self):
-        with self.driver.session() as session:
-            query = """
-            MATCH (h:ENTITY)-[r]->(t:ENTITY)
-            RETURN h.name AS head, type(r) AS relation, t.name AS tail
-            LIMIT 50
-            """
-            results = session.run(query)
-            triples = [(record["head"], record["relation"], record["tail"]) for record in results]
-
-        # Create Pyvis network
-        net = Network(height="600px", width="100%", bgcolor="#222222", font_color="white", directed=True)
-
-        for h, r, t in triples:
-            net.add_node(h, label=h, title=h)
-            net.add_node(t, label=t, title=t)
-            net.add_edge(h, t, label=r)
-
-        net.set_options("""{
-            "edges": {"color": {"inherit": "from"}},
-            "nodes": {"size": 15}
-        }""")
-
-        # Save HTML into session_state
-        net.save_graph("graph.html")
-        with open("graph.html", "r", encoding="utf-8") as f:
-            st.session_state["graph_html"] = f.read()
-
-        # Render
-        # components.html(st.session_state["graph_html"], height=600, width=1000, scrolling=True)
+        """Start a fresh graph view for this build with the first page of edges."""
+        with metrics.span("visualize_triples") as record:
+            view = graph_view()
+            view.add_edges(fetch_edges(self.driver, 0, GRAPH_PAGE_SIZE))
+            st.session_state["graph_view"] = view
+            record["edges"] = len(view)
+        metrics.incr("db_round_trips")
+        return view
+
+    def load_more_edges(self, view):
+        """Append the next page of edges; only these are sent to the browser."""
+        return view.add_edges(fetch_edges(self.driver, len(view), GRAPH_PAGE_SIZE))
+
+    def neighborhood(self, name: str, view=None):
+        """Page through the edges around one entity, resolving partial names via the full-text index."""
+        if view is None or view.view_id != f"nbr:{name}":
+            view = graph_view(f"nbr:{name}")
+        rows = fetch_neighborhood(self.driver, name, len(view), GRAPH_PAGE_SIZE)
+        if not rows and not len(view):
+            for candidate in self.search_entities(name, limit=1):
+                rows = fetch_neighborhood(self.driver, candidate, 0, GRAPH_PAGE_SIZE)
+        view.add_edges(rows)
+        return view
 
     # ----------------- Query KG -----------------
+    def answer(self, user_question: str):
+        """
+        Answer from the local adjacency index when the question is a plain one-
+        or two-hop lookup; otherwise fall back to generate_query (LLM + Neo4j).
+        """
+        with metrics.trace("query", question=user_question):
+            start = time.perf_counter()
+            hit = None
+            if LOCAL_QUERY and self.driver:
+                try:
+                    if not self.resolver.loaded:
+                        self.resolver.load(self.driver)
+                    if not self.local_graph.loaded:
+                        self.local_graph.load(self.driver)
+                    with metrics.span("query.local") as record:
+                        hit = self.local_graph.answer(user_question, self.resolver)
+                        record["hit"] = bool(hit)
+                except Exception as e:
+                    logger.warning(f"⚠️ Local query path failed, falling back to the LLM: {e}")
+
+            if hit:
+                self.answer_stats.record("local", time.perf_counter() - start)
+                st.write("⚡ Answered from the local graph index:", hit["path"])
+                st.success("✅ Query Results:")
+                st.write(hit["values"])
+                return hit["values"]
+
+            values = self.generate_query(user_question)
+            self.answer_stats.record("llm", time.perf_counter() - start)
+            return values
+
     def generate_query(self, user_question: str):
         try:
-            prompt = f"""
-                    You are an expert in generating Cypher queries for Neo4j.
-
-                    Schema:
-                    (:ENTITY {{name}})-[:RELATION]->(:ENTITY {{name}})
-                    (:ALIAS {{name}})-[:ALIAS_OF]->(:ENTITY)
-                    - Nodes only have the `name` property.
-                    - All facts are stored as relationships wherever possible.
-                    - Direction matters! The start node is the subject, the end node is the object.
-
-                    Important rules:
-                    1. Always match the relationship direction exactly as it exists in the database.
-                    2. Questions may use different terms for the same relationship. For example:
-                        - "birthplace", "where born", "birth location" → BORN_IN
-                        - "job", "occupation", "profession" → PROFESSION
-                        - "founded", "established" → FOUNDED or FOUNDED_BY
-                    3. If the database stores the full name but the user provides only a partial name (first name, last name, or nickname), first check for a matching ENTITY node with CONTAINS, and if needed check ALIAS nodes. Examples:
-                        - MATCH (p:ENTITY) WHERE p.name CONTAINS "Elon" RETURN p.name AS result
-                        - MATCH (a:ALIAS)-[:ALIAS_OF]->(p:ENTITY) WHERE a.name CONTAINS "Elon" RETURN p.name AS result
-                    4. Family relationships (PARENT, CHILD, SPOUSE, SIBLING) always connect directly between people nodes.
-                    5. Always alias return values as `AS result`.
-                    6. Use the shortest valid query possible while respecting these rules.
-                    7. When generating Cypher queries, always:
-                        - Normalize entity names.
-                        - Replace en dash (–), em dash (—), and minus signs (−) with a standard ASCII hyphen (-).
-                        - Remove unnecessary whitespace.
-
-
-                    Examples:
-                    Q: Who founded Apple Inc.?
-                    A: MATCH (a:ENTITY {{name:"Apple Inc."}})-[:FOUNDED_BY]->(f:ENTITY) RETURN f.name AS result
-
-                    Q: Who are Elon Musk's parents?
-                    A: MATCH (p:ENTITY {{name:"Elon Reeve Musk"}})-[:PARENT]->(c:ENTITY) RETURN c.name AS result
-
-                    Q: Where was Javed Akhtar born?
-                    A: MATCH (j:ENTITY {{name:"Javed Akhtar"}})-[:BORN_IN]->(b:ENTITY) RETURN b.name AS result
-
-                    Q: Who acted in Screamers?
-                    A: MATCH (a:ENTITY)-[:ACTED_IN]->(m:ENTITY {{name:"Screamers"}}) RETURN a.name AS result
-
-                    Now generate ONLY the Cypher query for the following question.
-                    Question: "{user_question}"
-                    """
-
-            response = llm.invoke(prompt)
-            cypher_query = clean_cypher(response.content.strip())
+            cached = self.query_cache.lookup(user_question)
+            if cached:
+                metrics.incr("query_cache_hits")
+                cypher_query, params, key = cached
+                st.write("♻️ Reused Cypher:", cypher_query, params)
+                return self.query_kg(cypher_query, params, cache_key=key)
+
+            prompt = cypher_prompt(user_question)
+
+            with metrics.span("llm.generate_query") as record:
+                response = llm.invoke(prompt)
+                cypher_query = clean_cypher(response.content.strip())
+                record.update(prompt_tokens=count_tokens(prompt), output_tokens=count_tokens(response.content))
+            metrics.incr("llm_calls")
+            metrics.incr("prompt_tokens", record["prompt_tokens"])
+            metrics.incr("output_tokens", record["output_tokens"])
 
             st.write("📝 Generated Cypher:", cypher_query)
 
-            return self.query_kg(cypher_query)
+            key = self.query_cache.store(user_question, cypher_query)
+            return self.query_kg(cypher_query, cache_key=key)
 
         except Exception as e:
             st.error(f"❌ Query generation failed: {e}")
             return []
 
-    def query_kg(self, cypher_query: str):
-        with self.driver.session() as session:
-            try:
-                results = session.run(cypher_query)
-                data = [dict(record) for record in results]
-                if not data:
-                    st.info("⚠️ No results found.")
-                    return []
-
-                # Show only values
-                values = [list(record.values())[0] for record in data]
-                st.success("✅ Query Results:")
-                st.write(values)
+    def query_kg(self, cypher_query: str, params=None, cache_key=None, skip=0):
+        """
+        Run generated Cypher through the query guard (read-only, bounded, timed out
+        server-side) and show one page of values. Returns a query_page, a list that
+        also knows how to fetch the next page (`has_more`, `next_skip`).
+        """
+        try:
+            page = run_guarded(self.driver, cypher_query, params, skip=skip)
+        except query_rejected as e:
+            if cache_key:
+                self.query_cache.drop(cache_key)
+            logger.warning(f"🛡️ Rejected generated query: {e}")
+            st.error(f"🛡️ Query rejected: {e}")
+            return []
+        except Exception as e:
+            if cache_key:
+                self.query_cache.drop(cache_key)
+            st.error(f"❌ KG query failed: {e}")
+            return []
+
+        if not page:
+            st.info("ℹ️ No more results." if skip else "⚠️ No results found.")
+            return page
+
+        # Show only values
+        st.success(f"✅ Query Results {skip + 1}–{page.next_skip}:" if skip or page.has_more else "✅ Query Results:")
+        st.write(list(page))
+        return page
 
-                return values
-            except Exception as e:
-                st.error(f"❌ KG query failed: {e}")
-                return []
-    
     def reset_kg(self):
         """Delete all nodes and relationships in Neo4j"""
         try:
             with self.driver.session() as session:
-                session.run("MATCH (n) DETACH DELETE n")
+                session.run(
+                    f"""
+                    MATCH (n)
+                    CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {DELETE_BATCH_SIZE} ROWS
+                    """
+                ).consume()
+            self._forget_crawled()
+            self.resolver.clear()
+            self.local_graph.clear()
             logger.info("🗑️ Deleted all existing triples from Neo4j")
             st.info("🗑️ Knowledge Graph reset (all old triples deleted)")
         except Exception as e:
             logger.error(f"⚠️ Failed to reset KG: {e}")
-            st.error(f"⚠️ Failed to reset KG: {e}")
\ No newline at end of file
+            st.error(f"⚠️ Failed to reset KG: {e}")
+
+
+def pack_batches(chunks, tags=None, max_chunks=EXTRACTION_BATCH_CHUNKS):
+    """
+    Group consecutive chunks into batches for extract_batch: at most
+    `max_chunks` per batch, and together within the chunk budget once the
+    batched prompt's extra instructions and per-chunk ids are paid for.
+    Returns (batches, batch_tags); batch_tags is None when tags is.
+    """
+    batches, batch_tags = [], []
+    for batch, batch_tag in iter_batches(chunks, tags, max_chunks):
+        batches.append(batch)
+        batch_tags.append(batch_tag)
+    return batches, (batch_tags if tags is not None else None)
+
+
+def iter_batches(chunks, tags=None, max_chunks=EXTRACTION_BATCH_CHUNKS):
+    """pack_batches one (batch, batch_tags) pair at a time, reading `chunks` only as far as needed."""
+    overhead = count_tokens(batch_extraction_prompt([])) - count_tokens(extraction_prompt(""))
+    limit = chunk_budget() - max(overhead, 0)
+    batch, batch_tags, tokens = [], [], 0
+    for i, chunk in enumerate(chunks):
+        cost = count_tokens(chunk) + 4  # "[cN] " prefix and line break
+        if batch and (len(batch) >= max(1, max_chunks) or tokens + cost > limit):
+            yield batch, batch_tags
+            batch, batch_tags, tokens = [], [], 0
+        batch.append(chunk)
+        batch_tags.append(tags[i] if tags is not None else None)
+        tokens += cost
+    if batch:
+        yield batch, batch_tags
+
+
+def _size(items):
+    """len(items), or None for a lazy iterator."""
+    return len(items) if hasattr(items, "__len__") else None
@@ -0,0 +1,300 @@
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+from utils.logger import logger
+from services.bulk_writer import relation_type
+from services.entity_resolver import name_key
+
+MAX_HOPS = 2
+_MAX_MENTION_WORDS = 6
+_WORD = re.compile(r"[^\s?!,;:]+")
+_POSSESSIVE = re.compile(r"['’]s?$")
+_QUESTION_WORDS = {
+    "who", "whom", "whose", "what", "which", "where", "when", "how", "is", "are", "was", "were",
+    "did", "does", "do", "the", "a", "an", "of", "in", "by", "for", "to", "and", "me", "tell",
+    "list", "all", "name", "s",
+}
+
+# How a relation phrase binds to the entity it is next to:
+# - _NOUN: "X's parents", "the founder of X": always X -[REL]-> ?
+# - _VERB: the entity is the subject when it comes first ("Where was X born?": X -[REL]-> ?)
+#   and the object when it comes after ("Who was born in X?": ? -[REL]-> X)
+# - _PASSIVE: "founded by" swaps that ("What was founded by X?": X -[FOUNDED]-> ?)
+_NOUN, _VERB, _PASSIVE = "noun", "verb", "passive"
+
+# Question wording -> relation types, mirroring the synonyms the generate_query prompt teaches.
+# Earlier patterns win where phrases overlap ("founded by" before "founded").
+_RELATION_WORDS = [
+    (re.compile(r"\bborn\b"), ("BORN_IN",), _VERB),
+    (re.compile(r"\bbirth\s*place\b|\bplace of birth\b"), ("BORN_IN",), _NOUN),
+    (re.compile(r"\b(founded|established)\s+by\b"), ("FOUNDED",), _PASSIVE),
+    (re.compile(r"\b(co-?)?founders?\b"), ("FOUNDED_BY",), _NOUN),
+    (re.compile(r"\b(found(ed|s)?|establish(ed|es)?)\b"), ("FOUNDED",), _VERB),
+    (re.compile(r"\b(parents?|father|mother)\b"), ("PARENT",), _NOUN),
+    (re.compile(r"\b(child(ren)?|sons?|daughters?)\b"), ("CHILD",), _NOUN),
+    (re.compile(r"\b(spouses?|wife|husband)\b"), ("SPOUSE",), _NOUN),
+    (re.compile(r"\bmarr(y|ied)\b"), ("SPOUSE",), _VERB),
+    (re.compile(r"\b(siblings?|brothers?|sisters?)\b"), ("SIBLING",), _NOUN),
+    (re.compile(r"\b(act(ed|s)?|actors?|actress(es)?|starr(ed|ing)|star(s)?|cast)\b"), ("ACTED_IN",), _VERB),
+    (re.compile(r"\b(jobs?|occupations?|professions?)\b"), ("PROFESSION",), _NOUN),
+    (re.compile(r"\bwork(s|ed)? as\b"), ("PROFESSION",), _VERB),
+    (re.compile(r"\b(known for|famous for)\b"), ("KNOWN_FOR",), _VERB),
+    (re.compile(r"\bheadquarters\b"), ("HEADQUARTERED", "HEADQUARTERED_IN"), _NOUN),
+    (re.compile(r"\b(headquartered|based)\b"), ("HEADQUARTERED", "HEADQUARTERED_IN"), _VERB),
+]
+
+# Relation pairs stored either way round: "A R B" answers the same question as "B INVERSE A".
+# Only these are followed against the edge direction; "Javed PARENT ?" must never return
+# the children stored as "Farhan PARENT Javed".
+_INVERSES = {
+    "FOUNDED": "FOUNDED_BY", "FOUNDED_BY": "FOUNDED",
+    "PARENT": "CHILD", "CHILD": "PARENT",
+    "SPOUSE": "SPOUSE", "SIBLING": "SIBLING",
+}
+# Only "who/what/which/where ... X's <relation>" lookups are answered locally. Questions about
+# an attribute (a date, a year, an age, a count) and yes/no questions go to the LLM, which can
+# answer them from properties or with an aggregate; the adjacency index only holds entities.
+_LOOKUP_QUESTION = re.compile(r"^\W*(who|whom|whose|what|which|where|name|list)\b")
+_ATTRIBUTE = re.compile(
+    r"\b(when|dates?|years?|day|age|how (many|much|old|long)|number of|count|population)\b"
+)
+_PLACE_RELATIONS = {"BORN_IN", "HEADQUARTERED", "HEADQUARTERED_IN"}
+
+
+class local_graph:
+    """
+    In-memory adjacency index of the ENTITY graph for answering simple questions
+    without the LLM or a Neo4j round trip.
+
+    Names are interned to integer ids; each id keeps {relation type: set of ids}
+    for outgoing and incoming edges. Kept in sync by kg_service.write_triples and
+    cleared (then reloaded from Neo4j) whenever facts are deleted.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+        self._out = []
+        self._in = []
+        self.relations = set()
+        self.edges = 0
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._names)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+            self._out.clear()
+            self._in.clear()
+            self.relations.clear()
+            self.edges = 0
+            self.loaded = False
+
+    def load(self, driver):
+        """Index every ENTITY -> ENTITY relationship already in Neo4j."""
+        start = time.perf_counter()
+        with driver.session() as session:
+            result = session.run(
+                "MATCH (h:ENTITY)-[r]->(t:ENTITY) RETURN h.name AS head, type(r) AS rel, t.name AS tail"
+            )
+            with self._lock:
+                for record in result:
+                    self._add(record["head"], record["rel"], record["tail"])
+                self.loaded = True
+        logger.info(
+            f"🗺️ Local graph index loaded: {len(self._names)} entities, {self.edges} edges "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    def add(self, triples):
+        """Mirror triples that were just written to Neo4j."""
+        with self._lock:
+            for head, relation, tail in triples:
+                self._add(head, relation_type(relation), tail)
+
+    def answer(self, question, resolver):
+        """
+        Answer a one- or two-hop relation lookup, e.g. "Where was Javed Akhtar born?"
+        or "Where was the founder of Apple Inc. born?".
+
+        Returns {"values": [...], "path": "..."} or None when the question is not
+        a plain lookup or the index has no matching edges, so the caller can
+        fall back to generate_query.
+        """
+        with self._lock:
+            relations = tuple(self.relations)
+        plan = match_question(question, resolver, relations)
+        if plan is None:
+            return None
+        entity, hops = plan
+        with self._lock:
+            node = self._ids.get(entity)
+            if node is None:
+                return None
+            nodes, path = {node}, entity
+            for relations, incoming in hops:
+                nodes, step = self._step(nodes, relations, incoming)
+                if not nodes:
+                    return None
+                path += step
+            return {"values": [self._names[n] for n in sorted(nodes)], "path": path}
+
+    def _step(self, nodes, relations, incoming=False):
+        # Edges in the asked direction first; then, for declared inverse pairs only, the inverse
+        # the other way round ("Apple FOUNDED_BY ?" is also answered by "Jobs FOUNDED Apple")
+        inverses = [_INVERSES[rel] for rel in relations if rel in _INVERSES]
+        forward, backward = (self._out, "-[{}]->"), (self._in, "<-[{}]-")
+        if incoming:
+            forward, backward = backward, forward
+        for (adjacency, arrow), rels in ((forward, relations), (backward, inverses)):
+            found, used = set(), []
+            for rel in dict.fromkeys(rels):
+                hit = set()
+                for node in nodes:
+                    hit |= adjacency[node].get(rel, set())
+                if hit:
+                    found |= hit
+                    used.append(rel)
+            if found:
+                return found, " " + arrow.format("|".join(used)) + " ?"
+        return set(), ""
+
+    def _add(self, head, rel, tail):
+        h, t = self._id(head), self._id(tail)
+        targets = self._out[h].setdefault(rel, set())
+        if t not in targets:
+            targets.add(t)
+            self._in[t].setdefault(rel, set()).add(h)
+            self.relations.add(rel)
+            self.edges += 1
+
+    def _id(self, name):
+        node = self._ids.get(name)
+        if node is None:
+            node = self._ids[sys.intern(name)] = len(self._names)
+            self._names.append(name)
+            self._out.append({})
+            self._in.append({})
+        return node
+
+
+def _mentions(question, resolver):
+    """Non-overlapping (start, end, canonical name) entity mentions, longest first."""
+    words = [(m.start(), m.end(), _POSSESSIVE.sub("", m.group())) for m in _WORD.finditer(question)]
+    taken, found = set(), []
+    for size in range(min(_MAX_MENTION_WORDS, len(words)), 0, -1):
+        for i in range(len(words) - size + 1):
+            span = words[i:i + size]
+            if taken & set(range(i, i + size)):
+                continue
+            if all(name_key(w).strip("-") in _QUESTION_WORDS for _, _, w in span):
+                continue
+            canonical = resolver.find(" ".join(w for _, _, w in span))
+            if canonical:
+                taken |= set(range(i, i + size))
+                found.append((span[0][0], span[-1][1], canonical))
+    return found
+
+
+def relation_words(text):
+    """Relation types a question's wording refers to, by the same synonyms as the local path."""
+    return {rels for _, _, rels, _ in _relation_mentions(text.lower())}
+
+
+def _relation_mentions(text, relations=()):
+    """(start, end, relation types, kind) for every relation phrase in the question, in order."""
+    found = []
+
+    def add(m, rels, kind):
+        if not any(s < m.end() and m.start() < e for s, e, _, _ in found):
+            found.append((m.start(), m.end(), rels, kind))
+
+    for pattern, rels, kind in _RELATION_WORDS:
+        for m in pattern.finditer(text):
+            add(m, rels, kind)
+    # Relation types present in the graph can also be named directly ("headquartered", "known for")
+    for rel in relations:
+        phrase = re.sub(r"_(in|of|by|at|to|for)$", "", rel.lower()).replace("_", " ")
+        if len(phrase) < 4:
+            continue
+        for m in re.finditer(r"\b" + re.escape(phrase) + r"\b", text):
+            add(m, (rel,), _VERB)
+    return sorted(found)
+
+
+def match_question(question, resolver, relations=()):
+    """
+    Return (entity, [(relation types, incoming) per hop]) for a question naming
+    exactly one known entity and one or two relations, or None. Relations in
+    front of the entity ("the parents of the founder of Apple") apply first,
+    nearest first; then the ones after it, so "Where was the founder of Apple
+    born?" and "Where was Apple's founder born?" both go founder -> born.
+
+    Each hop has one direction, taken from the wording: "Who founded Apple?"
+    follows FOUNDED into Apple, "What did Steve Jobs found?" out of Steve Jobs,
+    and "Who acted in Forrest Gump?" / "Who was born in Gwalior?" follow
+    ACTED_IN / BORN_IN into the named entity.
+
+    Only lookups are matched: the question must start with who/what/which/where
+    (where only for place relations). Questions asking for an attribute (when,
+    a date or year, an age, how many) and yes/no questions return None and go
+    to the LLM path.
+    """
+    text = question.lower()
+    asks = _LOOKUP_QUESTION.match(text)
+    if not asks or _ATTRIBUTE.search(text):
+        return None
+    entities = _mentions(question, resolver)
+    if len({name for _, _, name in entities}) != 1:
+        return None
+    start, end, entity = entities[0]
+
+    before, after = [], []
+    for s, e, rels, kind in _relation_mentions(text, relations):
+        if e <= start:
+            # The entity is the verb's object: "Who founded Apple?" -> ? -[FOUNDED]-> Apple
+            before.append((start - e, (rels, kind == _VERB)))
+        elif s >= end:
+            after.append((s - end, (rels, kind == _PASSIVE)))
+    hops = sorted(before, key=lambda h: h[0]) + sorted(after, key=lambda h: h[0])
+    if not hops or len(hops) > MAX_HOPS:
+        return None
+    last_rels, last_incoming = hops[-1][1]
+    if asks.group(1) == "where" and (last_incoming or not _PLACE_RELATIONS & set(last_rels)):
+        return None
+    return entity, [hop for _, hop in hops]
+
+
+class answer_stats:
+    """Fraction of questions answered locally and latency of each path."""
+
+    def __init__(self, window=1000):
+        self._latency = {"local": deque(maxlen=window), "llm": deque(maxlen=window)}
+        self._counts = {"local": 0, "llm": 0}
+        self._lock = threading.Lock()
+
+    def record(self, path, seconds):
+        with self._lock:
+            self._counts[path] += 1
+            self._latency[path].append(seconds)
+
+    def stats(self):
+        with self._lock:
+            total = sum(self._counts.values())
+            out = {
+                "questions": total,
+                "local_fraction": round(self._counts["local"] / total, 3) if total else 0.0,
+            }
+            for path, samples in self._latency.items():
+                ordered = sorted(samples)
+                out[f"{path}_count"] = self._counts[path]
+                out[f"{path}_ms_p50"] = round(ordered[len(ordered) // 2] * 1000, 2) if ordered else None
+                out[f"{path}_ms_p95"] = round(ordered[int(len(ordered) * 0.95)] * 1000, 2) if ordered else None
+            return out
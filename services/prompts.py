@@ -0,0 +1,171 @@
+"""
+Versioned prompt templates for LLM calls. Token budgets (services/text_extractor.py)
+and cache keys (extraction cache) are derived from these, so edit them here
+rather than inline, and register a new version instead of rewording an old one.
+KG_PROMPT_VERSIONS pins older versions, e.g. "extract=1,cypher=1".
+"""
+from configs.config import PROMPT_VERSIONS
+
+
+class prompt_template:
+    """One version of a named prompt; `id` goes into cache keys."""
+
+    def __init__(self, name, version, text):
+        self.name = name
+        self.version = version
+        self.text = text
+
+    @property
+    def id(self):
+        return f"{self.name}/v{self.version}"
+
+    def render(self, **values):
+        return self.text.format(**values)
+
+
+_REGISTRY = {}
+
+
+def register(name, version, text):
+    _REGISTRY.setdefault(name, {})[version] = prompt_template(name, version, text)
+
+
+def get(name, version=None):
+    """The pinned (KG_PROMPT_VERSIONS) or newest version of a prompt."""
+    versions = _REGISTRY[name]
+    version = version or PROMPT_VERSIONS.get(name) or max(versions, key=int)
+    return versions[version]
+
+
+def versions():
+    """Active version id per prompt name."""
+    return {name: get(name).id for name in _REGISTRY}
+
+
+# ----------------- Extraction -----------------
+register("extract", "1", """
+                Extract knowledge triples strictly in JSON list format, including optional aliases:
+                [["Entity1", "RELATION", "Entity2", ["Alias1", "Alias2", ...]], ...]
+
+                Rules:
+                - Output only a valid Python list of lists. Do not add explanations, notes, or extra text.
+                - Each list must contain:
+                    1. Entity1 (title case)
+                    2. Relation (short, uppercase, noun/verb-like)
+                    3. Entity2 (title case or string literal)
+                    4. Optional aliases for Entity1 (list of strings; can be empty if none)
+                - Examples of relations: "BORN_IN", "PROFESSION", "FOUNDED", "KNOWN_FOR", "HEADQUARTERED".
+                - Entity names should be in title case (e.g., "Javed Akhtar", "Apple Inc.").
+                - Entity2 can be a literal value (date, number, string) or another entity.
+                - Format literal values as strings.
+                - Include common variations for aliases, such as first name, last name, or commonly used short names.
+                - If the relation is ambiguous, choose the closest meaningful relation from the examples.
+                - Avoid generic relations like "is" or "has". Use specific relations that describe the fact.
+
+                Text: "{text}"
+                """)
+
+# Shared by the single and batched extraction prompts
+_TRIPLE_RULES = """Rules:
+- Output only the JSON list, nothing else.
+- Head, Tail: entity names in title case ("Javed Akhtar", "Apple Inc."). Tail may be a literal (date, number, text), always as a string.
+- RELATION: short, specific, UPPER_SNAKE_CASE, e.g. BORN_IN, PROFESSION, FOUNDED, KNOWN_FOR, HEADQUARTERED. Never generic (IS, HAS).
+- Aliases: common variations of Head (first name, last name, short name); [] if none."""
+
+register("extract", "2", """Extract knowledge triples from the text as a JSON list:
+[["Head", "RELATION", "Tail", ["Alias", ...]], ...]
+""" + _TRIPLE_RULES + """
+
+Text: "{text}"
+""")
+
+# Several chunks in one call; every triple starts with its chunk's id so it can be attributed back
+register("extract_batch", "1", """Extract knowledge triples from each numbered text below as one JSON list:
+[["c0", "Head", "RELATION", "Tail", ["Alias", ...]], ...]
+Start every triple with the id of the text it comes from (c0, c1, ...).
+""" + _TRIPLE_RULES + """
+
+Texts:
+{texts}
+""")
+
+
+def extraction_prompt(text):
+    return get("extract").render(text=text)
+
+
+def batch_extraction_prompt(texts):
+    """`texts` is a list of chunks; chunk i gets id "c<i>"."""
+    lines = "\n".join(f"[{batch_id(i)}] {' '.join(text.split())}" for i, text in enumerate(texts))
+    return get("extract_batch").render(texts=lines)
+
+
+def batch_id(index):
+    return f"c{index}"
+
+
+# ----------------- Cypher generation -----------------
+register("cypher", "1", """
+                    You are an expert in generating Cypher queries for Neo4j.
+
+                    Schema:
+                    (:ENTITY {{name}})-[:RELATION]->(:ENTITY {{name}})
+                    (:ALIAS {{name}})-[:ALIAS_OF]->(:ENTITY)
+                    - Nodes only have the `name` property.
+                    - All facts are stored as relationships wherever possible.
+                    - Direction matters! The start node is the subject, the end node is the object.
+
+                    Important rules:
+                    1. Always match the relationship direction exactly as it exists in the database.
+                    2. Questions may use different terms for the same relationship. For example:
+                        - "birthplace", "where born", "birth location" → BORN_IN
+                        - "job", "occupation", "profession" → PROFESSION
+                        - "founded", "established" → FOUNDED or FOUNDED_BY
+                    3. If the database stores the full name but the user provides only a partial name (first name, last name, or nickname), first check for a matching ENTITY node with CONTAINS, and if needed check ALIAS nodes. Examples:
+                        - MATCH (p:ENTITY) WHERE p.name CONTAINS "Elon" RETURN p.name AS result
+                        - MATCH (a:ALIAS)-[:ALIAS_OF]->(p:ENTITY) WHERE a.name CONTAINS "Elon" RETURN p.name AS result
+                    4. Family relationships (PARENT, CHILD, SPOUSE, SIBLING) always connect directly between people nodes.
+                    5. Always alias return values as `AS result`.
+                    6. Use the shortest valid query possible while respecting these rules.
+                    7. When generating Cypher queries, always:
+                        - Normalize entity names.
+                        - Replace en dash (–), em dash (—), and minus signs (−) with a standard ASCII hyphen (-).
+                        - Remove unnecessary whitespace.
+
+
+                    Examples:
+                    Q: Who founded Apple Inc.?
+                    A: MATCH (a:ENTITY {{name:"Apple Inc."}})-[:FOUNDED_BY]->(f:ENTITY) RETURN f.name AS result
+
+                    Q: Who are Elon Musk's parents?
+                    A: MATCH (p:ENTITY {{name:"Elon Reeve Musk"}})-[:PARENT]->(c:ENTITY) RETURN c.name AS result
+
+                    Q: Where was Javed Akhtar born?
+                    A: MATCH (j:ENTITY {{name:"Javed Akhtar"}})-[:BORN_IN]->(b:ENTITY) RETURN b.name AS result
+
+                    Q: Who acted in Screamers?
+                    A: MATCH (a:ENTITY)-[:ACTED_IN]->(m:ENTITY {{name:"Screamers"}}) RETURN a.name AS result
+
+                    Now generate ONLY the Cypher query for the following question.
+                    Question: "{question}"
+                    """)
+
+register("cypher", "2", """Write one Neo4j Cypher query answering the question. Output only the query.
+Schema: (:ENTITY {{name}})-[:RELATION]->(:ENTITY {{name}}), (:ALIAS {{name}})-[:ALIAS_OF]->(:ENTITY). Nodes only have `name`.
+Rules:
+- Direction matters: start node = subject, end node = object.
+- Map synonyms to stored relations: birthplace/where born -> BORN_IN; job/occupation -> PROFESSION; founded/established -> FOUNDED or FOUNDED_BY.
+- Partial names or nicknames: match ENTITY with `name CONTAINS`, else (a:ALIAS)-[:ALIAS_OF]->(p:ENTITY) with `a.name CONTAINS`.
+- Family relations (PARENT, CHILD, SPOUSE, SIBLING) link people directly.
+- Return values `AS result`; shortest valid query; ASCII hyphens in names, no extra whitespace.
+Examples:
+Who founded Apple Inc.? MATCH (a:ENTITY {{name:"Apple Inc."}})-[:FOUNDED_BY]->(f:ENTITY) RETURN f.name AS result
+Where was Javed Akhtar born? MATCH (j:ENTITY {{name:"Javed Akhtar"}})-[:BORN_IN]->(b:ENTITY) RETURN b.name AS result
+Who acted in Screamers? MATCH (a:ENTITY)-[:ACTED_IN]->(m:ENTITY {{name:"Screamers"}}) RETURN a.name AS result
+Who are Elon Musk's parents? MATCH (p:ENTITY {{name:"Elon Reeve Musk"}})-[:PARENT]->(c:ENTITY) RETURN c.name AS result
+Question: "{question}"
+""")
+
+
+def cypher_prompt(question):
+    return get("cypher").render(question=question)
@@ -0,0 +1,184 @@
+import re
+import threading
+from collections import OrderedDict
+
+from configs.config import QUERY_CACHE_SIZE
+from services.local_graph import relation_words
+
+_DASHES = re.compile(r"[–—−]")
+_LITERAL = re.compile(r'"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'')
+_PLACEHOLDER = re.compile(r"\{(p\d+)\}")
+
+# Words that should never sit at the edge of a captured entity. Without this
+# "Where was the founder of Apple born?" would reuse "Where was {p0} born?".
+_EDGE_WORDS = {"the", "a", "an", "of", "in", "on", "to", "and", "or", "who", "what",
+               "where", "when", "which", "how", "is", "was", "are", "were", "did", "does"}
+# Never the first or last word of a name, and inside one only as a connector ("Bank of America"),
+# so "Apple in 2020" or "Elon Musk not" are not taken for entities
+_STOP_WORDS = _EDGE_WORDS | {
+    "not", "no", "never", "at", "by", "for", "from", "with", "as", "into", "during", "after", "before",
+    "since", "until", "about", "his", "her", "their", "its", "this", "that", "these", "those", "it",
+    "he", "she", "they", "has", "have", "had", "be", "been", "do", "s",
+}
+_NAME_CONNECTORS = {"of", "the", "and", "&", "de", "da", "del", "van", "von", "der", "la", "le"}
+# A final "." after these belongs to the name ("Apple Inc."), not to the sentence
+_ABBREVIATIONS = {"inc", "ltd", "co", "corp", "llc", "plc", "bros", "jr", "sr", "st", "dr", "mr", "mrs", "ms", "no"}
+_MAX_ENTITY_WORDS = 6
+_CONTENT_WORD = re.compile(r"[^\W_]+")
+_LAST_WORD = re.compile(r"(\S+)\.$")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Same normalization the generate_query prompt asks of the LLM, plus
+    sentence-final punctuation: "?" and "!" always, "." only when it does
+    not end an abbreviation or initial ("Who founded Apple Inc.?" keeps "Inc.").
+    """
+    question = _DASHES.sub("-", question or "")
+    question = re.sub(r"\s+", " ", question).strip()
+    question = question.rstrip("?! ")
+    last = _LAST_WORD.search(question)
+    if last and not _abbreviation(last.group(1)):
+        question = question[:-1]
+    return question.strip()
+
+
+def _abbreviation(word: str) -> bool:
+    word = word.strip("\"'(")
+    return word.lower() in _ABBREVIATIONS or "." in word or (len(word) == 1 and word.isupper())
+
+
+def _keywords(text: str) -> set:
+    """Words that carry the question's meaning (relation words like "born", "founded", "parents")."""
+    return {w for w in _CONTENT_WORD.findall(text.lower()) if w not in _EDGE_WORDS}
+
+
+def _valid_capture(value: str) -> bool:
+    """Whether a captured span can be an entity name for a template parameter."""
+    original = [w.strip(".,'\"") for w in value.split()]
+    words = [w.lower() for w in original]
+    if not words or len(words) > _MAX_ENTITY_WORDS:
+        return False
+    for edge, word in {(original[0], words[0]), (original[-1], words[-1])}:
+        # Relation words only count in lower case: "Star Wars" is a name, "born" is not
+        if word in _STOP_WORDS or (edge.islower() and relation_words(word)):
+            return False
+    return not any(w in _STOP_WORDS and w not in _NAME_CONNECTORS for w in words[1:-1])
+
+
+class query_cache:
+    """
+    Bounded LRU cache from question shape to a parameterized Cypher template.
+
+    Entity literals that the LLM copied from the question into the Cypher are
+    lifted into $p0, $p1, ... so "Where was X born?" is one entry for every X.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, question: str):
+        """Return (cypher, params, key) for a cached shape, or None."""
+        norm = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(norm.lower())
+            if entry and not entry["params"]:
+                return self._hit(norm.lower(), entry, {})
+
+            for key, entry in reversed(self._entries.items()):
+                if not entry["params"]:
+                    continue
+                match = entry["regex"].match(norm)
+                if not match:
+                    continue
+                values = match.groups()
+                if not all(_valid_capture(v) for v in values):
+                    continue
+                # A capture must not swallow the template's own keywords ("Where was {p0}" must
+                # not match "Where was the founder of X born" via p0 = "... born")
+                if any(_keywords(v) & entry["keywords"] for v in values):
+                    continue
+                # ...and the question must ask for the same relations ("Where was {p0} born" must not
+                # answer "Where was Elon Musk's wife born")
+                if relation_words(norm) != entry["relations"]:
+                    continue
+                params = {
+                    name: value.title() if transform == "title" and value.islower() else value
+                    for (name, transform), value in zip(entry["params"], values)
+                }
+                return self._hit(key, entry, params)
+
+            self.misses += 1
+            return None
+
+    def store(self, question: str, cypher: str):
+        """
+        Lift literals out of `cypher`, cache the template and return its key.
+        A template whose fixed text has no keyword left ("{p0}", "Who is {p0}")
+        would match almost any question, so it is not cached and None is returned.
+        """
+        norm = normalize_question(question)
+        shape, template, params = norm, cypher, []
+
+        for match in _LITERAL.finditer(cypher):
+            literal = match.group(1) if match.group(1) is not None else match.group(2)
+            if not literal or any(literal == p[2] for p in params):
+                continue
+            span = re.search(r"(?<!\w)" + re.escape(literal) + r"(?!\w)", shape, re.IGNORECASE)
+            if not span:
+                continue
+            name = f"p{len(params)}"
+            # The graph stores title-cased names, so re-apply the casing the LLM chose
+            transform = "title" if literal == literal.title() else "same"
+            shape = shape[:span.start()] + "{" + name + "}" + shape[span.end():]
+            template = template.replace(match.group(0), "$" + name)
+            params.append((name, transform, literal))
+
+        # Placeholders must appear in the order they were captured
+        order = [m.group(1) for m in _PLACEHOLDER.finditer(shape)]
+        by_name = {p[0]: p for p in params}
+        params = [by_name[name] for name in order]
+
+        keywords = _keywords(_PLACEHOLDER.sub(" ", shape))
+        if params and not keywords:
+            return None
+
+        pattern = "^" + "".join(
+            "(.+?)" if i % 2 else re.escape(part)
+            for i, part in enumerate(_PLACEHOLDER.split(shape))
+        ) + "$"
+        key = shape.lower()
+        with self._lock:
+            self._entries[key] = {
+                "cypher": template,
+                "params": [(name, transform) for name, transform, _ in params],
+                "regex": re.compile(pattern, re.IGNORECASE),
+                "keywords": keywords,
+                "relations": relation_words(_PLACEHOLDER.sub(" ", shape)),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key
+
+    def drop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def _hit(self, key, entry, params):
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry["cypher"], params, key
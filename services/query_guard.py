@@ -0,0 +1,160 @@
+"""
+Guarded execution for LLM-generated Cypher. Before a query reaches Neo4j it
+must pass these checks:
+
+- a single read-only statement: no write or admin clauses, and only
+  allow-listed procedures
+- no unbounded variable-length paths (`*`, `*2..`)
+- a bounded result: the final RETURN gets SKIP/LIMIT for the requested page,
+  and a LIMIT the query already has is capped at QUERY_MAX_ROWS
+- an EXPLAIN whose largest estimated row count is at most
+  QUERY_MAX_ESTIMATED_ROWS
+
+It then runs in a read transaction with a server-side timeout, and only one
+page of records is read.
+"""
+import re
+
+from utils import metrics
+from configs.config import QUERY_TIMEOUT, QUERY_PAGE_SIZE, QUERY_MAX_ROWS, QUERY_MAX_ESTIMATED_ROWS
+
+_LITERALS = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|`[^`]*`|//[^\n]*|/\*.*?\*/', re.S)
+_WRITE_CLAUSES = re.compile(
+    r"(?<![\w.$])(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV|IN\s+TRANSACTIONS|"
+    r"GRANT|REVOKE|DENY|ALTER|RENAME|START\s+DATABASE|STOP\s+DATABASE|USE)\b",
+    re.I,
+)
+_PROCEDURE = re.compile(r"(?<![\w.$])CALL\s+([\w.]+)", re.I)
+_READ_PROCEDURES = {"db.index.fulltext.querynodes", "db.labels", "db.relationshiptypes", "db.propertykeys"}
+_VAR_LENGTH = re.compile(r"\*\s*(\d*)\s*(\.\.)?\s*(\d*)\s*(?:\{[^}]*\}\s*)?\]")
+_RETURN = re.compile(r"(?<![\w.$])RETURN\b", re.I)
+_UNION = re.compile(r"(?<![\w.$])UNION\b", re.I)
+# Literal SKIP/LIMIT at the end of the final RETURN
+_TAIL = re.compile(r"(?:\s+SKIP\s+(\d+))?(?:\s+LIMIT\s+(\d+))?\s*;?\s*$", re.I)
+_PAGING = re.compile(r"(?<![\w.$])(SKIP|LIMIT)\b", re.I)
+
+
+class query_rejected(Exception):
+    """A generated query the guard will not run; the message says why."""
+
+
+class query_page(list):
+    """One page of result values, plus what is needed to fetch the next one."""
+
+    def __init__(self, values, cypher, params, skip, has_more, columns=()):
+        super().__init__(values)
+        self.cypher = cypher
+        self.params = params
+        self.skip = skip
+        self.has_more = has_more
+        self.columns = list(columns)
+
+    @property
+    def next_skip(self):
+        return self.skip + len(self)
+
+
+def _masked(cypher):
+    """`cypher` with string literals, quoted names and comments blanked out (same length)."""
+    return _LITERALS.sub(lambda m: " " * len(m.group(0)), cypher)
+
+
+def check_read_only(cypher):
+    masked = _masked(cypher)
+    if ";" in masked.rstrip().rstrip(";"):
+        raise query_rejected("only a single statement is allowed")
+    clause = _WRITE_CLAUSES.search(masked)
+    if clause:
+        raise query_rejected(f"{clause.group(1).upper()} is not allowed in a read-only query")
+    for procedure in _PROCEDURE.findall(masked):
+        if procedure.lower() not in _READ_PROCEDURES:
+            raise query_rejected(f"procedure {procedure} is not allowed")
+    for low, dots, high in _VAR_LENGTH.findall(masked):
+        if (dots and not high) or (not dots and not low):
+            raise query_rejected("variable-length paths need an upper bound, e.g. [*1..3]")
+    if not _RETURN.search(masked):
+        raise query_rejected("the query returns nothing")
+
+
+def bounded(cypher, skip=0, page_size=QUERY_PAGE_SIZE, max_rows=QUERY_MAX_ROWS):
+    """
+    Rewrite the final SKIP/LIMIT so the query returns rows [skip, skip + page_size]
+    of what it would return (one extra row tells whether there is a next page),
+    never past `max_rows`. Returns None once `skip` has reached the end.
+    """
+    masked = _masked(cypher)
+    if _UNION.search(masked):
+        # SKIP/LIMIT would only bind the last branch; page over the whole union instead
+        cypher = f"CALL {{\n{cypher.rstrip().rstrip(';')}\n}}\nRETURN *"
+        masked = _masked(cypher)
+    tail = _TAIL.search(masked)
+    body = cypher[:tail.start()]
+    last_return = list(_RETURN.finditer(masked))[-1].start()
+    if _PAGING.search(masked, last_return, tail.start()):
+        raise query_rejected("SKIP/LIMIT must be literal numbers at the end of the query")
+
+    own_skip = int(tail.group(1) or 0)
+    own_limit = min(int(tail.group(2)), max_rows) if tail.group(2) else max_rows
+    remaining = own_limit - skip
+    if remaining <= 0:
+        return None
+    return f"{body}\nSKIP {own_skip + skip} LIMIT {min(page_size + 1, remaining)}"
+
+
+def estimated_rows(plan):
+    """Largest EstimatedRows of any operator in an EXPLAIN plan (dict form), or None."""
+    if not plan:
+        return None
+    estimates = [(plan.get("args") or {}).get("EstimatedRows")]
+    estimates += [estimated_rows(child) for child in plan.get("children") or []]
+    estimates = [e for e in estimates if e is not None]
+    return max(estimates) if estimates else None
+
+
+def run_guarded(driver, cypher, params=None, skip=0, page_size=QUERY_PAGE_SIZE, timeout=QUERY_TIMEOUT,
+                max_estimated_rows=QUERY_MAX_ESTIMATED_ROWS):
+    """
+    Check, bound and run one page of a generated query. Returns a query_page of
+    first-column values; raises query_rejected if the query fails a check.
+    """
+    from neo4j import unit_of_work
+
+    params = params or {}
+    try:
+        check_read_only(cypher)
+        query = bounded(cypher, skip, page_size)
+    except query_rejected:
+        metrics.incr("queries_rejected")
+        raise
+    if query is None:
+        return query_page([], cypher, params, skip, False)
+
+    @unit_of_work(timeout=timeout or None)
+    def read_page(tx):
+        if max_estimated_rows:
+            summary = tx.run("EXPLAIN " + query, params).consume()
+            estimate = estimated_rows(getattr(summary, "plan", None))
+            if estimate is not None and estimate > max_estimated_rows:
+                raise query_rejected(
+                    f"the plan estimates {int(estimate):,} rows (limit {max_estimated_rows:,}); "
+                    "narrow the query with a name or relation"
+                )
+        result = tx.run(query, params)
+        values, columns = [], None
+        for record in result:
+            if len(values) == page_size:
+                return values, columns, True
+            columns = columns or list(record.keys())
+            values.append(list(record.values())[0])
+        return values, columns or [], False
+
+    with metrics.span("neo4j.query", skip=skip) as span:
+        try:
+            with driver.session() as session:
+                values, columns, has_more = session.execute_read(read_page)
+        except query_rejected:
+            metrics.incr("queries_rejected")
+            raise
+        span["rows"] = len(values)
+    metrics.incr("db_round_trips")
+    return query_page(values, cypher, params, skip, has_more, columns)
@@ -0,0 +1,147 @@
+import re
+
+from utils.logger import logger
+
+# (name, label, property) — ENTITY/ALIAS names are what every MERGE and lookup keys on
+UNIQUE_CONSTRAINTS = [
+    ("entity_name_unique", "ENTITY", "name"),
+    ("alias_name_unique", "ALIAS", "name"),
+    ("source_id_unique", "SOURCE", "id"),
+    ("chunk_tag_unique", "CHUNK", "tag"),
+]
+
+# Graphs tagged before (:CHUNK) nodes existed get them once, when chunk_tag_unique is first created
+_INDEX_EXISTING_TAGS = """
+    MATCH (n) WHERE (n:ENTITY OR n:ALIAS) AND n.chunks IS NOT NULL
+    UNWIND n.chunks AS tag
+    WITH tag, collect(CASE WHEN n:ENTITY THEN n.name END) AS entities,
+         collect(CASE WHEN n:ALIAS THEN n.name END) AS aliases
+    MERGE (c:CHUNK {tag: tag})
+    SET c.entities = entities, c.aliases = aliases
+"""
+
+# TEXT indexes back the `name CONTAINS "..."` lookups the generate_query prompt suggests
+TEXT_INDEXES = [
+    ("entity_name_text", "ENTITY", "name"),
+    ("alias_name_text", "ALIAS", "name"),
+]
+
+FULLTEXT_INDEX = "entity_alias_names"
+
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def ensure_schema(driver):
+    """
+    Idempotently create constraints and indexes. Safe to call on every startup.
+
+    Duplicate rule: before a uniqueness constraint is created for the first
+    time, nodes sharing the same name are merged into the one created first.
+    Its relationships, aliases and chunk tags are moved onto the survivor
+    and the others are deleted.
+    """
+    with driver.session() as session:
+        existing = {r["name"] for r in session.run("SHOW CONSTRAINTS YIELD name RETURN name")}
+
+    for name, label, prop in UNIQUE_CONSTRAINTS:
+        if name in existing:
+            continue
+        merged = merge_duplicates(driver, label, prop)
+        if merged:
+            logger.warning(f"🔁 Merged {merged} duplicate {label} node(s) before adding {name}")
+        with driver.session() as session:
+            session.run(
+                f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE"
+            ).consume()
+            if label == "CHUNK":
+                session.run(_INDEX_EXISTING_TAGS).consume()
+
+    with driver.session() as session:
+        for name, label, prop in TEXT_INDEXES:
+            session.run(f"CREATE TEXT INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})").consume()
+        session.run(
+            f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS FOR (n:ENTITY|ALIAS) ON EACH [n.name]"
+        ).consume()
+    logger.info("🗂️ Neo4j schema ready (constraints + indexes)")
+
+
+def merge_duplicates(driver, label, prop="name"):
+    """Merge nodes of `label` that share `prop` into one. Returns the number of nodes removed."""
+    with driver.session() as session:
+        groups = session.run(
+            f"""
+            MATCH (n:{label}) WHERE n.{prop} IS NOT NULL
+            WITH n.{prop} AS key, n ORDER BY id(n)
+            WITH key, collect(elementId(n)) AS ids
+            WHERE size(ids) > 1
+            RETURN key, ids
+            """
+        ).data()
+
+    removed = 0
+    for group in groups:
+        keep, duplicates = group["ids"][0], group["ids"][1:]
+        with driver.session() as session:
+            session.execute_write(_merge_into, keep, duplicates)
+        removed += len(duplicates)
+    return removed
+
+
+def _merge_into(tx, keep, duplicates):
+    for dup in duplicates:
+        rels = tx.run(
+            """
+            MATCH (d) WHERE elementId(d) = $dup
+            MATCH (d)-[r]-(o)
+            RETURN type(r) AS type, elementId(o) AS other,
+                   startNode(r) = d AS outgoing, r.chunks AS chunks
+            """,
+            dup=dup,
+        ).data()
+        for rel in rels:
+            other = keep if rel["other"] == dup else rel["other"]
+            rel_type = rel["type"].replace("`", "``")
+            pattern = "(k)-[r:`{t}`]->(o)" if rel["outgoing"] else "(o)-[r:`{t}`]->(k)"
+            tx.run(
+                f"""
+                MATCH (k) WHERE elementId(k) = $keep
+                MATCH (o) WHERE elementId(o) = $other
+                MERGE {pattern.format(t=rel_type)}
+                SET r.chunks = CASE WHEN $chunks IS NULL THEN r.chunks
+                    ELSE [c IN coalesce(r.chunks, []) WHERE NOT c IN $chunks] + $chunks END
+                """,
+                keep=keep, other=other, chunks=rel["chunks"],
+            ).consume()
+        tx.run(
+            """
+            MATCH (k) WHERE elementId(k) = $keep
+            MATCH (d) WHERE elementId(d) = $dup
+            SET k.chunks = CASE WHEN d.chunks IS NULL THEN k.chunks
+                ELSE [c IN coalesce(k.chunks, []) WHERE NOT c IN d.chunks] + d.chunks END
+            DETACH DELETE d
+            """,
+            keep=keep, dup=dup,
+        ).consume()
+
+
+def search_names(driver, text: str, limit: int = 5):
+    """
+    Resolve a partial name or alias to ENTITY names through the full-text index.
+    Aliases are followed to the entity they belong to.
+    """
+    terms = [_LUCENE_SPECIAL.sub(r"\\\1", t) for t in text.split() if t]
+    if not terms:
+        return []
+    query = " AND ".join(f"{t}~" if len(t) > 3 else t for t in terms)
+    with driver.session() as session:
+        result = session.run(
+            f"""
+            CALL db.index.fulltext.queryNodes("{FULLTEXT_INDEX}", $query) YIELD node, score
+            OPTIONAL MATCH (node:ALIAS)-[:ALIAS_OF]->(e:ENTITY)
+            WITH coalesce(e, node) AS entity, max(score) AS score
+            WHERE entity:ENTITY
+            RETURN entity.name AS name ORDER BY score DESC LIMIT $limit
+            """,
+            query=query, limit=limit,
+        )
+        return [record["name"] for record in result]
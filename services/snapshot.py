@@ -0,0 +1,282 @@
+"""
+Graph snapshots: the ENTITY/ALIAS/relationship graph as one compressed NumPy
+(.npz) file of columns, to move a graph between environments or warm a new
+instance without re-extracting.
+
+    python -m services.snapshot export graph.npz
+    python -m services.snapshot import graph.npz [--reset]
+
+Every name (entity or alias) is stored once, in a UTF-8 string dictionary
+(`names_blob` + `names_offsets`); relation types get their own dictionary.
+Edges are three int32 columns (head, relation, tail) and aliases two
+(alias, entity), so a fact costs 12 bytes before compression however long
+its names are.
+
+Export pages through entities by name (keyset on the unique-name index, not
+SKIP), one read transaction per page. Pages are not one consistent read, so
+export while no build is running. Import writes back through bulk_writer's
+UNWIND statements, SNAPSHOT_WRITE_ROWS rows per transaction. Chunk tags and
+SOURCE nodes are not included: an imported graph is untagged, and an
+incremental sync of a source re-ingests it once.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from utils.logger import logger
+from utils import metrics
+from configs.config import SNAPSHOT_PAGE_SIZE, SNAPSHOT_WRITE_ROWS, BULK_BATCH_SIZE
+from services.bulk_writer import bulk_writer, relation_type
+
+FORMAT = "kg-snapshot/1"
+
+# The first page uses >= so an empty-string name is exported too; later pages continue after the last name.
+# Non-string names never compare to a string and are left out (see export_snapshot's skipped_names).
+EXPORT_QUERY = """
+    MATCH (e:ENTITY) WHERE e.name {op} $after
+    WITH e ORDER BY e.name LIMIT $limit
+    RETURN e.name AS name,
+           [(e)-[r]->(t:ENTITY) | [type(r), t.name]] AS edges,
+           [(a:ALIAS)-[:ALIAS_OF]->(e) | a.name] AS aliases
+"""
+
+# Entities without any edge; everything else is created by the triple MERGEs
+ENTITY_QUERY = """
+    UNWIND $rows AS row
+    MERGE (:ENTITY {name: row.name})
+"""
+
+
+class _strings:
+    """String dictionary: each distinct string gets the next int id."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def id(self, value):
+        index = self.ids.get(value)
+        if index is None:
+            index = self.ids[value] = len(self.ids)
+        return index
+
+    def arrays(self):
+        encoded = [value.encode("utf-8") for value in self.ids]  # dicts keep insertion (= id) order
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _column(values):
+    return np.frombuffer(values, dtype=np.int32) if values else np.zeros(0, dtype=np.int32)
+
+
+def _decode(blob, offsets):
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def iter_pages(driver, page_size=SNAPSHOT_PAGE_SIZE):
+    """Yield pages of {name, edges: [[rel, tail]], aliases: [name]} records, in name order."""
+    after, query = "", EXPORT_QUERY.format(op=">=")
+    while True:
+        with driver.session() as session:
+            records = session.execute_read(
+                lambda tx: [dict(r) for r in tx.run(query, after=after, limit=page_size)]
+            )
+        if not records:
+            return
+        yield records
+        if len(records) < page_size:
+            return
+        after, query = records[-1]["name"], EXPORT_QUERY.format(op=">")
+
+
+def export_snapshot(driver, target, page_size=SNAPSHOT_PAGE_SIZE):
+    """
+    Write the graph to `target` (a path or a binary file object). Pages are
+    appended to int32 columns as they arrive, so memory holds the columns and
+    the name dictionary, never the rows. Names that are not strings cannot
+    round-trip through the string dictionary; their edges and aliases are
+    skipped and counted in `skipped_names`. Returns counts and timings.
+    """
+    start = time.perf_counter()
+    names, relations = _strings(), _strings()
+    entities = array("i")
+    heads, rels, tails = array("i"), array("i"), array("i")
+    alias_names, alias_entities = array("i"), array("i")
+    pages = skipped = 0
+    with metrics.span("snapshot.export"):
+        for page in iter_pages(driver, page_size):
+            pages += 1
+            for record in page:
+                entity = names.id(record["name"])
+                entities.append(entity)
+                for rel, tail in record["edges"]:
+                    if not isinstance(tail, str):
+                        skipped += 1
+                        continue
+                    heads.append(entity)
+                    rels.append(relations.id(rel))
+                    tails.append(names.id(tail))
+                for alias in record["aliases"]:
+                    if not isinstance(alias, str):
+                        skipped += 1
+                        continue
+                    alias_names.append(names.id(alias))
+                    alias_entities.append(entity)
+
+        names_blob, names_offsets = names.arrays()
+        relations_blob, relations_offsets = relations.arrays()
+        if isinstance(target, str) and not target.endswith(".npz"):
+            target += ".npz"  # savez would add it anyway
+        np.savez_compressed(
+            target,
+            format=np.array(FORMAT),
+            names_blob=names_blob, names_offsets=names_offsets,
+            relations_blob=relations_blob, relations_offsets=relations_offsets,
+            entities=_column(entities),
+            edge_head=_column(heads), edge_rel=_column(rels), edge_tail=_column(tails),
+            alias_name=_column(alias_names), alias_entity=_column(alias_entities),
+        )
+
+    stats = {
+        "entities": len(entities),
+        "edges": len(heads),
+        "aliases": len(alias_names),
+        "relation_types": len(relations.ids),
+        "pages": pages,
+        "skipped_names": skipped,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+    if isinstance(target, str):
+        stats["path"] = target
+        stats["bytes"] = os.path.getsize(target)
+    elif hasattr(target, "tell"):
+        stats["bytes"] = target.tell()
+    if skipped:
+        logger.warning(f"⚠️ Snapshot export skipped {skipped} edge(s)/alias(es) with non-string names")
+    metrics.incr("snapshot_edges_exported", stats["edges"])
+    logger.info(f"💾 Exported {stats['entities']} entities, {stats['edges']} edges, "
+                f"{stats['aliases']} aliases in {stats['seconds']}s")
+    return stats
+
+
+def import_snapshot(driver, source, write_rows=SNAPSHOT_WRITE_ROWS, batch_size=BULK_BATCH_SIZE):
+    """
+    MERGE a snapshot (path or binary file object) into the graph: entities
+    without edges, then edges grouped by relation type, then aliases, each
+    in transactions of `write_rows` rows. Importing into a non-empty graph
+    adds to it. Relation types come from the file, so they are sanitized like
+    every other write (relation_type) before they reach a Cypher statement;
+    edges whose type sanitizes to nothing are dropped. Returns counts and timings.
+    """
+    start = time.perf_counter()
+    with np.load(source, allow_pickle=False) as data:
+        if str(data["format"]) != FORMAT:
+            raise ValueError(f"Unsupported snapshot format {str(data['format'])!r}; expected {FORMAT!r}")
+        names = _decode(data["names_blob"], data["names_offsets"])
+        relations = _decode(data["relations_blob"], data["relations_offsets"])
+        entities = data["entities"]
+        heads, rels, tails = data["edge_head"], data["edge_rel"], data["edge_tail"]
+        alias_names, alias_entities = data["alias_name"], data["alias_entity"]
+    _check_ids("name", names, entities, heads, tails, alias_names, alias_entities)
+    _check_ids("relation", relations, rels)
+    relations = [relation_type(rel) for rel in relations]
+
+    writer = bulk_writer(driver, batch_size)
+    step = max(1, write_rows)
+    with metrics.span("snapshot.import"):
+        isolated = np.setdiff1d(entities, np.concatenate([heads, tails]))
+        entity_trips = 0
+        for i in range(0, len(isolated), step):
+            rows = [{"name": names[n]} for n in isolated[i:i + step]]
+            with driver.session() as session:
+                entity_trips += session.execute_write(_write_entities, rows, writer.batch_size)
+
+        # Sorted by relation type, so each transaction needs few statements
+        order = np.argsort(rels, kind="stable")
+        dropped = 0
+        for i in range(0, len(order), step):
+            groups = {}
+            for j in order[i:i + step]:
+                rel = relations[rels[j]]
+                if not rel:
+                    dropped += 1
+                    continue
+                groups.setdefault(rel, []).append({"head": names[heads[j]], "tail": names[tails[j]]})
+            if groups:
+                writer.write_groups(groups, [])
+
+        for i in range(0, len(alias_names), step):
+            rows = [
+                {"entity": names[e], "alias": names[a]}
+                for a, e in zip(alias_names[i:i + step], alias_entities[i:i + step])
+            ]
+            writer.write_groups({}, rows)
+
+    stats = {
+        "entities": len(entities),
+        "edges": len(heads) - dropped,
+        "dropped_edges": dropped,
+        "aliases": len(alias_names),
+        "relation_types": len(set(filter(None, relations))),
+        "round_trips": writer.totals["round_trips"] + entity_trips,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+    metrics.incr("snapshot_edges_imported", stats["edges"])
+    logger.info(f"📥 Imported {stats['entities']} entities, {stats['edges']} edges, "
+                f"{stats['aliases']} aliases in {stats['seconds']}s")
+    return stats
+
+
+def _check_ids(kind, values, *columns):
+    """Every id column must index into its dictionary; a crafted file fails here, not halfway through."""
+    for column in columns:
+        if column.dtype.kind not in "iu":
+            raise ValueError(f"Snapshot {kind} ids must be integers, got {column.dtype}")
+        if len(column) and (column.min() < 0 or column.max() >= len(values)):
+            raise ValueError(f"Snapshot {kind} ids out of range (dictionary has {len(values)} entries)")
+
+
+def _write_entities(tx, rows, batch_size):
+    for i in range(0, len(rows), batch_size):
+        tx.run(ENTITY_QUERY, rows=rows[i:i + batch_size]).consume()
+    return (len(rows) + batch_size - 1) // batch_size
+
+
+# ----------------- CLI -----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write the graph to a snapshot file")
+    export.add_argument("path")
+    export.add_argument("--page-size", type=int, default=SNAPSHOT_PAGE_SIZE)
+
+    load = commands.add_parser("import", help="load a snapshot file into the graph")
+    load.add_argument("path")
+    load.add_argument("--reset", action="store_true", help="delete the current graph first")
+
+    args = parser.parse_args(argv)
+    # kg_service bootstraps the schema: import MERGEs need the unique-name indexes
+    from services.kg_service import kg_service
+
+    kg = kg_service()
+    if kg.driver is None:
+        sys.exit(1)
+    if args.command == "export":
+        stats = export_snapshot(kg.driver, args.path, args.page_size)
+    else:
+        if args.reset:
+            kg.reset_kg()
+        stats = import_snapshot(kg.driver, args.path)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
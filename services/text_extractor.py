@@ -1,76 +1,326 @@
+import codecs
 import logging
-import requests
-import logging
-from bs4 import BeautifulSoup
-import certifi
+import re
+import time
+from functools import lru_cache
+
 import streamlit as st
-import pandas as pd
-import certifi
+
+from configs.config import (
+    CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_MIN_TOKENS, LLM_CONTEXT_TOKENS, EXTRACTION_OUTPUT_RATIO,
+    HTTP_TIMEOUT, TOKENIZER_ENCODING,
+)
+from services.prompts import extraction_prompt
+from utils import metrics
 
 logger = logging.getLogger(__name__)
 
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36"
+}
+READ_BLOCK = 64 * 1024
+# Sentence ends: terminal punctuation (plus closing quotes/brackets) before whitespace, or a line break
+_SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*(?=\s)|\n")
+_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "prof.", "st.", "jr.", "sr.", "inc.", "ltd.", "co.", "corp.",
+                  "vs.", "e.g.", "i.e.", "no.", "fig.", "approx."}
+_INITIALS = re.compile(r"(?:^|\s)(?:[A-Za-z]\.)+$")
+MAX_SENTENCE_CHARS = 16 * 1024
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        logger.warning(f"⚠️ tiktoken unavailable ({e}); estimating 4 characters per token")
+        return None
+
+
+@lru_cache(maxsize=65536)
+def _word_tokens(word: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return len(word) // 4 + 1
+    return len(enc.encode(" " + word, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return len(text) // 4 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
 def chunk_text(text, max_length=10000):
     """Split the text into chunks of max_length, without cutting words."""
     chunks = []
-    while len(text) > max_length:
-        split_point = text.rfind(" ", 0, max_length)
+    start, end = 0, len(text)
+    stripped_end = len(text.rstrip())
+    # Walk an index through the text instead of re-slicing the remainder each time
+    while end - start > max_length:
+        split_point = text.rfind(" ", start, start + max_length)
         if split_point == -1:
-            split_point = max_length
-        chunks.append(text[:split_point].strip())
-        text = text[split_point:].strip()
-    if text:
-        chunks.append(text.strip())
+            split_point = start + max_length
+        chunks.append(text[start:split_point].strip())
+        start, end = split_point, stripped_end
+        while start < end and text[start].isspace():
+            start += 1
+    if text[start:end].strip():
+        chunks.append(text[start:end].strip())
     return chunks
 
-def extract_text_from_file(uploaded_file, max_length=3000):
+
+def iter_sentences(pieces):
     """
-    Extract text from a file and return as a list of chunks.
+    Yield whitespace-normalised sentences from a stream of text pieces. Splits
+    on ./!/? before whitespace (not after common abbreviations or initials)
+    and on line breaks, so CSV rows stay whole. Text with no boundary for
+    MAX_SENTENCE_CHARS is cut at the last space.
     """
-    if uploaded_file is None:
-        return []
+    carry, scanned = "", 0
+    for piece in pieces:
+        if not piece:
+            continue
+        carry += piece
+        start = 0
+        # Re-check the previous tail: a "." at the end of a piece only ends a sentence once whitespace follows
+        for m in _SENTENCE_END.finditer(carry, max(scanned - 8, 0)):
+            sentence = carry[start:m.end()]
+            if m.group() != "\n" and _is_abbreviation(sentence):
+                continue
+            sentence = " ".join(sentence.split())
+            if sentence:
+                yield sentence
+            start = m.end()
+        carry = carry[start:]
+        if len(carry) > MAX_SENTENCE_CHARS:
+            cut = carry.rfind(" ", 0, MAX_SENTENCE_CHARS)
+            cut = cut if cut > 0 else MAX_SENTENCE_CHARS
+            yield " ".join(carry[:cut].split())
+            carry = carry[cut:]
+        scanned = len(carry)
+    carry = " ".join(carry.split())
+    if carry:
+        yield carry
 
-    try:
-        content = uploaded_file.read().decode("utf-8")
-        return chunk_text(content, max_length)
-    except Exception as e:
-        st.error(f"❌ Failed to extract text from file {uploaded_file.name}: {e}")
-        return []
 
-def extract_text_from_url(url, max_length=3000):
+def _is_abbreviation(sentence):
+    tail = sentence.rstrip("\"'”’)]")
+    last = tail[tail.rfind(" ") + 1:].lower()
+    return last in _ABBREVIATIONS or bool(_INITIALS.search(tail[-8:]))
+
+
+@lru_cache(maxsize=None)
+def chunk_budget(max_tokens=None):
     """
-    Extract text from a URL (HTML or CSV) and return as a list of chunks.
-    - If HTML: grab text from <p> tags
-    - If CSV: read via pandas and flatten into text
+    Text tokens one extraction call can take: what is left of the model window
+    after the prompt template and CHUNK_MIN_TOKENS of tail-merge slack, shared
+    between the chunk and the output it produces (EXTRACTION_OUTPUT_RATIO output
+    tokens per input token). Capped at max_tokens when given.
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.0.0 Safari/537.36"
-    }
-    try:
-        r = requests.get(url, headers=headers, verify=certifi.where())
+    free = LLM_CONTEXT_TOKENS - count_tokens(extraction_prompt("")) - CHUNK_MIN_TOKENS
+    budget = int(free / (1 + EXTRACTION_OUTPUT_RATIO))
+    if budget < CHUNK_MIN_TOKENS:
+        logger.warning(f"⚠️ Extraction prompt leaves only {budget} tokens per chunk; using {CHUNK_MIN_TOKENS}")
+        budget = CHUNK_MIN_TOKENS
+    return min(max_tokens, budget) if max_tokens else budget
+
+
+def _units(pieces, limit):
+    """(text, tokens) per sentence; sentences longer than `limit` are cut between words."""
+    for sentence in iter_sentences(pieces):
+        words = sentence.split(" ")
+        costs = [_word_tokens(word) for word in words]
+        tokens = sum(costs)
+        if tokens <= limit:
+            yield sentence, tokens
+            continue
+        run, run_tokens = [], 0
+        for word, cost in zip(words, costs):
+            if run and run_tokens + cost > limit:
+                yield " ".join(run), run_tokens
+                run, run_tokens = [], 0
+            run.append(word)
+            run_tokens += cost
+        if run:
+            yield " ".join(run), run_tokens
+
+
+def iter_chunks(pieces, max_tokens=CHUNK_MAX_TOKENS, overlap=CHUNK_OVERLAP_TOKENS, min_tokens=CHUNK_MIN_TOKENS):
+    """
+    Pack a stream of text pieces into chunks of whole sentences, each at most
+    chunk_budget(max_tokens) tokens (tiktoken). With `overlap`, a chunk starts
+    with the last sentences of the previous one, up to that many tokens. A
+    final chunk under `min_tokens` is folded into the one before it, which
+    may then run up to `min_tokens` over the budget (chunk_budget reserves
+    that slack). At most two chunks are held in memory.
+    """
+    limit = chunk_budget(max_tokens)
+    overlap = min(overlap, limit // 2)
+    units, tokens, fresh = [], 0, 0  # current chunk; `fresh` units are not overlap from the previous one
+    held = None  # previous chunk, kept back until we know whether the tail folds into it
+    for text, cost in _units(pieces, limit):
+        if fresh and tokens + cost > limit:
+            if held:
+                yield _chunk(*held)
+            held = (units, tokens)
+            units, tokens = _overlap(units, overlap)
+            fresh = 0
+            if tokens + cost > limit:
+                units, tokens = [], 0
+        units.append((text, cost))
+        tokens += cost
+        fresh += 1
+
+    tail = units[len(units) - fresh:] if fresh else []
+    tail_tokens = sum(cost for _, cost in tail)
+    if held and tail and tail_tokens < min_tokens:
+        metrics.incr("chunks_merged")
+        yield _chunk(held[0] + tail, held[1] + tail_tokens)
+        return
+    if held:
+        yield _chunk(*held)
+    if tail:
+        yield _chunk(units, tokens)
+
 
+def _overlap(units, overlap):
+    """The trailing units of a chunk that fit in `overlap` tokens."""
+    kept, tokens = [], 0
+    for text, cost in reversed(units):
+        if tokens + cost > overlap:
+            break
+        kept.append((text, cost))
+        tokens += cost
+    kept.reverse()
+    return kept, tokens
+
+
+def _chunk(units, tokens):
+    _count_chunk(tokens)
+    return " ".join(text for text, _ in units)
+
+
+def _count_chunk(tokens):
+    metrics.incr("chunks")
+    metrics.incr("chunk_tokens", tokens)
+
+
+def iter_file_text(uploaded_file, block_size=READ_BLOCK):
+    """Decode an uploaded file block by block."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        block = uploaded_file.read(block_size)
+        if not block:
+            break
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_html_paragraphs(byte_blocks, encoding=None):
+    """Incrementally parse HTML and yield the text of each <p>, freeing parsed elements as it goes."""
+    from lxml import etree  # URL inputs only; keeps lxml out of the app's cold start
+
+    parser = etree.HTMLPullParser(events=("end",), tag="p", encoding=encoding)
+    for block in byte_blocks:
+        parser.feed(block)
+        yield from _drain_paragraphs(parser)
+    parser.close()
+    yield from _drain_paragraphs(parser)
+
+
+def _drain_paragraphs(parser):
+    for _, element in parser.read_events():
+        text = "".join(element.itertext())
+        element.clear(keep_tail=True)
+        # Drop everything already parsed before this paragraph, at every level
+        for node in [element, *element.iterancestors()]:
+            parent = node.getparent()
+            while parent is not None and node.getprevious() is not None:
+                del parent[0]
+        if text:
+            yield text + " "
+
+
+def iter_response_text(response, url=""):
+    """Yield the text of a streamed HTTP response (HTML <p> text, CSV rows or plain text)."""
+    content_type = response.headers.get("Content-Type", "")
+    if "text/html" in content_type:  # Handle HTML
+        yield from iter_html_paragraphs(response.iter_content(READ_BLOCK), response.encoding)
+    elif "text/csv" in content_type or url.endswith(".csv"):  # Handle CSV from the same response
+        # Without a charset requests would yield bytes; apparent_encoding would read the whole body first
+        response.encoding = response.encoding or "utf-8"
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield line + "\n"
+    else:  # Fallback for plain text or unknown content
+        if response.encoding is None:
+            response.encoding = "utf-8"
+        yield from response.iter_content(READ_BLOCK, decode_unicode=True)
+
+
+def iter_text_from_url(url, max_tokens=CHUNK_MAX_TOKENS):
+    """Stream a URL and yield token-sized chunks lazily."""
+    import certifi
+    import requests
+
+    with metrics.span("http.fetch", url=url) as record:
+        r = requests.get(url, headers=HEADERS, verify=certifi.where(), stream=True, timeout=HTTP_TIMEOUT)
+        record["status"] = r.status_code
+    with r:
         if r.status_code != 200:
             st.warning(f"⚠️ Failed to fetch URL: {url}\nResponse: {r.status_code}")
-            return []
+            return
+        yield from iter_chunks(iter_response_text(r, url), max_tokens)
 
-        content_type = r.headers.get("Content-Type", "")
 
-        text = ""
+def iter_text_from_file(uploaded_file, max_tokens=CHUNK_MAX_TOKENS):
+    yield from iter_chunks(iter_file_text(uploaded_file), max_tokens)
 
-        if "text/html" in content_type:  # Handle HTML
-            soup = BeautifulSoup(r.text, "html.parser")
-            paragraphs = soup.find_all("p")
-            text = " ".join(p.get_text() for p in paragraphs)
 
-        elif "text/csv" in content_type or url.endswith(".csv"):  # Handle CSV
-            df = pd.read_csv(url)
-            # Convert dataframe to text (you can format this better if needed)
-            text = df.to_csv(index=False)
+def extract_text_from_file(uploaded_file, max_tokens=CHUNK_MAX_TOKENS):
+    """
+    Lazily yield the chunks of an uploaded file, from its start, as the
+    consumer asks for them; nothing is yielded if it cannot be read.
+    """
+    if uploaded_file is None:
+        return
 
-        else:  # Fallback for plain text or unknown content
-            text = r.text
+    try:
+        uploaded_file.seek(0)
+        yield from _timed_chunks(iter_text_from_file(uploaded_file, max_tokens), "extract_text_from_file",
+                                 file=uploaded_file.name)
+    except Exception as e:
+        st.error(f"❌ Failed to extract text from file {uploaded_file.name}: {e}")
 
-        return chunk_text(text, max_length)
 
+def extract_text_from_url(url, max_tokens=CHUNK_MAX_TOKENS):
+    """
+    Lazily yield the chunks of a URL (HTML or CSV) while its body streams in.
+    - If HTML: grab text from <p> tags
+    - If CSV: stream the rows of the same response
+    """
+    try:
+        yield from _timed_chunks(iter_text_from_url(url, max_tokens), "extract_text_from_url", url=url)
     except Exception as e:
         st.error(f"⚠️ Error extracting text from URL: {str(e)}")
-        return []
\ No newline at end of file
+
+
+def _timed_chunks(chunks, name, **attrs):
+    """Yield from chunks and record one span with the time spent producing them, not consuming them."""
+    seconds, count = 0.0, 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            count += 1
+            yield chunk
+    finally:
+        chunks.close()
+        metrics.observe(name, seconds, chunks=count, **attrs)
@@ -0,0 +1,166 @@
+import ast
+import json
+import re
+
+from utils.logger import logger
+
+_STRING = re.compile(r'"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'')
+_TRAILING_COMMA = re.compile(r",\s*([\]\}])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_CHUNK_ID = re.compile(r"\[?c(\d+)\]?", re.I)
+
+
+class triple_stream_parser:
+    """
+    Incremental parser for the LLM's `[[head, rel, tail, [aliases]], ...]` output.
+
+    feed() accepts any slice of the response (e.g. streamed tokens) and returns
+    every inner list that closed in it, so ingestion can start before the LLM
+    finishes. Prose, code fences and anything outside the outer list are
+    skipped. An item that fails to parse is repaired or salvaged from its
+    quoted strings instead of discarding the whole response; close() does the
+    same for a truncated final item.
+
+    With chunk_ids=True (batched extraction) every item is expected to start
+    with its chunk id: `[chunk_id, head, rel, tail, [aliases]]`.
+    """
+
+    def __init__(self, chunk_ids=False):
+        self.fields = 4 if chunk_ids else 3
+        self.items = 0
+        self.recovered = 0
+        self.malformed = 0
+        self._depth = 0
+        self._quote = None
+        self._escape = False
+        self._item = []
+
+    def feed(self, text: str):
+        out = []
+        for ch in text:
+            if self._depth >= 2:
+                self._item.append(ch)
+
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == self._quote:
+                    self._quote = None
+                continue
+
+            if ch in "\"'" and self._depth >= 1:
+                self._quote = ch
+            elif ch == "[":
+                self._depth += 1
+                if self._depth == 2:
+                    self._item = ["["]
+            elif ch == "]" and self._depth:
+                self._depth -= 1
+                if self._depth == 1:
+                    self._emit("".join(self._item), out)
+                    self._item = []
+        return out
+
+    def close(self):
+        """Flush a truncated final item, if any, and return what could be recovered."""
+        out = []
+        if self._depth >= 2 and self._item:
+            text = "".join(self._item)
+            if self._quote:
+                text += self._quote
+            text += "]" * (self._depth - 1)
+            self._emit(text, out, truncated=True)
+        self._depth, self._quote, self._escape, self._item = 0, None, False, []
+        return out
+
+    def stats(self):
+        seen = self.items + self.malformed
+        return {
+            "items": self.items,
+            "recovered": self.recovered,
+            "malformed": self.malformed,
+            "recovery_rate": round(self.items / seen, 3) if seen else 1.0,
+        }
+
+    def _emit(self, text, out, truncated=False):
+        item, repaired = _parse_item(text, self.fields)
+        if item is None:
+            self.malformed += 1
+            logger.warning(f"⚠️ Skipped malformed triple: {text[:80]}")
+            return
+        self.items += 1
+        if repaired or truncated:
+            self.recovered += 1
+        out.append(item)
+
+
+def _parse_item(text, fields=3):
+    """Return (item, repaired) or (None, True)."""
+    for attempt, candidate in enumerate(_candidates(text)):
+        try:
+            item = ast.literal_eval(candidate)
+        except Exception:
+            try:
+                item = json.loads(candidate)
+            except Exception:
+                continue
+        if _valid(item, fields):
+            return list(item), attempt > 0
+    item = _salvage(text, fields)
+    return (item, True) if item else (None, True)
+
+
+def _candidates(text):
+    yield text
+    fixed = _TRAILING_COMMA.sub(r"\1", text.translate(_SMART_QUOTES))
+    if fixed != text:
+        yield fixed
+
+
+def _valid(item, fields=3):
+    if not isinstance(item, (list, tuple)) or len(item) < fields:
+        return False
+    return all(isinstance(x, (str, int, float)) and str(x).strip() for x in item[:fields])
+
+
+def _salvage(text, fields=3):
+    """Last resort: the first `fields` quoted strings, plus any quoted strings in a nested list as aliases."""
+    nested = text.find("[", 1)
+    head_part = text[:nested] if nested != -1 else text
+    strings = [a if a else b for a, b in _STRING.findall(head_part)]
+    if len(strings) < fields:
+        return None
+    item = strings[:fields]
+    if nested != -1:
+        item.append([a if a else b for a, b in _STRING.findall(text[nested:])])
+    return item
+
+
+def items_to_triples(items):
+    """[head, rel, tail, aliases?] items -> (triples, alias_map), as parse_triples always returned."""
+    triples, alias_map = [], {}
+    for item in items:
+        head, relation, tail = item[:3]
+        triples.append((head, relation, tail))
+        # if 4th element exists, treat it as alias list
+        if len(item) == 4 and isinstance(item[3], list):
+            alias_map[head] = item[3]
+    return triples, alias_map
+
+
+def chunk_index(item, count):
+    """Which of `count` batched chunks a `[chunk_id, ...]` item belongs to, or None if the id is unusable."""
+    m = _CHUNK_ID.fullmatch(str(item[0]).strip())
+    if not m or int(m.group(1)) >= count:
+        return None
+    return int(m.group(1))
+
+
+def parse_response(raw: str):
+    """Parse a complete response. Returns (triples, alias_map, stats)."""
+    parser = triple_stream_parser()
+    items = parser.feed(raw) + parser.close()
+    triples, alias_map = items_to_triples(items)
+    return triples, alias_map, parser.stats()
@@ -1,7 +1,8 @@
-import networkx as nx
-import matplotlib.pyplot as plt
-
 def visualize_graph(graph_data):
+    # networkx and matplotlib are only needed when this static view is drawn
+    import networkx as nx
+    import matplotlib.pyplot as plt
+
     G = nx.Graph()
     G.add_nodes_from(graph_data["nodes"])
     G.add_edges_from([(u, v, {"label": d}) for u, v, d in graph_data["edges"]])
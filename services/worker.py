@@ -0,0 +1,227 @@
+"""
+Background ingestion: worker processes that drain the job queue, and a CLI.
+
+    python -m services.worker run --workers 4            # drain the queue with 4 processes
+    python -m services.worker add --url https://a --url https://b --sitemap https://c/sitemap.xml
+    python -m services.worker add --file notes.txt --text "Javed Akhtar was born in Gwalior."
+    python -m services.worker status [JOB_ID]
+
+Each worker process has its own kg_service (Neo4j driver, resolver, build
+pipeline) and takes one job at a time, so throughput grows with --workers
+until the LLM rate limit or Neo4j becomes the bottleneck.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+
+from utils.logger import logger
+from utils import metrics
+from configs.config import (
+    INCREMENTAL_BUILD, CHUNK_MAX_TOKENS, JOB_UPLOAD_DIR, JOB_WORKERS, JOB_POLL_SECONDS, JOB_STALE_SECONDS,
+)
+from services.job_queue import job_queue, remove_upload
+
+
+# ----------------- Enqueue -----------------
+def enqueue_text(queue, text, source_id="text"):
+    return queue.enqueue("text", {"source": source_id, "text": text}, sources=[source_id])
+
+
+def enqueue_urls(queue, urls, sitemap=None):
+    urls = [u.strip() for u in urls if u and u.strip()]
+    # Sitemap pages are only known once the job runs; the sitemap itself stands in for them
+    sources = [f"url:{u}" for u in urls] + ([f"sitemap:{sitemap}"] if sitemap else [])
+    return queue.enqueue("urls", {"urls": urls, "sitemap": sitemap}, sources=sources)
+
+
+def enqueue_file(queue, name, data: bytes, upload_dir=JOB_UPLOAD_DIR):
+    """Copy the upload where worker processes can read it, then queue it."""
+    os.makedirs(upload_dir, exist_ok=True)
+    # One copy per job: each job removes its own copy when it is over
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    path = os.path.join(upload_dir, f"{digest}-{uuid.uuid4().hex[:8]}-{os.path.basename(name)}")
+    with open(path, "wb") as f:
+        f.write(data)
+    return queue.enqueue("file", {"source": f"file:{name}", "path": path}, sources=[f"file:{name}"])
+
+
+# ----------------- Worker -----------------
+class ingest_worker:
+    """Claims jobs one at a time and runs extraction and insertion for them."""
+
+    def __init__(self, name, queue=None, kg=None, poll=JOB_POLL_SECONDS):
+        # Imported here so `add` / `status` do not load the LLM client and Neo4j driver
+        from services.kg_service import kg_service
+        from services.crawler import crawler
+
+        self.name = name
+        self.queue = queue or job_queue()
+        self.kg = kg or kg_service()
+        self.crawler = crawler(conditional=INCREMENTAL_BUILD)
+        self.poll = poll
+
+    def run(self, once=False):
+        """Process jobs until interrupted (or until the queue is empty with once=True)."""
+        logger.info(f"👷 Worker {self.name} started")
+        while True:
+            job = self.queue.claim(self.name)
+            if job is None:
+                if once:
+                    return
+                time.sleep(self.poll)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job["id"], stop), daemon=True)
+        beat.start()
+        start = time.perf_counter()
+        try:
+            with metrics.trace("job", job_id=job["id"], job_kind=job["kind"]):
+                result = self._run(job)
+            result["seconds"] = round(time.perf_counter() - start, 2)
+            self.queue.finish(job["id"], result)
+            logger.info(f"✅ Job #{job['id']} done: {result}")
+            return result
+        except Exception as e:
+            logger.error(f"❌ Job #{job['id']} failed: {e}")
+            self.queue.fail(job["id"], e)
+        finally:
+            stop.set()
+            # Done or failed, the job is not run again (only a lost worker's job is re-queued)
+            remove_upload(job["kind"], job["payload"])
+
+    def _run(self, job):
+        from services.text_extractor import iter_chunks, iter_text_from_file
+
+        payload = job["payload"]
+        result = {"sources": 0, "unchanged": 0, "failed": []}
+        if job["kind"] == "text":
+            sources = [(payload["source"], list(iter_chunks([payload["text"]], CHUNK_MAX_TOKENS)), None)]
+        elif job["kind"] == "file":
+            with open(payload["path"], "rb") as f:
+                sources = [(payload["source"], list(iter_text_from_file(f, CHUNK_MAX_TOKENS)), None)]
+        elif job["kind"] == "urls":
+            from services.crawler import parse_sitemap
+
+            urls = list(payload["urls"])
+            if payload.get("sitemap"):
+                urls += parse_sitemap(self.crawler.session, payload["sitemap"])
+            sources = []
+            for page in self.crawler.crawl(urls):
+                if page["status"] == "fetched":
+                    sources.append((page["source"], page["chunks"], page))
+                elif page["status"] == "unchanged":
+                    result["unchanged"] += 1
+                else:
+                    result["failed"].append({"url": page["url"], "error": page.get("error")})
+        else:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+
+        total = sum(len(chunks) for _, chunks, _ in sources)
+        self.queue.progress(job["id"], 0, total)
+        on_progress = lambda finished, _: self.queue.progress(job["id"], finished, total)
+        # All sources go through one pipeline run, so small pages share extraction calls
+        if INCREMENTAL_BUILD:
+            stats = self.kg.run_sync_sources([(source_id, chunks) for source_id, chunks, _ in sources], on_progress)
+            failed_sources = set(stats["failed_sources"])
+        else:
+            stats = self.kg.run_build([chunk for _, chunks, _ in sources for chunk in chunks], on_progress)
+            failed_sources = {source_id for source_id, _, _ in sources} if stats["failed_chunks"] or stats["failed_writes"] else set()
+        for source_id, _, page in sources:
+            if page and source_id not in failed_sources:
+                self.crawler.state.save(page)
+        self.queue.progress(job["id"], total, total)
+        result["sources"] = len(sources)
+        for key in ("chunks", "triples", "failed_chunks", "llm_calls", "tokens_per_triple"):
+            result[key] = stats[key]
+        result["skipped_chunks"] = stats.get("skipped_chunks", 0)
+        return result
+
+    def _heartbeat(self, job_id, stop):
+        # Crawls and long LLM calls report no progress for a while; keep the claim alive
+        while not stop.wait(max(1.0, JOB_STALE_SECONDS / 4)):
+            self.queue.heartbeat(job_id)
+
+
+def _worker_main(index, once):
+    ingest_worker(f"{socket.gethostname()}:{os.getpid()}:{index}").run(once=once)
+
+
+def run_workers(count=JOB_WORKERS, once=False):
+    """Start `count` worker processes and wait for them."""
+    if count <= 1:
+        _worker_main(0, once)
+        return
+    # spawn, not fork: every worker opens its own Neo4j driver and SQLite connections
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=_worker_main, args=(i, once), name=f"kg-worker-{i}") for i in range(count)]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        # Jobs left running are re-queued once their heartbeat goes stale
+        for p in processes:
+            p.terminate()
+
+
+# ----------------- CLI -----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="start worker processes")
+    run.add_argument("--workers", type=int, default=JOB_WORKERS)
+    run.add_argument("--once", action="store_true", help="exit when the queue is empty")
+
+    add = commands.add_parser("add", help="queue ingestion jobs")
+    add.add_argument("--url", action="append", default=[])
+    add.add_argument("--url-file", help="file with one URL per line")
+    add.add_argument("--sitemap")
+    add.add_argument("--file", action="append", default=[])
+    add.add_argument("--text")
+
+    status = commands.add_parser("status", help="show recent jobs or one job")
+    status.add_argument("job_id", type=int, nargs="?")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run_workers(args.workers, args.once)
+        return
+
+    queue = job_queue()
+    if args.command == "add":
+        ids = []
+        urls = list(args.url)
+        if args.url_file:
+            with open(args.url_file, encoding="utf-8") as f:
+                urls += f.read().splitlines()
+        if urls or args.sitemap:
+            ids.append(enqueue_urls(queue, urls, args.sitemap))
+        for path in args.file:
+            with open(path, "rb") as f:
+                ids.append(enqueue_file(queue, os.path.basename(path), f.read()))
+        if args.text:
+            ids.append(enqueue_text(queue, args.text))
+        print(json.dumps({"queued": ids}))
+    elif args.command == "status":
+        jobs = [queue.get(args.job_id)] if args.job_id else queue.recent()
+        for job in jobs:
+            if job is None:
+                print(f"No job {args.job_id}", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps({k: job[k] for k in ("id", "kind", "status", "done", "total", "attempts", "result", "error")}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""services/crawler.py against a local http.server: conditional requests, retries and source removal."""
+import os
+
+os.environ.setdefault("KG_LLM_BACKEND", "stub")
+
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.crawler import crawler, crawl_state, make_session
+
+BODY = b"Marie Curie won the Nobel Prize in Physics. She was born in Warsaw."
+
+
+class _handler(BaseHTTPRequestHandler):
+    hits = Counter()
+
+    def do_GET(self):
+        self.hits[self.path] += 1
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(BODY, ETag='"v1"')
+        elif self.path == "/flaky":
+            if self.hits[self.path] == 1:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send(BODY)
+        elif self.path == "/throttled":
+            if self.hits[self.path] == 1:
+                self.send_response(429)
+                self.send_header("Retry-After", "3600")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send(BODY)
+        elif self.path == "/dropped":
+            if self.hits[self.path] == 1:
+                # Promise the full body, send half of it and close the connection mid-read
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(BODY)))
+                self.end_headers()
+                self.wfile.write(BODY[:len(BODY) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self._send(BODY)
+        else:
+            self._send(b"not found", status=404)
+
+    def _send(self, body, status=200, **headers):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _handler.hits.clear()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def state(tmp_path):
+    return crawl_state(str(tmp_path / "crawl.sqlite3"))
+
+
+def _crawler(state):
+    return crawler(session=make_session(2), state=state, max_workers=2, retries=2, backoff=0.01, timeout=5)
+
+
+def _crawl_and_save(c, url):
+    result = c.fetch(url)
+    if result["status"] == "fetched":
+        c.state.save(result)
+    return result
+
+
+def test_unchanged_page_answers_304(server, state):
+    c = _crawler(state)
+    first = _crawl_and_save(c, server + "/page")
+    assert first["status"] == "fetched" and first["chunks"]
+    assert first["etag"] == '"v1"'
+
+    second = c.fetch(server + "/page")
+    assert second["status"] == "unchanged" and second["chunks"] == []
+    assert _handler.hits["/page"] == 2
+
+
+def test_retries_error_status(server, state):
+    result = _crawler(state).fetch(server + "/flaky")
+    assert result["status"] == "fetched" and result["chunks"]
+    assert _handler.hits["/flaky"] == 2
+
+
+def test_retry_after_is_capped_and_frees_the_host_slot(server, state):
+    c = crawler(session=make_session(2), state=state, max_workers=2, per_host=1, retries=1, backoff=0.01,
+                timeout=5, max_retry_after=0.5)
+    throttled = {}
+    thread = threading.Thread(target=lambda: throttled.update(c.fetch(server + "/throttled")))
+    start = time.perf_counter()
+    thread.start()
+    while not _handler.hits["/throttled"]:
+        time.sleep(0.01)
+
+    # The only slot for this host is not held while /throttled waits out its Retry-After
+    assert c.fetch(server + "/page")["status"] == "fetched"
+    assert time.perf_counter() - start < 0.4
+
+    thread.join(5)
+    assert throttled["status"] == "fetched"
+    assert time.perf_counter() - start < 2
+    assert _handler.hits["/throttled"] == 2
+
+
+def test_retries_body_read_error(server, state):
+    result = _crawler(state).fetch(server + "/dropped")
+    assert result["status"] == "fetched"
+    assert "".join(result["chunks"]).strip() == BODY.decode()
+    assert _handler.hits["/dropped"] == 2
+
+
+def test_http_error_is_not_retried(server, state):
+    result = _crawler(state).fetch(server + "/missing")
+    assert result["status"] == "failed" and result["error"] == "HTTP 404"
+    assert _handler.hits["/missing"] == 1
+
+
+@pytest.mark.parametrize("reset", [False, True])
+def test_removed_source_is_fetched_again(server, state, reset):
+    from benchmarks.memory_graph import memory_driver
+    from services.kg_service import kg_service
+
+    c = _crawler(state)
+    url = server + "/page"
+    _crawl_and_save(c, url)
+    assert c.fetch(url)["status"] == "unchanged"
+
+    kg = kg_service(memory_driver())
+    kg.crawl_state = state
+    if reset:
+        kg.reset_kg()
+    else:
+        kg.remove_source(f"url:{url}")
+    assert state.get(url) is None
+    assert c.fetch(url)["status"] == "fetched"
@@ -0,0 +1,27 @@
+"""Extraction results, including empty ones, are served from services/extraction_cache.py on a rebuild."""
+import os
+
+os.environ.setdefault("KG_LLM_BACKEND", "stub")
+os.environ.setdefault("KG_LLM_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("KG_LLM_TOKENS_PER_MINUTE", "0")
+
+import pytest
+
+from benchmarks.memory_graph import memory_driver
+from services.extraction_cache import extraction_cache
+from services.kg_service import kg_service
+
+CHUNKS = ["The weather was pleasant and nothing happened at all.", "Javed Akhtar was born in Gwalior."]
+
+
+@pytest.mark.parametrize("batch_chunks", [1, 4])
+def test_chunk_without_triples_is_cached(tmp_path, batch_chunks):
+    kg = kg_service(memory_driver())
+    kg.extraction_cache = extraction_cache(str(tmp_path / "cache.sqlite3"))
+    kg.batch_chunks = batch_chunks
+
+    first = kg.run_build(CHUNKS)
+    assert first["cache_misses"] == 2 and first["triples"] == 1
+
+    second = kg.run_build(CHUNKS)
+    assert second["cache_hits"] == 2 and second["llm_calls"] == 0
@@ -0,0 +1,72 @@
+"""Per-source claiming and upload cleanup of services/job_queue.py and services/worker.py."""
+import os
+
+from services.job_queue import job_queue, FAILED, RUNNING
+from services.worker import enqueue_file, enqueue_text, ingest_worker
+
+
+def _queue(tmp_path):
+    return job_queue(path=str(tmp_path / "jobs.db"), stale_after=60, max_attempts=2)
+
+
+def test_one_job_per_source_at_a_time(tmp_path):
+    queue = _queue(tmp_path)
+    first = enqueue_text(queue, "Javed Akhtar was born in Gwalior.")
+    second = enqueue_text(queue, "Javed Akhtar is a lyricist.")
+    other = enqueue_text(queue, "Apple Inc. was founded by Steve Jobs.", source_id="notes")
+
+    assert queue.claim("a")["id"] == first
+    # "text" is being written by the first job, so the next claim skips to another source
+    assert queue.claim("b")["id"] == other
+    assert queue.claim("c") is None
+
+    queue.finish(first, {})
+    assert queue.claim("c")["id"] == second
+
+
+def test_jobs_without_sources_are_not_held_back(tmp_path):
+    queue = _queue(tmp_path)
+    first = queue.enqueue("text", {"source": "text", "text": "a"})
+    second = queue.enqueue("text", {"source": "text", "text": "b"})
+    assert queue.claim("a")["id"] == first
+    assert queue.claim("b")["id"] == second
+
+
+class _failing_worker(ingest_worker):
+    def __init__(self, queue):
+        self.name = "test"
+        self.queue = queue
+
+    def _run(self, job):
+        raise RuntimeError("extraction failed")
+
+
+def test_failed_job_removes_its_upload(tmp_path):
+    queue = _queue(tmp_path)
+    enqueue_file(queue, "notes.txt", b"Javed Akhtar was born in Gwalior.", upload_dir=str(tmp_path / "uploads"))
+    job = queue.claim("a")
+    assert os.path.exists(job["payload"]["path"])
+
+    _failing_worker(queue).run_job(job)
+
+    assert queue.get(job["id"])["status"] == FAILED
+    assert not os.path.exists(job["payload"]["path"])
+
+
+def test_same_file_twice_gets_two_copies(tmp_path):
+    queue = _queue(tmp_path)
+    uploads = str(tmp_path / "uploads")
+    first = queue.get(enqueue_file(queue, "notes.txt", b"same", upload_dir=uploads))
+    second = queue.get(enqueue_file(queue, "notes.txt", b"same", upload_dir=uploads))
+    assert first["payload"]["path"] != second["payload"]["path"]
+
+
+def test_lost_job_out_of_attempts_removes_its_upload(tmp_path):
+    queue = job_queue(path=str(tmp_path / "jobs.db"), stale_after=0, max_attempts=1)
+    enqueue_file(queue, "notes.txt", b"data", upload_dir=str(tmp_path / "uploads"))
+    job = queue.claim("a")
+    assert job["status"] == RUNNING
+
+    assert queue.claim("b") is None
+    assert queue.get(job["id"])["status"] == FAILED
+    assert not os.path.exists(job["payload"]["path"])
@@ -0,0 +1,69 @@
+"""Question matching and lookups of services/local_graph.py on a small in-memory graph."""
+import pytest
+
+from services.entity_resolver import entity_resolver
+from services.local_graph import local_graph, match_question
+
+TRIPLES = [
+    ("Javed Akhtar", "BORN_IN", "Gwalior"),
+    ("Javed Akhtar", "PROFESSION", "Lyricist"),
+    ("Farhan Akhtar", "PARENT", "Javed Akhtar"),
+    ("Zoya Akhtar", "PARENT", "Javed Akhtar"),
+    ("Apple Inc.", "FOUNDED_BY", "Steve Jobs"),
+    ("Apple Inc.", "FOUNDED", "1976"),
+    ("Apple Inc.", "HEADQUARTERED", "Cupertino"),
+    ("Elon Musk", "FOUNDED", "SpaceX"),
+    ("Steve Jobs", "BORN_IN", "San Francisco"),
+    ("Tom Hanks", "ACTED_IN", "Forrest Gump"),
+]
+
+
+@pytest.fixture(scope="module")
+def graph():
+    resolver, index = entity_resolver(), local_graph()
+    triples, _ = resolver.canonicalize(TRIPLES)
+    index.add(triples)
+    return index, resolver
+
+
+@pytest.mark.parametrize("question, values", [
+    ("Where was Javed Akhtar born?", ["Gwalior"]),
+    ("What is the profession of Javed Akhtar?", ["Lyricist"]),
+    ("Who are Javed Akhtar's children?", ["Farhan Akhtar", "Zoya Akhtar"]),
+    ("Who founded Apple Inc.?", ["Steve Jobs"]),
+    ("Who is the founder of Apple Inc.?", ["Steve Jobs"]),
+    ("Who was Apple Inc. founded by?", ["Steve Jobs"]),
+    ("What did Elon Musk found?", ["SpaceX"]),
+    ("What was founded by Elon Musk?", ["SpaceX"]),
+    ("Who founded SpaceX?", ["Elon Musk"]),
+    ("Where was the founder of Apple Inc. born?", ["San Francisco"]),
+    ("Where is Apple Inc. headquartered?", ["Cupertino"]),
+    ("Who acted in Forrest Gump?", ["Tom Hanks"]),
+    ("What did Tom Hanks act in?", ["Forrest Gump"]),
+    ("Who was born in Gwalior?", ["Javed Akhtar"]),
+])
+def test_answers_lookups(graph, question, values):
+    index, resolver = graph
+    assert index.answer(question, resolver)["values"] == values
+
+
+@pytest.mark.parametrize("question", [
+    "What is the birth date of Javed Akhtar?",
+    "When was Javed Akhtar born?",
+    "Which year was Apple Inc. founded?",
+    "When was Apple Inc. founded?",
+    "How many children does Javed Akhtar have?",
+    "Was Javed Akhtar born in Mumbai?",
+    "Who are Javed Akhtar's parents?",
+    "Where was Javed Akhtar's profession?",
+])
+def test_leaves_other_questions_to_the_llm(graph, question):
+    index, resolver = graph
+    assert index.answer(question, resolver) is None
+
+
+def test_one_direction_per_hop(graph):
+    _, resolver = graph
+    assert match_question("Who founded Apple Inc.?", resolver) == ("Apple Inc.", [(("FOUNDED",), True)])
+    assert match_question("What did Elon Musk found?", resolver) == ("Elon Musk", [(("FOUNDED",), False)])
+    assert match_question("Who is Apple Inc.'s founder?", resolver) == ("Apple Inc.", [(("FOUNDED_BY",), False)])
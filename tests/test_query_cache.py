@@ -0,0 +1,70 @@
+"""Normalization, literal lifting and hit/miss behaviour of services/query_cache.py."""
+import pytest
+
+from services.query_cache import normalize_question, query_cache
+
+FOUNDED_BY = 'MATCH (c:ENTITY {name:"Apple Inc."})-[:FOUNDED_BY]->(p:ENTITY) RETURN p.name AS result'
+BORN_IN = 'MATCH (p:ENTITY {name:"Javed Akhtar"})-[:BORN_IN]->(c:ENTITY) RETURN c.name AS result'
+
+
+@pytest.mark.parametrize("question, normalized", [
+    ("Who founded Apple Inc.?", "Who founded Apple Inc."),
+    ("Who founded Apple Inc.", "Who founded Apple Inc."),
+    ("  Where was   Javed Akhtar born? ", "Where was Javed Akhtar born"),
+    ("Name the parents of Javed Akhtar.", "Name the parents of Javed Akhtar"),
+    ("Who is John F.", "Who is John F."),
+    ("What is the Tesla—SpaceX link?!", "What is the Tesla-SpaceX link"),
+])
+def test_normalize_question(question, normalized):
+    assert normalize_question(question) == normalized
+
+
+def test_lifts_literals_including_abbreviations():
+    cache = query_cache()
+    key = cache.store("Who founded Apple Inc.?", FOUNDED_BY)
+    assert key == "who founded {p0}"
+    cypher, params, hit = cache.lookup("Who founded Tesla Inc.?")
+    assert hit == key
+    assert cypher == 'MATCH (c:ENTITY {name:$p0})-[:FOUNDED_BY]->(p:ENTITY) RETURN p.name AS result'
+    assert params == {"p0": "Tesla Inc."}
+
+
+def test_title_cases_lowercase_captures():
+    cache = query_cache()
+    cache.store("Where was Javed Akhtar born?", BORN_IN)
+    assert cache.lookup("where was farhan akhtar born")[1] == {"p0": "Farhan Akhtar"}
+
+
+@pytest.mark.parametrize("question", [
+    "Who founded Apple in 2020?",
+    "Who founded Elon Musk not?",
+    "Who founded the company?",
+    "Who founded born?",
+])
+def test_rejects_captures_that_are_not_names(question):
+    cache = query_cache()
+    cache.store("Who founded Apple Inc.?", FOUNDED_BY)
+    assert cache.lookup(question) is None
+
+
+def test_requires_same_relations():
+    cache = query_cache()
+    cache.store("Where was Javed Akhtar born?", BORN_IN)
+    assert cache.lookup("Where was the founder of Apple born?") is None
+    assert cache.lookup("Where was Elon Musk's wife born?") is None
+
+
+def test_refuses_templates_without_fixed_words():
+    cache = query_cache()
+    assert cache.store("Apple Inc.", 'MATCH (e:ENTITY {name:"Apple Inc."}) RETURN e.name AS result') is None
+    assert cache.lookup("Elon Musk parents") is None
+
+
+def test_exact_questions_without_literals_and_stats():
+    cache = query_cache(max_entries=1)
+    cypher = "MATCH (e:ENTITY) RETURN count(e) AS result"
+    key = cache.store("How many entities are there?", cypher)
+    assert cache.lookup("how many entities are there") == (cypher, {}, key)
+    cache.store("Where was Javed Akhtar born?", BORN_IN)  # evicts the first entry
+    assert cache.lookup("How many entities are there?") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "hit_rate": 0.5}
@@ -0,0 +1,44 @@
+"""Fixture tests for services/triple_parser.py (fixtures shared with benchmarks/parser_bench.py)."""
+import pytest
+
+from benchmarks.parser_bench import load_fixtures, recovered, streamed
+from services.triple_parser import parse_response, triple_stream_parser
+
+FIXTURES = load_fixtures()
+MIN_RECOVERY_RATE = 0.95
+
+
+@pytest.mark.parametrize("fixture", FIXTURES, ids=[f["name"] for f in FIXTURES])
+def test_parses_expected_triples(fixture):
+    triples, _, _ = parse_response(fixture["raw"])
+    assert [list(t) for t in triples] == fixture["expected"]
+
+
+@pytest.mark.parametrize("step", [1, 3, 7, 64])
+@pytest.mark.parametrize("fixture", FIXTURES, ids=[f["name"] for f in FIXTURES])
+def test_streamed_matches_whole(fixture, step):
+    parser = triple_stream_parser()
+    whole = parser.feed(fixture["raw"]) + parser.close()
+    assert streamed(fixture["raw"], step) == whole
+
+
+def test_recovery_rate():
+    expected = sum(len(f["expected"]) for f in FIXTURES)
+    found = sum(recovered(f["expected"], parse_response(f["raw"])[0]) for f in FIXTURES)
+    assert found / expected >= MIN_RECOVERY_RATE
+
+
+def test_aliases_and_stats():
+    triples, aliases, stats = parse_response(
+        '[["Elon Musk", "FOUNDED", "SpaceX", ["Elon", "Musk"]], ["C", "S"], ["A", "R" "B", []]]'
+    )
+    assert triples == [("Elon Musk", "FOUNDED", "SpaceX"), ("A", "R", "B")]
+    assert aliases == {"Elon Musk": ["Elon", "Musk"], "A": []}
+    assert stats == {"items": 2, "recovered": 1, "malformed": 1, "recovery_rate": 0.667}
+
+
+def test_chunk_ids():
+    parser = triple_stream_parser(chunk_ids=True)
+    items = parser.feed('[["c0", "A", "R", "B", []], ["A", "R", "B"]]') + parser.close()
+    assert items == [["c0", "A", "R", "B", []]]
+    assert parser.malformed == 1
@@ -0,0 +1,23 @@
+import streamlit as st
+
+from utils.metrics import last_trace
+
+_TRACES = (("ingest", "📥 Last ingest"), ("build", "🏗️ Last build"), ("query", "🔍 Last query"))
+
+
+def render_debug_panel():
+    """Per-stage breakdown of the last ingest, build and query traced in this session."""
+    with st.expander("🐞 Debug: pipeline timings"):
+        shown = False
+        for kind, title in _TRACES:
+            trace = last_trace(kind)
+            if not trace:
+                continue
+            shown = True
+            st.markdown(f"**{title}** · {trace['seconds']}s · `{trace['id']}`")
+            if trace["stages"]:
+                st.table(trace["stages"])
+            if trace["counters"]:
+                st.json(trace["counters"], expanded=False)
+        if not shown:
+            st.caption("No traces yet. Build or query the graph first.")
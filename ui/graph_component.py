@@ -0,0 +1,18 @@
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+# lib/index.html loads the vendored vis-network assets from the same directory
+_LIB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lib")
+_kg_graph = components.declare_component("kg_graph", path=_LIB_DIR)
+
+
+def render_graph(view, key="kg_graph", height=600):
+    """
+    Render a graph_view. The component reports how many edges it holds,
+    so each rerun only sends the edges added since then.
+    """
+    state = st.session_state.get(key) or {}
+    since = state.get("edges", 0) if state.get("view") == view.view_id else 0
+    _kg_graph(payload=view.payload(since), height=height, key=key, default=None)
@@ -0,0 +1,99 @@
+import atexit
+import threading
+import time
+
+from utils.logger import logger
+from configs.config import (
+    NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD,
+    NEO4J_MAX_POOL_SIZE, NEO4J_ACQUISITION_TIMEOUT, NEO4J_MAX_CONNECTION_LIFETIME, NEO4J_CONNECTION_TIMEOUT,
+)
+
+_driver = None
+_lock = threading.Lock()
+_acquire_stats = {"acquisitions": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0, "failures": 0}
+
+
+def get_driver():
+    """Return the one Neo4j driver (and connection pool) shared by the whole process."""
+    global _driver
+    if _driver is not None:
+        return _driver
+    with _lock:
+        if _driver is None:
+            # Imported here so processes that never touch Neo4j don't pay for the driver package
+            from neo4j import GraphDatabase
+
+            _driver = GraphDatabase.driver(
+                NEO4J_URI,
+                auth=(NEO4J_USER, NEO4J_PASSWORD),
+                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_ACQUISITION_TIMEOUT,
+                max_connection_lifetime=NEO4J_MAX_CONNECTION_LIFETIME,
+                connection_timeout=NEO4J_CONNECTION_TIMEOUT,
+            )
+            _instrument_pool(_driver)
+            atexit.register(close_driver)
+            logger.info(f"✅ Neo4j driver created (pool size {NEO4J_MAX_POOL_SIZE})")
+    return _driver
+
+
+def close_driver():
+    global _driver
+    with _lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
+            logger.info("🔌 Neo4j driver closed")
+
+
+def pool_metrics():
+    """In-use / idle connections and acquisition wait times for the shared pool."""
+    with _lock:
+        stats = dict(_acquire_stats)
+    metrics = {
+        "max_pool_size": NEO4J_MAX_POOL_SIZE,
+        "in_use": None,
+        "idle": None,
+        "acquisitions": stats["acquisitions"],
+        "acquire_failures": stats["failures"],
+        "avg_wait_ms": round(1000 * stats["wait_seconds"] / stats["acquisitions"], 3) if stats["acquisitions"] else 0.0,
+        "max_wait_ms": round(1000 * stats["max_wait_seconds"], 3),
+    }
+    pool = getattr(_driver, "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is not None:
+        # Driver internals: best effort, the public API exposes no pool stats
+        try:
+            everything = [c for conns in list(connections.values()) for c in list(conns)]
+            metrics["in_use"] = sum(1 for c in everything if getattr(c, "in_use", False))
+            metrics["idle"] = len(everything) - metrics["in_use"]
+        except Exception:
+            pass
+    return metrics
+
+
+def _instrument_pool(driver):
+    """Time every connection acquisition by wrapping the driver's pool."""
+    pool = getattr(driver, "_pool", None)
+    acquire = getattr(pool, "acquire", None)
+    if acquire is None:
+        logger.warning("⚠️ Neo4j pool metrics unavailable for this driver version")
+        return
+
+    def timed_acquire(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return acquire(*args, **kwargs)
+        except Exception:
+            with _lock:
+                _acquire_stats["failures"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            # Every session of every thread comes through here
+            with _lock:
+                _acquire_stats["acquisitions"] += 1
+                _acquire_stats["wait_seconds"] += waited
+                _acquire_stats["max_wait_seconds"] = max(_acquire_stats["max_wait_seconds"], waited)
+
+    pool.acquire = timed_acquire
@@ -0,0 +1,143 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+
+# Sentence phrasing -> relation, shared with the synthetic corpora in benchmarks/corpus.py
+PHRASES = {
+    "was born in": "BORN_IN",
+    "founded": "FOUNDED",
+    "acted in": "ACTED_IN",
+    "works as": "PROFESSION",
+    "is the parent of": "PARENT",
+    "is headquartered in": "HEADQUARTERED_IN",
+}
+
+_NAME_PATTERN = r"[A-Z][\w.\-]*(?: [A-Z0-9][\w.\-]*)*"
+_SENTENCE = re.compile(
+    rf"(?P<head>{_NAME_PATTERN}) (?P<verb>" + "|".join(map(re.escape, PHRASES)) + rf") (?P<tail>{_NAME_PATTERN})$"
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_TEXT = re.compile(r'Text: "(.*)"', re.S)
+_BATCH_TEXT = re.compile(r"^\[(c\d+)\] (.*)$", re.M)
+_QUESTION = re.compile(r'Question: "(.*)"', re.S)
+_NAME = re.compile(r"[A-Z][\w.\-]*(?: [A-Z0-9][\w.\-]*)+")
+_QUESTION_RELATIONS = [
+    (re.compile(r"\bborn\b"), "BORN_IN", False),
+    (re.compile(r"\bfound"), "FOUNDED", True),
+    (re.compile(r"\bact"), "ACTED_IN", True),
+    (re.compile(r"\b(job|profession|occupation)\b"), "PROFESSION", False),
+    (re.compile(r"\bparents?\b"), "PARENT", True),
+    (re.compile(r"\bheadquarter"), "HEADQUARTERED_IN", False),
+]
+
+
+class _message:
+    def __init__(self, content):
+        self.content = content
+
+
+class rate_limit_error(Exception):
+    """Shaped like the provider SDK's 429 error: status_code and a Retry-After header."""
+
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("Rate limit reached (stub)")
+        self.response = _response(429, {"retry-after": f"{retry_after:.2f}"})
+
+
+class _response:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class fake_llm:
+    """
+    Deterministic stand-in for the ChatGroq client (KG_LLM_BACKEND=stub).
+
+    Extraction prompts get one triple per "<Head> <phrase> <Tail>." sentence of
+    the prompt's text (prefixed with the chunk id for batched prompts); Cypher
+    prompts get a one-hop MATCH for the question's entity. `latency` (seconds
+    per call) and `token_latency` (seconds per streamed piece) simulate a
+    remote model; with `requests_per_minute`, calls over that many per
+    `window` seconds (60 unless a benchmark shortens it) fail with a 429
+    like a provider's.
+    """
+
+    def __init__(self, latency=0.0, token_latency=0.0, piece_size=4, requests_per_minute=0, window=60.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.piece_size = piece_size
+        self.requests_per_minute = requests_per_minute
+        self.window = window
+        self.calls = 0
+        self.rejected = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        self._call()
+        if self.latency:
+            time.sleep(self.latency)
+        return _message(self._answer(str(prompt)))
+
+    def stream(self, prompt):
+        self._call()
+        if self.latency:
+            time.sleep(self.latency)
+        content = self._answer(str(prompt))
+        for i in range(0, len(content), self.piece_size):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield _message(content[i:i + self.piece_size])
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            if not self.requests_per_minute:
+                return
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= self.window:
+                self._recent.popleft()
+            if len(self._recent) >= self.requests_per_minute:
+                self.rejected += 1
+                raise rate_limit_error(self.window - (now - self._recent[0]))
+            self._recent.append(now)
+
+    def _answer(self, prompt):
+        question = _QUESTION.search(prompt)
+        if question and "Cypher" in prompt:
+            return self._cypher(question.group(1))
+        if "Texts:" in prompt:
+            # Batched extraction: every triple starts with its chunk id
+            items = [[chunk_id, *item] for chunk_id, text in _BATCH_TEXT.findall(prompt)
+                     for item in json.loads(self._triples(text))]
+            return json.dumps(items)
+        text = _TEXT.search(prompt)
+        return self._triples(text.group(1) if text else prompt)
+
+    @staticmethod
+    def _triples(text):
+        items = []
+        for sentence in _SENTENCE_END.split(text):
+            m = _SENTENCE.search(sentence.strip().rstrip("."))
+            if not m:
+                continue
+            head = m.group("head")
+            items.append([head, PHRASES[m.group("verb")], m.group("tail"), head.split()[:1]])
+        return json.dumps(items)
+
+    @staticmethod
+    def _cypher(question):
+        name = _NAME.search(question)
+        lowered = question.lower()
+        for pattern, rel, subject_asked in _QUESTION_RELATIONS:
+            if name and pattern.search(lowered):
+                value = json.dumps(name.group())
+                if subject_asked:
+                    return f"MATCH (a:ENTITY)-[:{rel}]->(b:ENTITY {{name:{value}}}) RETURN a.name AS result"
+                return f"MATCH (a:ENTITY {{name:{value}}})-[:{rel}]->(b:ENTITY) RETURN b.name AS result"
+        return "MATCH (a:ENTITY) RETURN a.name AS result LIMIT 0"
@@ -1,9 +1,24 @@
-from langchain_groq import ChatGroq
-import os 
-
 from dotenv import load_dotenv
 load_dotenv()
 
-api_key = os.getenv('GROQ_API_KEY')
+from configs.config import (
+    LLM_BACKEND, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_RETRIES, LLM_BACKOFF, LLM_TIMEOUT,
+    LLM_COALESCE, LLM_LIMITS_DB,
+)
+from utils.llm_gateway import llm_gateway, make_backend, backend_model
 
-llm=ChatGroq(groq_api_key=api_key, model="Gemma2-9b-It", streaming=True)
\ No newline at end of file
+# One gateway per process: in-flight coalescing covers every thread and session, and the rate limits
+# (kept in LLM_LIMITS_DB) are shared with the background worker processes too.
+# The backend client (and its imports) is only created on the first LLM call.
+MODEL_NAME = backend_model(LLM_BACKEND)
+llm = llm_gateway(
+    lambda: make_backend(LLM_BACKEND, LLM_TIMEOUT)[0],
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    retries=LLM_RETRIES,
+    backoff=LLM_BACKOFF,
+    timeout=LLM_TIMEOUT,
+    coalesce=LLM_COALESCE,
+    limits_path=LLM_LIMITS_DB,
+    limits_name=LLM_BACKEND,
+)
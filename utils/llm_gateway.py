@@ -0,0 +1,427 @@
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+
+from utils.logger import logger
+from utils import metrics
+
+_BACKENDS = {}
+
+
+def register_backend(name, factory, model):
+    """factory(timeout) -> (client with invoke/stream, model name); `model` is known without building it."""
+    _BACKENDS[name] = (factory, model)
+
+
+def backend_model(name):
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown LLM backend {name!r}; expected one of {sorted(_BACKENDS)}")
+    return _BACKENDS[name][1]
+
+
+def make_backend(name, timeout):
+    backend_model(name)
+    return _BACKENDS[name][0](timeout)
+
+
+_GROQ_MODEL = "Gemma2-9b-It"
+
+
+def _groq(timeout):
+    from langchain_groq import ChatGroq
+
+    model = _GROQ_MODEL
+    # Retries are the gateway's job, so every attempt goes through its rate limits
+    client = ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model=model, streaming=True,
+                      timeout=timeout, max_retries=0)
+    return client, model
+
+
+def _stub(timeout):
+    # Deterministic offline model for tests and benchmarks (see utils/fake_llm.py)
+    from configs.config import STUB_LLM_LATENCY, STUB_LLM_TOKEN_LATENCY, STUB_LLM_REQUESTS_PER_MINUTE
+    from utils.fake_llm import fake_llm
+
+    client = fake_llm(latency=STUB_LLM_LATENCY, token_latency=STUB_LLM_TOKEN_LATENCY,
+                      requests_per_minute=STUB_LLM_REQUESTS_PER_MINUTE)
+    return client, "stub"
+
+
+register_backend("groq", _groq, _GROQ_MODEL)
+register_backend("stub", _stub, "stub")
+
+
+class token_bucket:
+    """
+    Refills `per_minute` units a minute, holding at most `burst` (default a
+    tenth of a minute's worth: a full minute's burst on top of the refill
+    would overrun a provider's per-minute window). per_minute=0 disables it.
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self.capacity = float(burst or per_minute / 10)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1.0):
+        """Block until the bucket can cover `amount`, then take it; returns the seconds waited."""
+        if not self.rate:
+            return 0.0
+        # A request bigger than the bucket waits for a full one and leaves it in debt
+        needed = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            delay = self._update(
+                lambda level: (level - amount, 0.0) if level >= needed else (level, (needed - level) / self.rate)
+            )
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def charge(self, amount):
+        """Take `amount` after the fact (e.g. output tokens); the level may go negative."""
+        if not self.rate:
+            return
+        self._update(lambda level: (level - amount, None))
+
+    def drain(self):
+        if not self.rate:
+            return
+        self._update(lambda level: (min(level, 0.0), None))
+
+    def _update(self, change):
+        """Refill, then apply change(level) -> (new level, result) atomically; returns the result."""
+        with self._lock:
+            now = time.monotonic()
+            level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.level, result = change(level)
+            self.updated = now
+            return result
+
+
+class shared_token_bucket(token_bucket):
+    """
+    A token_bucket whose level lives in a SQLite table, so every process
+    opening the same `path` (the app and each background worker) draws on one
+    budget instead of each getting the full provider limit. Every update is
+    one short write transaction; the file is opened on first use.
+    """
+
+    def __init__(self, per_minute, path, name, burst=None):
+        super().__init__(per_minute, burst)
+        self.path = path
+        self.name = name
+        self._conn = None
+
+    def _connect(self):
+        import sqlite3
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+        conn.execute("INSERT OR IGNORE INTO rate_buckets VALUES (?, ?, ?)", (self.name, self.capacity, time.time()))
+        return conn
+
+    def _update(self, change):
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            conn = self._conn
+            # Wall-clock time: monotonic clocks are not comparable across processes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                level, updated = conn.execute(
+                    "SELECT level, updated FROM rate_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                now = time.time()
+                level, result = change(min(self.capacity, level + max(0.0, now - updated) * self.rate))
+                conn.execute("UPDATE rate_buckets SET level = ?, updated = ? WHERE name = ?", (level, now, self.name))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return result
+
+
+def make_bucket(per_minute, shared_path=None, name="llm"):
+    """A shared_token_bucket when a path is configured and the limit is on, else a per-process token_bucket."""
+    if shared_path and per_minute:
+        return shared_token_bucket(per_minute, shared_path, name)
+    return token_bucket(per_minute)
+
+
+class _flight:
+    """One in-flight call; callers with the same prompt read its pieces instead of calling again."""
+
+    def __init__(self):
+        self.pieces = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def add(self, piece):
+        with self.cond:
+            self.pieces.append(piece)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def read(self):
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.pieces) and not self.done:
+                    self.cond.wait()
+                if i < len(self.pieces):
+                    piece = self.pieces[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield piece
+
+
+class llm_gateway:
+    """
+    Every LLM call goes through here, from any thread or Streamlit session.
+
+    - token buckets for requests and tokens per minute, matched to the
+      provider's limits; a 429 pauses every caller, not just the one that got it.
+      With `limits_path` the buckets are shared_token_buckets, one budget for
+      every process (app and background workers) using that file
+    - jittered exponential retry on 429, 5xx, timeouts and connection errors
+      (honouring Retry-After); a stream is only retried before its first piece
+    - a per-call deadline (`timeout`), on top of the backend's own request
+      timeout: the backend call runs on a worker thread, so a call that never
+      returns or a stream that stalls between pieces still times out (and is
+      retried like any timeout if nothing was handed out yet)
+    - identical prompts already in flight share one call (and its stream)
+
+    invoke(prompt) and stream(prompt) behave like the backend's. `backend` is
+    a client, or a zero-argument factory called on the first call (importing
+    a provider client is slow, and most app reruns never call the LLM).
+    """
+
+    def __init__(self, backend, requests_per_minute=0, tokens_per_minute=0, retries=5, backoff=1.0,
+                 timeout=60.0, coalesce=True, limits_path=None, limits_name="llm"):
+        if hasattr(backend, "invoke"):
+            self._backend, self._factory = backend, None
+        else:
+            self._backend, self._factory = None, backend
+        self._backend_lock = threading.Lock()
+        self.requests = make_bucket(requests_per_minute, limits_path, f"{limits_name}:requests")
+        self.tokens = make_bucket(tokens_per_minute, limits_path, f"{limits_name}:tokens")
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.coalesce = coalesce
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._paused_until = 0.0
+        self._pause_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = self._factory()
+        return self._backend
+
+    def invoke(self, prompt):
+        # Run the generator to the end so the shared call is marked finished for any followers
+        return list(self._shared("invoke", prompt, self._invoke))[0]
+
+    def stream(self, prompt):
+        yield from self._shared("stream", prompt, self._stream)
+
+    # ----------------- Coalescing -----------------
+    def _shared(self, mode, prompt, call):
+        if not self.coalesce:
+            yield from call(prompt)
+            return
+        key = (mode, hashlib.sha256(str(prompt).encode("utf-8")).hexdigest())
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _flight()
+        if not leader:
+            metrics.incr("llm_coalesced")
+            yield from flight.read()
+            return
+        try:
+            for piece in call(prompt):
+                flight.add(piece)
+                yield piece
+            flight.finish()
+        except BaseException as e:
+            # Includes the caller abandoning the stream (GeneratorExit): followers must not wait forever
+            flight.finish(e if isinstance(e, Exception) else RuntimeError("shared LLM call was abandoned"))
+            raise
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+
+    # ----------------- Calls -----------------
+    def _invoke(self, prompt):
+        for attempt in range(self.retries + 1):
+            self._admit(prompt)
+            try:
+                backend = self.backend
+                with metrics.span("llm.call", mode="invoke", attempt=attempt):
+                    response, = _before_deadline(lambda: iter([backend.invoke(prompt)]), self.timeout)
+            except Exception as e:
+                self._retry_or_raise(e, attempt)
+                continue
+            self.tokens.charge(_estimate_tokens(response.content))
+            yield response
+            return
+
+    def _stream(self, prompt):
+        for attempt in range(self.retries + 1):
+            self._admit(prompt)
+            started = False
+            output = 0
+            try:
+                backend = self.backend
+                with metrics.span("llm.call", mode="stream", attempt=attempt):
+                    for piece in _before_deadline(lambda: backend.stream(prompt), self.timeout):
+                        started = True
+                        output += len(piece.content)
+                        yield piece
+            except Exception as e:
+                if started:
+                    # Pieces were already handed out; a retry would repeat them
+                    raise
+                self._retry_or_raise(e, attempt)
+                continue
+            finally:
+                self.tokens.charge(output // 4)
+            return
+
+    def _admit(self, prompt):
+        """
+        Wait out any 429 pause, then take one request and the prompt's tokens from the buckets.
+        The wait is metrics.waiting(), so it does not count against a build's chunk timeout.
+        """
+        with metrics.waiting():
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+            waited = self.requests.acquire(1) + self.tokens.acquire(_estimate_tokens(prompt))
+        if waited:
+            metrics.observe("llm.rate_wait", waited)
+
+    def _retry_or_raise(self, error, attempt):
+        if attempt >= self.retries or not _retryable(error):
+            metrics.incr("llm_failures")
+            raise error
+        delay = _retry_after(error) or self.backoff * (2 ** attempt)
+        delay += random.uniform(0, self.backoff)
+        if _rate_limited(error):
+            metrics.incr("llm_rate_limited")
+            with self._pause_lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.requests.drain()
+        metrics.incr("llm_retries")
+        logger.warning(f"⚠️ LLM call failed ({type(error).__name__}: {error}); retry {attempt + 1} in {delay:.1f}s")
+        if _rate_limited(error):
+            with metrics.waiting():
+                time.sleep(delay)
+        else:
+            time.sleep(delay)
+
+
+_END = object()
+
+
+def _before_deadline(produce, timeout):
+    """
+    Yield what produce() yields, raising TimeoutError once `timeout` seconds
+    have passed while waiting for the next item. produce() runs on a daemon
+    thread, so the wait is bounded even if the backend blocks; an abandoned
+    call is stopped at its next item (or left to the backend's own timeout).
+    """
+    if not timeout:
+        yield from produce()
+        return
+    items = queue.Queue()
+    abandoned = threading.Event()
+
+    def run():
+        try:
+            iterator = produce()
+            try:
+                for item in iterator:
+                    if abandoned.is_set():
+                        break
+                    items.put((item, None))
+            finally:
+                getattr(iterator, "close", lambda: None)()
+            items.put((_END, None))
+        except BaseException as e:
+            items.put((_END, e))
+
+    threading.Thread(target=run, name="kg-llm-call", daemon=True).start()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                item, error = items.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"LLM call exceeded {timeout}s") from None
+            if error is not None:
+                raise error
+            if item is _END:
+                return
+            yield item
+    finally:
+        abandoned.set()
+
+
+def _estimate_tokens(text):
+    # Close enough for rate limiting; the provider counts exactly on its side
+    return len(str(text)) // 4 + 1
+
+
+def _status(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _rate_limited(error):
+    return _status(error) == 429 or "RateLimit" in type(error).__name__
+
+
+def _retryable(error):
+    status = _status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__
+    return any(word in name for word in ("Timeout", "Connection", "RateLimit"))
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
@@ -1,6 +1,7 @@
 import logging, sys
 
-handler = logging.StreamHandler(sys.stdout)
+# stderr, so commands that print a JSON report on stdout (benchmarks, snapshot, worker) stay parseable
+handler = logging.StreamHandler(sys.stderr)
 handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
 
 logging.basicConfig(
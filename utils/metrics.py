@@ -0,0 +1,299 @@
+import contextvars
+import json
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.logger import logger
+from configs.config import TRACE_FILE, METRICS_PORT
+
+_current = contextvars.ContextVar("kg_trace", default=None)
+# Where finished traces are kept: a Streamlit session's own dict (keep_last_traces), else process-wide
+_last_store = contextvars.ContextVar("kg_last_traces", default=None)
+_last = {}
+_file_lock = threading.Lock()
+_trace_file = None
+
+
+class _trace:
+    """Every span and counter recorded while one build, ingest or query was running."""
+
+    def __init__(self, kind, attrs):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.attrs = attrs
+        self.started = time.time()
+        self.seconds = None
+        self.spans = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            stage = self.spans[name]
+            stage["count"] += 1
+            stage["total_ms"] += ms
+            stage["max_ms"] = max(stage["max_ms"], ms)
+
+    def incr(self, name, value):
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self):
+        """Per-stage breakdown. Stages run concurrently in pipelined builds, so shares can add up past 100%."""
+        wall_ms = (self.seconds or 0) * 1000
+        with self._lock:
+            stages = [
+                {
+                    "stage": name,
+                    "count": s["count"],
+                    "total_ms": round(s["total_ms"], 2),
+                    "avg_ms": round(s["total_ms"] / s["count"], 2),
+                    "max_ms": round(s["max_ms"], 2),
+                    "share": round(s["total_ms"] / wall_ms, 3) if wall_ms else None,
+                }
+                for name, s in self.spans.items()
+            ]
+            counters = {k: round(v, 3) for k, v in self.counters.items()}
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "attrs": self.attrs,
+            "started": self.started,
+            "seconds": round(self.seconds, 4) if self.seconds is not None else None,
+            "stages": sorted(stages, key=lambda s: -s["total_ms"]),
+            "counters": counters,
+        }
+
+
+class _registry:
+    """Process-wide totals, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.timings = defaultdict(lambda: [0, 0.0])
+        self._lock = threading.Lock()
+
+    def incr(self, name, value):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timing = self.timings[name]
+            timing[0] += 1
+            timing[1] += seconds
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                metric = f"kg_{_metric_name(name)}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+            for name, (count, total) in sorted(self.timings.items()):
+                metric = f"kg_{_metric_name(name)}_seconds"
+                lines += [f"# TYPE {metric} summary", f"{metric}_count {count}", f"{metric}_sum {total:.6f}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = _registry()
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _write(record):
+    global _trace_file
+    if not TRACE_FILE:
+        return
+    line = json.dumps(record, default=str)
+    with _file_lock:
+        if _trace_file is None:
+            _trace_file = open(TRACE_FILE, "a", encoding="utf-8", buffering=1)
+        _trace_file.write(line + "\n")
+
+
+@contextmanager
+def trace(kind, **attrs):
+    """
+    Start a trace for one build / ingest / query. Inside an active trace it
+    is just a span, so e.g. a bulk build of many sources stays one trace.
+    """
+    if _current.get() is not None:
+        with span(kind, **attrs) as record:
+            yield record
+        return
+
+    current = _trace(kind, attrs)
+    token = _current.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        _current.reset(token)
+        REGISTRY.observe(f"trace_{kind}", current.seconds)
+        _last_traces()[kind] = current
+        _write({"type": "trace", **current.summary()})
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a block. Attributes can be added to the yielded dict before it closes."""
+    record = dict(attrs)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception:
+        record["error"] = True
+        raise
+    finally:
+        observe(name, time.perf_counter() - start, **record)
+
+
+def observe(name, seconds, **attrs):
+    """Record an already measured duration as a span."""
+    REGISTRY.observe(name, seconds)
+    current = _current.get()
+    if current is not None:
+        current.add(name, seconds)
+    _write({
+        "type": "span", "trace": current.id if current else None, "name": name,
+        "ms": round(seconds * 1000, 3), "ts": time.time(), **attrs,
+    })
+
+
+def incr(name, value=1):
+    """Bump a counter (tokens, triples, round trips, cache hits, ...)."""
+    REGISTRY.incr(name, value)
+    current = _current.get()
+    if current is not None:
+        current.incr(name, value)
+
+
+def counters():
+    """Counters of the active trace so far (empty outside a trace)."""
+    current = _current.get()
+    if current is None:
+        return {}
+    with current._lock:
+        return dict(current.counters)
+
+
+class work_clock:
+    """
+    Time a task has spent working since it started, leaving out the time it
+    spent in waiting() blocks (rate limits). Read from another thread to
+    apply a timeout that a throttled task does not run into.
+    """
+
+    def __init__(self):
+        self.started = None
+        self.waited = 0.0
+        self._waiting_since = None
+        self._lock = threading.Lock()
+
+    def busy_seconds(self):
+        with self._lock:
+            if self.started is None:
+                return 0.0
+            now = time.perf_counter()
+            waiting = now - self._waiting_since if self._waiting_since is not None else 0.0
+            return now - self.started - self.waited - waiting
+
+
+_clock = contextvars.ContextVar("kg_work_clock", default=None)
+
+
+@contextmanager
+def timed_work(clock):
+    """Start `clock` and make it the one waiting() pauses, for this context."""
+    clock.started = time.perf_counter()
+    token = _clock.set(clock)
+    try:
+        yield clock
+    finally:
+        _clock.reset(token)
+
+
+@contextmanager
+def waiting():
+    """Mark a block as waiting, not working: it does not count on the active work_clock."""
+    clock = _clock.get()
+    if clock is None:
+        yield
+        return
+    with clock._lock:
+        clock._waiting_since = time.perf_counter()
+    try:
+        yield
+    finally:
+        with clock._lock:
+            clock.waited += time.perf_counter() - clock._waiting_since
+            clock._waiting_since = None
+
+
+def bind(fn):
+    """Carry the active trace into another thread (one bound callable per submitted task)."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def keep_last_traces(store):
+    """
+    Keep the traces finished in this context (e.g. one Streamlit session's
+    rerun, and the threads it binds) in `store` instead of process-wide, so
+    last_trace() never shows another session's build or query.
+    """
+    _last_store.set(store)
+
+
+def _last_traces():
+    store = _last_store.get()
+    return _last if store is None else store
+
+
+def last_trace(kind):
+    """Summary of the most recent finished trace of this kind (in this session, see keep_last_traces), or None."""
+    current = _last_traces().get(kind)
+    return current.summary() if current else None
+
+
+def render_prometheus():
+    return REGISTRY.render()
+
+
+class _metrics_handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics on `port` from a daemon thread. Disabled when port is 0."""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _metrics_handler)
+    except OSError as e:
+        logger.error(f"❌ Metrics endpoint not started on :{port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True, name="kg-metrics").start()
+    logger.info(f"📈 Prometheus metrics on http://0.0.0.0:{port}/metrics")
+    return server